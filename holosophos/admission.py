@@ -0,0 +1,242 @@
+import asyncio
+import contextlib
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Sequence
+
+from starlette.datastructures import Headers
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Weight of the last session in the running average of session durations.
+DURATION_SMOOTHING = 0.2
+
+
+class QueueFullError(Exception):
+    def __init__(self, retry_after: int) -> None:
+        super().__init__(f"Queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Bounds concurrent sessions and queues the rest.
+    Higher priorities go first, clients with the same priority take turns.
+    """
+
+    def __init__(
+        self,
+        max_active: int,
+        max_queued: int,
+        max_queued_per_client: int,
+        default_retry_after: int,
+    ) -> None:
+        self.max_active = max_active
+        self.max_queued = max_queued
+        self.max_queued_per_client = max_queued_per_client
+        self.default_retry_after = default_retry_after
+        self.active = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.avg_duration: Optional[float] = None
+        self._queues: Dict[int, OrderedDict[str, Deque[asyncio.Future[None]]]] = {}
+
+    def _queued_by(self, client_id: str) -> int:
+        return sum(len(clients.get(client_id, ())) for clients in self._queues.values())
+
+    def retry_after(self) -> int:
+        if self.avg_duration is None:
+            return self.default_retry_after
+        return max(1, math.ceil(self.avg_duration * (self.queued + 1) / self.max_active))
+
+    async def acquire(self, client_id: str, priority: int = 0) -> float:
+        """Wait for a free slot, return the time spent in the queue."""
+        if self.active < self.max_active and self.queued == 0:
+            self.active += 1
+            self.admitted += 1
+            return 0.0
+        if self.queued >= self.max_queued or self._queued_by(client_id) >= (
+            self.max_queued_per_client
+        ):
+            self.rejected += 1
+            raise QueueFullError(self.retry_after())
+
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        clients = self._queues.setdefault(priority, OrderedDict())
+        clients.setdefault(client_id, deque()).append(future)
+        self.queued += 1
+        start_time = time.monotonic()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Admitted right before the cancellation, give the slot to the next one.
+                self.release()
+            else:
+                self._remove(priority, client_id, future)
+            raise
+
+        wait = time.monotonic() - start_time
+        self.admitted += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        return wait
+
+    def release(self, duration: Optional[float] = None) -> None:
+        self.active -= 1
+        if duration is not None:
+            if self.avg_duration is None:
+                self.avg_duration = duration
+            else:
+                self.avg_duration += DURATION_SMOOTHING * (duration - self.avg_duration)
+        while self.active < self.max_active:
+            future = self._pop_next()
+            if future is None:
+                return
+            self.active += 1
+            future.set_result(None)
+
+    def _pop_next(self) -> Optional[asyncio.Future[None]]:
+        for priority in sorted(self._queues, reverse=True):
+            clients = self._queues[priority]
+            if not clients:
+                continue
+            client_id, waiters = clients.popitem(last=False)
+            future = waiters.popleft()
+            if waiters:
+                # Round robin: the client goes to the end of its priority level.
+                clients[client_id] = waiters
+            self.queued -= 1
+            return future
+        return None
+
+    def _remove(self, priority: int, client_id: str, future: asyncio.Future[None]) -> None:
+        clients = self._queues.get(priority, OrderedDict())
+        waiters = clients.get(client_id)
+        if waiters is None or future not in waiters:
+            return
+        waiters.remove(future)
+        if not waiters:
+            del clients[client_id]
+        self.queued -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "queued": self.queued,
+            "max_active": self.max_active,
+            "max_queued": self.max_queued,
+            "queued_by_priority": {
+                priority: sum(len(waiters) for waiters in clients.values())
+                for priority, clients in sorted(self._queues.items(), reverse=True)
+                if clients
+            },
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_wait": self.total_wait / self.admitted if self.admitted else 0.0,
+            "max_wait": self.max_wait,
+            "avg_session_duration": self.avg_duration,
+        }
+
+    async def stats_endpoint(self, request: Request) -> JSONResponse:
+        return JSONResponse(self.stats())
+
+
+async def _read_body(receive: Receive) -> Optional[bytes]:
+    chunks: List[bytes] = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware that puts new agent sessions through an AdmissionController.
+    Priorities from the X-Priority header are capped to max_priority, so by default clients
+    can only lower their own priority.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        controller: AdmissionController,
+        paths: Sequence[str],
+        max_priority: int = 0,
+    ):
+        self.app = app
+        self.controller = controller
+        self.paths = set(paths)
+        self.max_priority = max_priority
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        client = scope.get("client")
+        client_id = headers.get("x-client-id") or (client[0] if client else "unknown")
+        try:
+            priority = min(int(headers.get("x-priority", "0")), self.max_priority)
+        except ValueError:
+            priority = 0
+
+        # The body is read upfront, so a client disconnect can be noticed while queued.
+        body = await _read_body(receive)
+        if body is None:
+            return
+        acquire_task = asyncio.create_task(self.controller.acquire(client_id, priority))
+        disconnect_task: asyncio.Future[Message] = asyncio.ensure_future(receive())
+        tasks: List[asyncio.Future[Any]] = [acquire_task, disconnect_task]
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        if not acquire_task.done():
+            acquire_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await acquire_task
+            return
+        disconnect_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await disconnect_task
+
+        try:
+            wait = acquire_task.result()
+        except QueueFullError as e:
+            response = JSONResponse(
+                {"detail": str(e), **self.controller.stats()},
+                status_code=429,
+                headers={"Retry-After": str(e.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        body_sent = False
+
+        async def receive_body() -> Message:
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        async def send_with_wait(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"x-queue-wait", f"{wait:.3f}".encode()),
+                ]
+            await send(message)
+
+        start_time = time.monotonic()
+        try:
+            await self.app(scope, receive_body, send_with_wait)
+        finally:
+            self.controller.release(time.monotonic() - start_time)
@@ -1,3 +1,4 @@
+from holosophos.agents.base import HolosophosAgent
 from holosophos.agents.librarian import get_librarian_agent
 from holosophos.agents.mle_solver import get_mle_solver_agent
 from holosophos.agents.writer import get_writer_agent
@@ -5,6 +6,7 @@ from holosophos.agents.proposer import get_proposer_agent
 from holosophos.agents.reviewer import get_reviewer_agent
 
 __all__ = [
+    "HolosophosAgent",
     "get_librarian_agent",
     "get_mle_solver_agent",
     "get_writer_agent",
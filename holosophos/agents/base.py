@@ -0,0 +1,318 @@
+import asyncio
+import contextvars
+import json
+import logging
+import time
+from typing import Any, List, Optional, cast
+
+from codearkt.codeact import CodeActAgent, extract_code_from_text
+from codearkt.event_bus import AgentEventBus, EventType
+from codearkt.llm import ChatMessage, ChatMessages
+from codearkt.metrics import TokenUsageStore
+from codearkt.python_executor import ExecResult, PythonExecutor
+from mcp import Tool
+
+from holosophos.blackboard import BLACKBOARD
+from holosophos.budget import Budget, BudgetGovernor, get_session_budget
+from holosophos.compaction import compact_history
+from holosophos.delegation import DELEGATION_TOOLS, get_state_session_id
+from holosophos.llm import CACHED_PROMPT_TOKENS, estimate_cost
+from holosophos.profiler import PROFILER
+from holosophos.settings import settings
+from holosophos.streaming import StreamingEventBus
+from holosophos.workspace import SCRATCH_DIR_NAME, WORKSPACES
+
+# Characters of the last output in the timeout observation.
+TIMEOUT_OUTPUT_CHARS = 4000
+
+# LLM time spent inside the current step, used to separate it from code execution time.
+_STEP_LLM_TIME: contextvars.ContextVar[float] = contextvars.ContextVar("step_llm_time", default=0.0)
+# Budget governor of the current agent run.
+_GOVERNOR: contextvars.ContextVar[Optional[BudgetGovernor]] = contextvars.ContextVar(
+    "governor", default=None
+)
+
+
+class _ErrorRecordingExecutor:
+    """Delegates to the code executor and keeps the error of the last execution for the governor."""
+
+    def __init__(self, executor: PythonExecutor) -> None:
+        self.executor = executor
+        self.error: Optional[str] = None
+
+    async def ainvoke(self, code: str) -> ExecResult:
+        self.error = None
+        try:
+            result = await self.executor.ainvoke(code)
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            raise
+        self.error = result.error
+        return result
+
+
+def _get_text(message: ChatMessage) -> str:
+    if isinstance(message.content, str):
+        return message.content
+    return "\n".join(str(part.get("text", "")) for part in message.content)
+
+
+def _add_task_notice(messages: ChatMessages, notice: str) -> ChatMessages:
+    # Appended to the task, so the system prompt stays the same for every session.
+    if not messages or messages[-1].role != "user":
+        return messages
+    last_message = messages[-1]
+    if isinstance(last_message.content, str):
+        content: Any = last_message.content + notice
+    else:
+        content = [*last_message.content, {"type": "text", "text": notice}]
+    return [*messages[:-1], last_message.model_copy(update={"content": content})]
+
+
+def _add_blackboard_notice(messages: ChatMessages, session_id: str) -> ChatMessages:
+    notice = (
+        f'\n\nSession blackboard (session_id="{session_id}"), shared with all team members. '
+        "Read relevant entries with blackboard_read before redoing the work, "
+        "save your results with blackboard_write and mention their keys in the answer.\n"
+        f"Entries:\n{BLACKBOARD.format(session_id)}"
+    )
+    return _add_task_notice(messages, notice)
+
+
+def _add_workspace_notice(messages: ChatMessages, session_id: str) -> ChatMessages:
+    workspace = WORKSPACES.relative_path(session_id)
+    notice = (
+        f'\n\nSession workspace: "{workspace}". Create all files inside it. '
+        f'Tool paths are relative to the workspace root, so run bash with cwd="{workspace}" '
+        f'and pass text_editor paths like "{workspace}/solution.py". '
+        "Other paths in the task are relative to the workspace root."
+    )
+    if WORKSPACES.scratch_root is not None:
+        notice += f' Put large temporary data to "{workspace}/{SCRATCH_DIR_NAME}".'
+    return _add_task_notice(messages, notice)
+
+
+def get_timeout_observation(agent_name: str, timeout: float, last_output: Optional[str]) -> str:
+    """Answer of an agent stopped by its hard timeout, the manager gets it as a tool result."""
+    return json.dumps(
+        {
+            "status": "timed_out",
+            "agent": agent_name,
+            "timeout_seconds": timeout,
+            "last_output": (last_output or "")[-TIMEOUT_OUTPUT_CHARS:],
+        },
+        ensure_ascii=False,
+    )
+
+
+class HolosophosAgent(CodeActAgent):
+    # Set by compose_main_agent, None means no agent-level limits.
+    budget: Optional[Budget] = None
+    timeout: Optional[float] = None
+
+    async def ainvoke(
+        self,
+        messages: ChatMessages,
+        session_id: str,
+        event_bus: AgentEventBus | None = None,
+        token_usage_store: TokenUsageStore | None = None,
+        server_host: str | None = None,
+        server_port: int | None = None,
+    ) -> str:
+        # Delegated runs share the blackboard, budgets, profile and workspace of their parent.
+        state_session_id = get_state_session_id(session_id)
+        stats = PROFILER.agent(state_session_id, self.name)
+        stats.runs += 1
+        governor = BudgetGovernor(
+            state_session_id,
+            self.name,
+            agent_budget=self.budget or Budget(),
+            session_budget=get_session_budget(),
+            warning_fraction=settings.BUDGET_WARNING_FRACTION,
+            max_repeats=settings.LOOP_MAX_REPEATS,
+        )
+        governor_token = _GOVERNOR.set(governor)
+        if "blackboard_read" in self.tool_names:
+            messages = _add_blackboard_notice(messages, state_session_id)
+        elif set(DELEGATION_TOOLS) & set(self.tool_names):
+            messages = _add_task_notice(messages, f'\n\nSession id: "{state_session_id}".')
+        if settings.SESSION_WORKSPACES_ENABLED:
+            # Every agent holds the workspace, so it lives until the whole session ends.
+            await asyncio.to_thread(WORKSPACES.acquire, state_session_id)
+            if set(settings.SESSION_WORKSPACE_TOOLS) & set(self.tool_names):
+                messages = _add_workspace_notice(messages, state_session_id)
+        start_time = time.perf_counter()
+        try:
+            # Cancellation stops the executor code and in-flight tool calls of this run.
+            async with asyncio.timeout(self.timeout) as deadline:
+                return await super().ainvoke(
+                    messages,
+                    session_id=session_id,
+                    event_bus=event_bus,
+                    token_usage_store=token_usage_store,
+                    server_host=server_host,
+                    server_port=server_port,
+                )
+        except TimeoutError:
+            if not deadline.expired() or self.timeout is None:
+                raise
+            stats.timeouts += 1
+            self.logger.warning(f"Agent {self.name} session {session_id} timed out")
+            self._cancel_children(event_bus, session_id, state_session_id)
+            return get_timeout_observation(self.name, self.timeout, governor.last_output)
+        except asyncio.CancelledError:
+            self._cancel_children(event_bus, session_id, state_session_id)
+            raise
+        finally:
+            _GOVERNOR.reset(governor_token)
+            if settings.SESSION_WORKSPACES_ENABLED:
+                await asyncio.to_thread(WORKSPACES.release, state_session_id)
+            stats.wall_time += time.perf_counter() - start_time
+            self.logger.info(f"Agent {self.name} session {session_id}: {stats.describe()}")
+            if settings.PROFILE_DIR:
+                PROFILER.save(state_session_id, settings.PROFILE_DIR)
+
+    def _cancel_children(
+        self, event_bus: AgentEventBus | None, session_id: str, state_session_id: str
+    ) -> None:
+        # Team members run as separate tasks of the agents app, they outlive the cancelled code.
+        if not isinstance(event_bus, StreamingEventBus):
+            return
+        delegates = bool(set(DELEGATION_TOOLS) & set(self.tool_names))
+        cancelled = event_bus.cancel_children(
+            session_id,
+            [agent.name for agent in self.managed_agents or []],
+            parent_session_id=state_session_id if delegates else None,
+        )
+        if cancelled:
+            self.logger.info(f"Agent {self.name} session {session_id}: cancelled {cancelled} runs")
+
+    async def _get_tools(self, server_host: str | None, server_port: int | None) -> List[Tool]:
+        # The system prompt lists tools, a stable order keeps it byte-identical across sessions.
+        tools = await super()._get_tools(server_host=server_host, server_port=server_port)
+        return sorted(tools, key=lambda tool: tool.name)
+
+    async def _run_llm(
+        self,
+        messages: ChatMessages,
+        session_id: str,
+        excluded_stop_sequences: List[str],
+        included_stop_sequences: List[str],
+        event_bus: AgentEventBus | None = None,
+        token_usage_store: TokenUsageStore | None = None,
+        event_type: EventType = EventType.OUTPUT,
+    ) -> str:
+        stats = PROFILER.agent(get_state_session_id(session_id), self.name)
+        keep_last = settings.HISTORY_COMPACTION_KEEP_LAST.get(self.name)
+        if keep_last is not None:
+            messages, saved_tokens = compact_history(
+                messages,
+                keep_last=keep_last,
+                batch_size=settings.HISTORY_COMPACTION_BATCH_SIZE,
+                digest_chars=settings.HISTORY_COMPACTION_DIGEST_CHARS,
+                max_observation_chars=settings.HISTORY_COMPACTION_MAX_OBSERVATION_CHARS,
+            )
+            stats.compaction_saved_tokens += saved_tokens
+
+        call_usage_store = TokenUsageStore()
+        cached_tokens_token = CACHED_PROMPT_TOKENS.set(0)
+        start_time = time.perf_counter()
+        try:
+            return await super()._run_llm(
+                messages=messages,
+                session_id=session_id,
+                excluded_stop_sequences=excluded_stop_sequences,
+                included_stop_sequences=included_stop_sequences,
+                event_bus=event_bus,
+                token_usage_store=call_usage_store,
+                event_type=event_type,
+            )
+        finally:
+            elapsed = time.perf_counter() - start_time
+            _STEP_LLM_TIME.set(_STEP_LLM_TIME.get() + elapsed)
+            usage = call_usage_store.get(session_id)
+            stats.model_name = self.llm._model_name
+            stats.llm_calls += 1
+            stats.llm_time += elapsed
+            stats.prompt_tokens += usage.prompt_tokens
+            stats.completion_tokens += usage.completion_tokens
+            stats.cached_prompt_tokens += CACHED_PROMPT_TOKENS.get()
+            CACHED_PROMPT_TOKENS.reset(cached_tokens_token)
+            cost = estimate_cost(stats.model_name, usage.prompt_tokens, usage.completion_tokens)
+            stats.cost += cost or 0.0
+            if token_usage_store is not None:
+                await token_usage_store.add(
+                    session_id, usage.prompt_tokens, usage.completion_tokens
+                )
+
+    async def _step(
+        self,
+        messages: ChatMessages,
+        python_executor: PythonExecutor,
+        session_id: str,
+        run_id: str,
+        event_bus: AgentEventBus | None = None,
+        token_usage_store: TokenUsageStore | None = None,
+        step_number: int | None = None,
+    ) -> ChatMessages:
+        token = _STEP_LLM_TIME.set(0.0)
+        start_time = time.perf_counter()
+        governor = _GOVERNOR.get()
+        try:
+            stop_reason = governor.stop_reason() if governor else None
+            if stop_reason is not None:
+                self._log(
+                    f"Forcing the final answer: {stop_reason}",
+                    run_id=run_id,
+                    session_id=session_id,
+                    level=logging.WARNING,
+                )
+                PROFILER.agent(get_state_session_id(session_id), self.name).forced_stops += 1
+                notice = ChatMessage(
+                    role="user",
+                    content=f"Stop: {stop_reason}. Do not call tools anymore, "
+                    "give the best final answer based on what you already know.",
+                )
+                return await self._handle_final_message(
+                    messages + [notice],
+                    session_id=session_id,
+                    run_id=run_id,
+                    event_bus=event_bus,
+                    token_usage_store=token_usage_store,
+                )
+
+            executor = _ErrorRecordingExecutor(python_executor)
+            new_messages = await super()._step(
+                messages,
+                python_executor=cast(PythonExecutor, executor),
+                session_id=session_id,
+                run_id=run_id,
+                event_bus=event_bus,
+                token_usage_store=token_usage_store,
+                step_number=step_number,
+            )
+            if governor is None or not new_messages:
+                # Failed LLM calls are retried by the rate limiter, they are not agent loops.
+                return new_messages
+            governor.last_output = _get_text(new_messages[0])
+            if new_messages[-1].role == "assistant":
+                return new_messages
+
+            code_action: Optional[str] = None
+            if len(new_messages) == 2:
+                code_action = extract_code_from_text(
+                    _get_text(new_messages[0]),
+                    self.prompts.begin_code_sequence,
+                    self.prompts.end_code_sequence,
+                )
+            # Only failures of the execution itself count, outputs that mention errors do not.
+            governor.observe(code_action, executor.error if code_action is not None else None)
+            warning = governor.warning(step_number, self.max_iterations)
+            if warning is not None:
+                new_messages.append(ChatMessage(role="user", content=warning))
+            return new_messages
+        finally:
+            stats = PROFILER.agent(get_state_session_id(session_id), self.name)
+            stats.iterations += 1
+            stats.exec_time += time.perf_counter() - start_time - _STEP_LLM_TIME.get()
+            _STEP_LLM_TIME.reset(token)
@@ -1,11 +1,10 @@
 import logging
 from typing import Optional, Sequence
 
-from codearkt.codeact import CodeActAgent
-from codearkt.prompt_storage import PromptStorage
 from codearkt.llm import LLM
 
-from holosophos.files import PROMPTS_DIR_PATH
+from holosophos.agents.base import HolosophosAgent
+from holosophos.utils import load_prompts
 
 NAME = "mle_solver"
 DESCRIPTION = """This team member is an engineer who writes code and runs computational experiments.
@@ -22,12 +21,12 @@ def get_mle_solver_agent(
     tools: Sequence[str],
     verbosity_level: int = logging.INFO,
     is_remote: bool = False,
-) -> CodeActAgent:
+) -> HolosophosAgent:
     if is_remote:
-        prompts = PromptStorage.load(PROMPTS_DIR_PATH / "mle_solver_remote.yaml")
+        prompts = load_prompts("mle_solver_remote")
     else:
-        prompts = PromptStorage.load(PROMPTS_DIR_PATH / "mle_solver.yaml")
-    return CodeActAgent(
+        prompts = load_prompts("mle_solver")
+    return HolosophosAgent(
         name=NAME,
         description=DESCRIPTION,
         tool_names=tools,
@@ -1,11 +1,10 @@
 import logging
 from typing import Optional, Sequence
 
-from codearkt.codeact import CodeActAgent
-from codearkt.prompt_storage import PromptStorage
 from codearkt.llm import LLM
 
-from holosophos.files import PROMPTS_DIR_PATH
+from holosophos.agents.base import HolosophosAgent
+from holosophos.utils import load_prompts
 
 
 NAME = "proposer"
@@ -22,9 +21,9 @@ def get_proposer_agent(
     planning_interval: Optional[int],
     tools: Sequence[str],
     verbosity_level: int = logging.INFO,
-) -> CodeActAgent:
-    prompts = PromptStorage.load(PROMPTS_DIR_PATH / "proposer.yaml")
-    return CodeActAgent(
+) -> HolosophosAgent:
+    prompts = load_prompts("proposer")
+    return HolosophosAgent(
         name=NAME,
         description=DESCRIPTION,
         tool_names=tools,
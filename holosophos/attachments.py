@@ -0,0 +1,105 @@
+import errno
+import fcntl
+import logging
+import os
+import re
+import shutil
+import time
+from pathlib import Path
+from typing import List, Sequence
+
+from holosophos.settings import settings
+
+# ioctl request of Linux for cloning a whole file (copy-on-write), from linux/fs.h.
+FICLONE = 0x40049409
+UNSAFE_NAME_RE = re.compile(r"[^\w.-]")
+
+logger = logging.getLogger(__name__)
+
+
+def _reflink(source: Path, target: Path) -> None:
+    with open(source, "rb") as src, open(target, "wb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            target.unlink()
+            raise
+
+
+def link_or_copy(source: Path, target: Path, modes: Sequence[str]) -> str:
+    """
+    Put a file to the target path with the first mode that works: "reflink", "hardlink" or "copy".
+    Reflinks and hardlinks only work on the same filesystem, "copy" always works.
+    Returns the mode that was used.
+    """
+    for mode in modes:
+        try:
+            if mode == "reflink":
+                _reflink(source, target)
+            elif mode == "hardlink":
+                os.link(source, target)
+            elif mode == "copy":
+                shutil.copyfile(source, target)
+            else:
+                raise ValueError(f"Unknown staging mode: {mode}")
+            return mode
+        except OSError as e:
+            if e.errno == errno.ENOENT:
+                raise
+            logger.debug(f"Staging {source} with {mode} failed: {e}")
+    raise OSError(f"Can not stage {source} with any of {list(modes)}")
+
+
+class AttachmentStager:
+    """
+    Stages task attachments into per-task subdirectories of the workspace, right before a task
+    starts, and removes them when it ends. Files are reflinked instead of copied when possible.
+    Hardlinks share content with the source, so add "hardlink" to modes only if agents
+    never change attachments in place.
+    """
+
+    def __init__(self, root_dir: str | Path, modes: Sequence[str] = ("reflink", "copy")):
+        self.root_dir = Path(root_dir)
+        self.modes = modes
+
+    def task_dir(self, task_id: str) -> Path:
+        return self.root_dir / UNSAFE_NAME_RE.sub("_", task_id)
+
+    def path(self, task_id: str, source: str | Path) -> Path:
+        """Path of a staged attachment, it is known before the attachment is staged."""
+        return self.task_dir(task_id) / Path(source).name
+
+    def stage(self, task_id: str, sources: Sequence[str | Path]) -> List[Path]:
+        task_dir = self.task_dir(task_id)
+        task_dir.mkdir(parents=True, exist_ok=True)
+        paths = []
+        for source in sources:
+            target = self.path(task_id, source)
+            if not target.exists():
+                mode = link_or_copy(Path(source), target, self.modes)
+                logger.debug(f"Staged {source} to {target} with {mode}")
+            paths.append(target)
+        return paths
+
+    def cleanup(self, task_id: str) -> None:
+        shutil.rmtree(self.task_dir(task_id), ignore_errors=True)
+
+    def collect_garbage(self, max_age: float) -> int:
+        """Remove task directories older than max_age seconds, left by crashed runs."""
+        if not self.root_dir.exists():
+            return 0
+        removed = 0
+        deadline = time.time() - max_age
+        for task_dir in self.root_dir.iterdir():
+            if task_dir.is_dir() and task_dir.stat().st_mtime < deadline:
+                shutil.rmtree(task_dir, ignore_errors=True)
+                removed += 1
+        return removed
+
+
+def get_attachment_stager() -> AttachmentStager:
+    return AttachmentStager(
+        Path(settings.WORKSPACE_DIR) / settings.ATTACHMENTS_DIR,
+        modes=settings.ATTACHMENT_STAGING_MODES,
+    )
@@ -0,0 +1,293 @@
+import asyncio
+import contextlib
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import (
+    Any,
+    AsyncGenerator,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from tqdm import tqdm
+
+from codearkt.codeact import CodeActAgent
+from codearkt.llm import ChatMessage
+from codearkt.server import _shutdown_server, _start_temporary_server
+from codearkt.util import get_unique_id
+
+from holosophos.attachments import AttachmentStager, get_attachment_stager
+from holosophos.profiler import PROFILER
+from holosophos.tools_server import install_server_extensions
+
+QUEUE_POLL_INTERVAL = 1.0
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BatchTask:
+    task_id: str
+    query: str
+    # Files staged into the workspace right before the task starts and removed after it.
+    attachments: Tuple[str, ...] = ()
+
+
+def read_jsonl(path: Path) -> List[Dict[str, Any]]:
+    if not path.exists():
+        return []
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                # A crash can leave a truncated last line, it will be rerun.
+                continue
+    return records
+
+
+def append_jsonl(path: Path, record: Dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        f.flush()
+
+
+def read_completed_ids(path: Path) -> Set[str]:
+    return {str(r["task_id"]) for r in read_jsonl(path) if "task_id" in r}
+
+
+def sort_jsonl(path: Path, task_ids: Sequence[str]) -> None:
+    """Rewrite records in the order of task_ids, unknown records go last in their current order."""
+    order = {task_id: index for index, task_id in enumerate(task_ids)}
+    records = read_jsonl(path)
+    if not records:
+        return
+    records.sort(key=lambda r: order.get(str(r.get("task_id")), len(order)))
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, path)
+
+
+async def iter_batch(
+    tasks: Iterable[BatchTask],
+    agent: CodeActAgent,
+    mcp_config: Optional[Dict[str, Any]] = None,
+    max_concurrency: int = 5,
+    task_timeout: Optional[int] = None,
+    additional_tools: Optional[Dict[str, Callable[..., Any]]] = None,
+    add_mcp_server_prefixes: bool = True,
+    attachment_stager: Optional[AttachmentStager] = None,
+) -> AsyncGenerator[Dict[str, Any], None]:
+    """
+    Run tasks concurrently and yield a record for each one as soon as it finishes.
+    Tasks are taken from the iterable only when a slot is free, so inputs can be streamed.
+    Attachments of a task are staged only while it runs, see AttachmentStager.
+    """
+    stager = attachment_stager or get_attachment_stager()
+    task_iterator = iter(tasks)
+    first_task = next(task_iterator, None)
+    if first_task is None:
+        return
+    task_iterator = itertools.chain([first_task], task_iterator)
+
+    install_server_extensions()
+    server, server_task, host, port, token_usage_store = await _start_temporary_server(
+        agent,
+        mcp_config=mcp_config,
+        additional_tools=additional_tools,
+        add_mcp_server_prefixes=add_mcp_server_prefixes,
+    )
+
+    async def _invoke(task: BatchTask, session_id: str) -> str:
+        if task.attachments:
+            await asyncio.to_thread(stager.stage, task.task_id, task.attachments)
+        return await agent.ainvoke(
+            [ChatMessage(role="user", content=task.query)],
+            session_id=session_id,
+            server_host=host,
+            server_port=port,
+            token_usage_store=token_usage_store,
+        )
+
+    async def _run_single(task: BatchTask) -> Dict[str, Any]:
+        start_time = time.time()
+        session_id = get_unique_id()
+        agent_task = asyncio.create_task(_invoke(task, session_id))
+        result: str
+        try:
+            if task_timeout and task_timeout > 0:
+                result = await asyncio.wait_for(agent_task, timeout=task_timeout)
+            else:
+                result = await agent_task
+        except asyncio.CancelledError:
+            agent_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await agent_task
+            raise
+        except asyncio.TimeoutError:
+            result = f"Timeout after {task_timeout}"
+        except Exception as e:
+            result = f"Error: {e}"
+        finally:
+            if task.attachments:
+                await asyncio.to_thread(stager.cleanup, task.task_id)
+        token_usage = (await token_usage_store.pop(session_id)).model_dump()
+        return {
+            "task_id": task.task_id,
+            "query": task.query,
+            "result": result,
+            "session_id": session_id,
+            "token_usage": token_usage,
+            "duration": round(time.time() - start_time, 2),
+            "profile": PROFILER.summary(session_id)["agents"],
+        }
+
+    running: Set[asyncio.Task[Dict[str, Any]]] = set()
+
+    def _fill() -> None:
+        while max_concurrency <= 0 or len(running) < max_concurrency:
+            task = next(task_iterator, None)
+            if task is None:
+                return
+            running.add(asyncio.create_task(_run_single(task)))
+
+    try:
+        _fill()
+        while running:
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for finished in done:
+                running.discard(finished)
+            _fill()
+            for finished in done:
+                yield finished.result()
+    finally:
+        for running_task in running:
+            running_task.cancel()
+        with contextlib.suppress(Exception):
+            await asyncio.gather(*running, return_exceptions=True)
+        with contextlib.suppress(asyncio.CancelledError):
+            await asyncio.shield(_shutdown_server(server, server_task))
+
+
+def _run_worker(
+    worker_id: int,
+    tasks: Sequence[BatchTask],
+    agent_factory: Callable[[], CodeActAgent],
+    messages: "multiprocessing.Queue[Tuple[str, int, Any]]",
+    batch_kwargs: Dict[str, Any],
+) -> None:
+    async def _run() -> None:
+        # Every worker has its own agent graph, tools server and MCP sessions.
+        agent = agent_factory()
+        async for record in iter_batch(tasks, agent, **batch_kwargs):
+            messages.put(("record", worker_id, {**record, "worker_id": worker_id}))
+
+    try:
+        asyncio.run(_run())
+    except BaseException as e:
+        messages.put(("error", worker_id, repr(e)))
+    finally:
+        messages.put(("done", worker_id, None))
+
+
+async def iter_batch_processes(
+    tasks: Sequence[BatchTask],
+    agent_factory: Callable[[], CodeActAgent],
+    num_workers: int,
+    mcp_config: Optional[Dict[str, Any]] = None,
+    max_concurrency: int = 5,
+    task_timeout: Optional[int] = None,
+    add_mcp_server_prefixes: bool = True,
+    show_progress: bool = True,
+) -> AsyncGenerator[Dict[str, Any], None]:
+    """
+    Shard tasks across worker processes, each running iter_batch with max_concurrency tasks,
+    and yield records as soon as they finish in any worker.
+
+    Workers are spawned, so agent_factory must be picklable (a module-level function or a
+    functools.partial of one), and settings are read from the environment in every worker.
+    Tasks of a crashed worker are not yielded and are rerun on resume.
+    """
+    if not tasks:
+        return
+    num_workers = max(1, min(num_workers, len(tasks)))
+    # Round robin, so long and short tasks from the same part of a dataset are spread out.
+    shards = [list(tasks[worker_id::num_workers]) for worker_id in range(num_workers)]
+    batch_kwargs = {
+        "mcp_config": mcp_config,
+        "max_concurrency": max_concurrency,
+        "task_timeout": task_timeout,
+        "add_mcp_server_prefixes": add_mcp_server_prefixes,
+    }
+
+    context = multiprocessing.get_context("spawn")
+    messages: "multiprocessing.Queue[Tuple[str, int, Any]]" = context.Queue()
+    processes = [
+        context.Process(
+            target=_run_worker,
+            args=(worker_id, shard, agent_factory, messages, batch_kwargs),
+            daemon=True,
+        )
+        for worker_id, shard in enumerate(shards)
+    ]
+    for process in processes:
+        process.start()
+
+    finished = [0] * num_workers
+    active = set(range(num_workers))
+    progress = tqdm(total=len(tasks), disable=not show_progress)
+
+    def _update_progress() -> None:
+        progress.set_postfix_str(
+            " ".join(f"w{i}: {finished[i]}/{len(shard)}" for i, shard in enumerate(shards))
+        )
+
+    try:
+        while active:
+            try:
+                kind, worker_id, payload = await asyncio.to_thread(
+                    messages.get, True, QUEUE_POLL_INTERVAL
+                )
+            except queue.Empty:
+                for worker_id in list(active):
+                    if not processes[worker_id].is_alive():
+                        exit_code = processes[worker_id].exitcode
+                        logger.warning(f"Batch worker {worker_id} exited with code {exit_code}")
+                        active.discard(worker_id)
+                continue
+            if kind == "record":
+                finished[worker_id] += 1
+                progress.update(1)
+                _update_progress()
+                yield payload
+            elif kind == "error":
+                logger.warning(f"Batch worker {worker_id} failed: {payload}")
+            elif kind == "done":
+                active.discard(worker_id)
+    finally:
+        progress.close()
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            process.join()
@@ -0,0 +1,115 @@
+import difflib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+MAX_SESSIONS = 1000
+PREVIEW_CHARS = 100
+MAX_LISTED_ENTRIES = 50
+
+
+@dataclass
+class Entry:
+    value: str
+    description: str
+    updated_at: float
+
+
+class Blackboard:
+    """
+    Artifacts shared by all agents of a session: papers, search results, files, experiment results.
+    Agents save results under keys and pass keys to each other instead of copying the content.
+    """
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS) -> None:
+        self.max_sessions = max_sessions
+        self.sessions: OrderedDict[str, Dict[str, Entry]] = OrderedDict()
+
+    def _entries(self, session_id: str) -> Dict[str, Entry]:
+        if session_id not in self.sessions:
+            self.sessions[session_id] = {}
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+        self.sessions.move_to_end(session_id)
+        return self.sessions[session_id]
+
+    def write(self, session_id: str, key: str, value: str, description: str = "") -> None:
+        self._entries(session_id)[key] = Entry(value, description, time.time())
+
+    def read(self, session_id: str, key: str) -> Optional[str]:
+        entry = self.sessions.get(session_id, {}).get(key)
+        return entry.value if entry else None
+
+    def list(self, session_id: str, prefix: str = "") -> List[Dict[str, Any]]:
+        entries = self.sessions.get(session_id, {})
+        return [
+            {
+                "key": key,
+                "description": entry.description or _preview(entry.value),
+                "chars": len(entry.value),
+            }
+            for key, entry in sorted(entries.items())
+            if key.startswith(prefix)
+        ]
+
+    def format(self, session_id: str) -> str:
+        """Short listing of the entries for the task message of an agent."""
+        entries = self.list(session_id)
+        lines = [f"- {e['key']}: {e['description']}" for e in entries[-MAX_LISTED_ENTRIES:]]
+        if len(entries) > MAX_LISTED_ENTRIES:
+            lines.insert(0, f"- ...{len(entries) - MAX_LISTED_ENTRIES} more, see blackboard_list")
+        return "\n".join(lines) if lines else "(empty)"
+
+
+def _preview(value: str) -> str:
+    value = " ".join(value.split())
+    return value if len(value) <= PREVIEW_CHARS else value[:PREVIEW_CHARS] + "..."
+
+
+BLACKBOARD = Blackboard()
+
+
+def blackboard_write(session_id: str, key: str, value: str, description: str = "") -> str:
+    """
+    Save an artifact to the shared blackboard of the session, so other team members can use it.
+    Save everything that might be needed later: found papers with ids and titles, search results,
+    names of written files, experiment results. Writing an existing key replaces the entry.
+
+    Args:
+        session_id: Session id from the task message.
+        key: Short hierarchical key, for example "papers/vq-vae" or "experiments/baseline".
+        value: Content of the artifact, use json.dumps for structured data.
+        description: One line description of the artifact.
+    """
+    BLACKBOARD.write(session_id, key, value, description)
+    return f"Saved {key} ({len(value)} characters)"
+
+
+def blackboard_read(session_id: str, key: str) -> str:
+    """
+    Read an artifact from the shared blackboard of the session.
+    Read entries mentioned in the task before doing the work again.
+
+    Args:
+        session_id: Session id from the task message.
+        key: Key of the entry.
+    """
+    value = BLACKBOARD.read(session_id, key)
+    if value is not None:
+        return value
+    keys = [entry["key"] for entry in BLACKBOARD.list(session_id)]
+    close_keys = difflib.get_close_matches(key, keys, n=5, cutoff=0.5)
+    raise KeyError(f"No entry {key} on the blackboard, similar keys: {close_keys}")
+
+
+def blackboard_list(session_id: str, prefix: str = "") -> List[Dict[str, Any]]:
+    """
+    List artifacts on the shared blackboard of the session.
+    Returns a list of entries with "key", "description" and "chars" (size of the value).
+
+    Args:
+        session_id: Session id from the task message.
+        prefix: Optional key prefix, for example "papers/".
+    """
+    return BLACKBOARD.list(session_id, prefix)
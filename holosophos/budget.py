@@ -0,0 +1,127 @@
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Set, Tuple
+
+from holosophos.profiler import PROFILER
+from holosophos.settings import settings
+
+
+@dataclass
+class Budget:
+    tokens: Optional[int] = None
+    cost: Optional[float] = None
+    time: Optional[float] = None
+
+
+class BudgetGovernor:
+    """
+    Tracks one agent run against its own budget and the budget of the whole session.
+    Also detects loops: the same code action or the same error repeated several times in a row.
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        agent_name: str,
+        agent_budget: Budget,
+        session_budget: Budget,
+        warning_fraction: float,
+        max_repeats: int,
+    ) -> None:
+        self.session_id = session_id
+        self.agent_name = agent_name
+        self.agent_budget = agent_budget
+        self.session_budget = session_budget
+        self.warning_fraction = warning_fraction
+        self.max_repeats = max_repeats
+        stats = PROFILER.agent(session_id, agent_name)
+        self.start_tokens = stats.prompt_tokens + stats.completion_tokens
+        self.start_cost = stats.cost
+        self.start_time = time.monotonic()
+        self.last_action: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self.repeats = 0
+        self.warned: Set[str] = set()
+        # Reported if the run is stopped by a hard timeout.
+        self.last_output: Optional[str] = None
+
+    def _usage(self) -> List[Tuple[str, float, Optional[float]]]:
+        stats = PROFILER.agent(self.session_id, self.agent_name)
+        session_agents = PROFILER.sessions.get(self.session_id, {}).values()
+        session_start = PROFILER.session_start.get(self.session_id, time.time())
+        return [
+            (
+                "agent tokens",
+                stats.prompt_tokens + stats.completion_tokens - self.start_tokens,
+                self.agent_budget.tokens,
+            ),
+            ("agent cost", stats.cost - self.start_cost, self.agent_budget.cost),
+            ("agent time", time.monotonic() - self.start_time, self.agent_budget.time),
+            (
+                "session tokens",
+                sum(a.prompt_tokens + a.completion_tokens for a in session_agents),
+                self.session_budget.tokens,
+            ),
+            ("session cost", sum(a.cost for a in session_agents), self.session_budget.cost),
+            ("session time", time.time() - session_start, self.session_budget.time),
+        ]
+
+    def observe(self, code_action: Optional[str], error: Optional[str]) -> None:
+        is_repeat = (code_action is not None and code_action == self.last_action) or (
+            error is not None and error == self.last_error
+        )
+        self.repeats = self.repeats + 1 if is_repeat else 0
+        if not is_repeat:
+            self.warned.discard("loop")
+        self.last_action = code_action
+        self.last_error = error
+
+    def stop_reason(self) -> Optional[str]:
+        for name, used, limit in self._usage():
+            if limit is not None and used >= limit:
+                return f"{name} budget is spent ({used:.0f} of {limit:.0f})"
+        if self.repeats + 1 >= self.max_repeats:
+            return f"the same action or error was repeated {self.repeats + 1} times"
+        return None
+
+    def warning(self, step_number: Optional[int], max_iterations: int) -> Optional[str]:
+        usage = list(self._usage())
+        if step_number is not None:
+            usage.append(("iterations", step_number, max_iterations))
+        for name, used, limit in usage:
+            if limit is None or used < limit * self.warning_fraction or name in self.warned:
+                continue
+            self.warned.add(name)
+            return (
+                f"Budget warning: {used / limit:.0%} of the {name} budget is spent. "
+                "Wrap up: finish the most important remaining steps and give the final answer soon."
+            )
+        if self.repeats + 2 == self.max_repeats and "loop" not in self.warned:
+            self.warned.add("loop")
+            return (
+                "Loop warning: you repeated the same action or got the same error again. "
+                "Change the approach, otherwise the run will be stopped."
+            )
+        return None
+
+
+def get_session_budget() -> Budget:
+    return Budget(
+        tokens=settings.SESSION_TOKEN_BUDGET,
+        cost=settings.SESSION_COST_BUDGET,
+        time=settings.SESSION_TIME_BUDGET,
+    )
+
+
+def get_agent_budget(agent_name: str) -> Budget:
+    return Budget(
+        tokens=settings.AGENT_TOKEN_BUDGETS.get(agent_name),
+        cost=settings.AGENT_COST_BUDGETS.get(agent_name),
+        time=settings.AGENT_TIME_BUDGETS.get(agent_name),
+    )
+
+
+def get_agent_timeout(agent_name: str) -> Optional[float]:
+    """Hard timeout of a single agent run from <AGENT_NAME>_TIMEOUT, for example MLE_SOLVER_TIMEOUT."""
+    timeout: Optional[float] = getattr(settings, f"{agent_name.upper()}_TIMEOUT", None)
+    return timeout
@@ -0,0 +1,73 @@
+from typing import Any, Dict, List, Tuple
+
+from codearkt.llm import ChatMessage, ChatMessages
+
+# Rough estimate for reports, exact tokenization of every observation is too slow.
+CHARS_PER_TOKEN = 4
+
+
+def make_digest(text: str, max_chars: int) -> Tuple[str, int]:
+    """Keep the head and the tail of a long text, return the digest and the estimated tokens saved."""
+    if len(text) <= max_chars:
+        return text, 0
+    head_chars = max_chars * 2 // 3
+    tail_chars = max_chars - head_chars
+    omitted = len(text) - head_chars - tail_chars
+    digest = (
+        text[:head_chars]
+        + f"\n...[{omitted} characters omitted]...\n"
+        + (text[-tail_chars:] if tail_chars else "")
+    )
+    return digest, max(0, len(text) - len(digest)) // CHARS_PER_TOKEN
+
+
+def _compact_message(message: ChatMessage, max_chars: int) -> Tuple[ChatMessage, int]:
+    if isinstance(message.content, str):
+        digest, saved = make_digest(message.content, max_chars)
+        return message.model_copy(update={"content": digest}), saved
+
+    total_saved = 0
+    content: List[Dict[str, Any]] = []
+    for part in message.content:
+        if part.get("type") == "text" and isinstance(part.get("text"), str):
+            digest, saved = make_digest(part["text"], max_chars)
+            part = {**part, "text": digest}
+            total_saved += saved
+        content.append(part)
+    return message.model_copy(update={"content": content}), total_saved
+
+
+def compact_history(
+    messages: ChatMessages,
+    keep_last: int,
+    batch_size: int,
+    digest_chars: int,
+    max_observation_chars: int,
+) -> Tuple[ChatMessages, int]:
+    """
+    Shrink observations in the agent history, return new messages and the number of tokens saved.
+
+    System messages and the task are never changed. The last observations keep up to
+    max_observation_chars characters, older ones are cut to digest_chars characters.
+    Old observations are compacted batch_size at a time, so the history prefix stays the same
+    for several steps and provider prompt caching keeps working.
+    """
+    prefix_length = 0
+    while prefix_length < len(messages) and messages[prefix_length].role in ("system", "developer"):
+        prefix_length += 1
+    if prefix_length < len(messages) and messages[prefix_length].role == "user":
+        prefix_length += 1
+
+    observations = [
+        index for index in range(prefix_length, len(messages)) if messages[index].role == "user"
+    ]
+    old_count = max(0, len(observations) - keep_last) // max(1, batch_size) * max(1, batch_size)
+    old_observations = set(observations[:old_count])
+
+    total_saved = 0
+    compacted = list(messages)
+    for index in observations:
+        max_chars = digest_chars if index in old_observations else max_observation_chars
+        compacted[index], saved = _compact_message(messages[index], max_chars)
+        total_saved += saved
+    return compacted, total_saved
@@ -0,0 +1,220 @@
+import asyncio
+import contextlib
+import contextvars
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from codearkt.event_bus import AgentEvent, EventType
+from codearkt.util import get_unique_id
+from fastmcp.server.dependencies import get_http_request
+
+from holosophos.settings import settings
+
+DEFAULT_MAX_CONCURRENCY = 1
+MAX_BACKGROUND_TASKS = 100
+DELEGATION_TOOLS = ("delegate_parallel", "delegate_start")
+# Delegated runs get their own session id for events and cancellation,
+# and the id of the session that delegated them in this header.
+PARENT_SESSION_HEADER = "x-parent-session-id"
+
+# Parent session of the current delegated run, set by the agent endpoint.
+PARENT_SESSION_ID: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "parent_session_id", default=None
+)
+
+_SEMAPHORES: Dict[Tuple[int, str], asyncio.Semaphore] = {}
+
+
+def _get_semaphore(agent_name: str) -> asyncio.Semaphore:
+    key = (id(asyncio.get_running_loop()), agent_name)
+    if key not in _SEMAPHORES:
+        limit = settings.PARALLEL_DELEGATION_MAX_CONCURRENCY.get(
+            agent_name, DEFAULT_MAX_CONCURRENCY
+        )
+        _SEMAPHORES[key] = asyncio.Semaphore(max(1, limit))
+    return _SEMAPHORES[key]
+
+
+def get_state_session_id(session_id: str) -> str:
+    """Session that owns the blackboard, budgets, profile and workspace of the current run."""
+    return PARENT_SESSION_ID.get() or session_id
+
+
+def _get_agents_url() -> str:
+    # The tools server and the agents app are the same process and port.
+    request = get_http_request()
+    server = request.scope.get("server")
+    port = server[1] if server else request.url.port
+    return f"http://localhost:{port}/agents"
+
+
+async def delegate_parallel(session_id: str, agent_name: str, tasks: List[str]) -> List[str]:
+    """
+    Run several independent tasks with the same team member concurrently.
+    Use it when sub-tasks do not depend on each other,
+    for example collecting relevant papers for several proposals.
+    Every task is solved by a separate instance of the team member that does not see other tasks,
+    so each task should be fully self-contained.
+    Returns a list of answers in the same order as the tasks.
+    All instances share the session blackboard and workspace.
+
+    Args:
+        session_id: Session id from the task message.
+        agent_name: Name of the team member without the "agent__" prefix, for example "librarian".
+        tasks: List of detailed task descriptions, one per team member instance.
+    """
+    agents_url = _get_agents_url()
+    semaphore = _get_semaphore(agent_name)
+
+    async def _run_single(client: httpx.AsyncClient, task: str) -> str:
+        run_id = get_unique_id()
+        async with semaphore:
+            try:
+                response = await client.post(
+                    f"{agents_url}/{agent_name}",
+                    json={
+                        "messages": [{"role": "user", "content": task}],
+                        "session_id": run_id,
+                        "stream": False,
+                    },
+                )
+                response.raise_for_status()
+                return str(response.json())
+            except Exception as e:
+                return f"Error: {e}"
+            finally:
+                # Nobody streams events of this run, drop its queue.
+                await client.post(f"{agents_url}/cancel", json={"session_id": run_id})
+
+    headers = {PARENT_SESSION_HEADER: session_id}
+    async with httpx.AsyncClient(timeout=None, headers=headers) as client:
+        return list(await asyncio.gather(*[_run_single(client, task) for task in tasks]))
+
+
+@dataclass
+class BackgroundDelegation:
+    agent_name: str
+    agents_url: str
+    parent_session_id: str
+    # Key of the event queue and of cancellation, the rest of the state is the parent's.
+    session_id: str = field(default_factory=get_unique_id)
+    status: str = "running"
+    output: str = ""
+    result: Optional[str] = None
+    task: Optional["asyncio.Task[None]"] = None
+
+    def observe(self, event: AgentEvent) -> None:
+        if event.event_type == EventType.AGENT_END and event.agent_name == self.agent_name:
+            self.result = event.content
+            return
+        if event.event_type == EventType.AGENT_START and event.agent_name != self.agent_name:
+            self.output += f"\n[{event.agent_name}]\n"
+        elif event.content:
+            self.output += event.content
+        self.output = self.output[-settings.STREAM_PARTIAL_CHARS :]
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "task_id": self.session_id,
+            "status": self.status,
+            "partial_output": self.output,
+            "result": self.result,
+        }
+
+
+_BACKGROUND: "OrderedDict[str, BackgroundDelegation]" = OrderedDict()
+
+
+async def _run_background(delegation: BackgroundDelegation, task: str) -> None:
+    url = f"{delegation.agents_url}/{delegation.agent_name}"
+    payload = {
+        "messages": [{"role": "user", "content": task}],
+        "session_id": delegation.session_id,
+        "stream": True,
+    }
+    try:
+        async with _get_semaphore(delegation.agent_name):
+            headers = {PARENT_SESSION_HEADER: delegation.parent_session_id}
+            async with httpx.AsyncClient(timeout=None, headers=headers) as client:
+                async with client.stream("POST", url, json=payload) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if line.strip():
+                            delegation.observe(AgentEvent.model_validate_json(line))
+        delegation.status = "done"
+    except asyncio.CancelledError:
+        delegation.status = "cancelled"
+        raise
+    except Exception as e:
+        delegation.status = "error"
+        delegation.result = f"Error: {e}"
+
+
+def _get_delegation(task_id: str) -> BackgroundDelegation:
+    if task_id not in _BACKGROUND:
+        raise KeyError(f"No background task {task_id}, running tasks: {list(_BACKGROUND)}")
+    return _BACKGROUND[task_id]
+
+
+async def delegate_start(session_id: str, agent_name: str, task: str) -> str:
+    """
+    Start a task with a team member in the background and return its task_id immediately.
+    Use it for long tasks (experiments, paper writing) to follow their progress with delegate_status
+    and to stop them with delegate_cancel once the partial output is enough.
+    The team member shares the session blackboard and workspace.
+
+    Args:
+        session_id: Session id from the task message.
+        agent_name: Name of the team member without the "agent__" prefix, for example "mle_solver".
+        task: Detailed and fully self-contained task description.
+    """
+    delegation = BackgroundDelegation(
+        agent_name=agent_name, agents_url=_get_agents_url(), parent_session_id=session_id
+    )
+    delegation.task = asyncio.create_task(_run_background(delegation, task))
+    _BACKGROUND[delegation.session_id] = delegation
+    while len(_BACKGROUND) > MAX_BACKGROUND_TASKS:
+        _, old = _BACKGROUND.popitem(last=False)
+        if old.task is not None:
+            old.task.cancel()
+    return delegation.session_id
+
+
+async def delegate_status(task_id: str, wait_seconds: int = 0) -> Dict[str, Any]:
+    """
+    Get the progress of a background task started with delegate_start.
+    Returns a dict with "status" (running, done, cancelled or error),
+    "partial_output" (the latest output of the team member) and "result" (the final answer).
+
+    Args:
+        task_id: Task id returned by delegate_start.
+        wait_seconds: Wait up to this many seconds for the task to finish, 0 by default.
+    """
+    delegation = _get_delegation(task_id)
+    if wait_seconds > 0 and delegation.task is not None:
+        await asyncio.wait([delegation.task], timeout=wait_seconds)
+    return delegation.describe()
+
+
+async def delegate_cancel(task_id: str) -> Dict[str, Any]:
+    """
+    Stop a background task started with delegate_start, for example when its partial output
+    is already enough. Returns the same dict as delegate_status.
+
+    Args:
+        task_id: Task id returned by delegate_start.
+    """
+    delegation = _get_delegation(task_id)
+    if delegation.task is not None and not delegation.task.done():
+        delegation.task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await delegation.task
+        async with httpx.AsyncClient(timeout=None) as client:
+            # Closing the stream cancels the team member only with STREAM_CANCEL_ON_DISCONNECT.
+            with contextlib.suppress(httpx.HTTPError):
+                await client.post(
+                    f"{delegation.agents_url}/cancel", json={"session_id": delegation.session_id}
+                )
+    return delegation.describe()
@@ -0,0 +1,198 @@
+import asyncio
+import functools
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from holosophos.settings import settings
+
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+PARAGRAPH_RE = re.compile(r"\n\s*\n")
+# Longer queries only add noise to BM25 and slow down the search.
+MAX_QUERY_TERMS = 32
+
+
+@dataclass
+class Passage:
+    document_id: str
+    title: str
+    chunk_index: int
+    score: float
+    text: str
+
+
+def chunk_text(text: str, chunk_chars: int, overlap_chars: int = 0) -> List[str]:
+    """
+    Split a text into chunks of up to chunk_chars characters, preferring paragraph boundaries.
+    Neighbouring chunks share up to overlap_chars characters, so passages are not cut in half.
+    """
+    pieces: List[str] = []
+    for paragraph in PARAGRAPH_RE.split(text):
+        paragraph = paragraph.strip()
+        while len(paragraph) > chunk_chars:
+            pieces.append(paragraph[:chunk_chars])
+            paragraph = paragraph[max(1, chunk_chars - overlap_chars) :]
+        if paragraph:
+            pieces.append(paragraph)
+
+    chunks: List[str] = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + len(piece) + 2 > chunk_chars:
+            chunks.append(current)
+            tail = current[-overlap_chars:] if overlap_chars else ""
+            current = tail if len(tail) + len(piece) + 2 <= chunk_chars else ""
+        current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _to_fts_query(query: str) -> str:
+    # Free-form questions are turned into an OR of quoted terms, so FTS5 syntax never breaks.
+    terms = list(dict.fromkeys(WORD_RE.findall(query.lower())))[:MAX_QUERY_TERMS]
+    return " OR ".join(f'"{term}"' for term in terms)
+
+
+class DocumentStore:
+    """
+    Chunked documents with a BM25 full-text index in SQLite (FTS5).
+    One file is shared by all agents, sessions and processes using the same workspace.
+    """
+
+    def __init__(self, path: str | Path, chunk_chars: int, overlap_chars: int) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.chunk_chars = chunk_chars
+        self.overlap_chars = overlap_chars
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "document_id TEXT PRIMARY KEY, "
+            "title TEXT NOT NULL, "
+            "num_chunks INTEGER NOT NULL, "
+            "num_chars INTEGER NOT NULL, "
+            "created_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS chunks USING fts5("
+            "text, document_id UNINDEXED, chunk_index UNINDEXED, "
+            "tokenize = 'porter unicode61')"
+        )
+        self._conn.commit()
+
+    def _get_num_chunks(self, document_id: str) -> Optional[int]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT num_chunks FROM documents WHERE document_id = ?", (document_id,)
+            ).fetchone()
+        return int(row[0]) if row is not None else None
+
+    def __contains__(self, document_id: str) -> bool:
+        return self._get_num_chunks(document_id) is not None
+
+    def add(self, document_id: str, text: str, title: str = "") -> int:
+        """Index a document once, return the number of chunks."""
+        num_chunks = self._get_num_chunks(document_id)
+        if num_chunks is not None:
+            return num_chunks
+        chunks = chunk_text(text, self.chunk_chars, self.overlap_chars)
+        with self._lock:
+            # Another caller may have indexed the same document while this one was chunking.
+            row = self._conn.execute(
+                "SELECT num_chunks FROM documents WHERE document_id = ?", (document_id,)
+            ).fetchone()
+            if row is not None:
+                return int(row[0])
+            self._conn.executemany(
+                "INSERT INTO chunks (text, document_id, chunk_index) VALUES (?, ?, ?)",
+                [(chunk, document_id, index) for index, chunk in enumerate(chunks)],
+            )
+            self._conn.execute(
+                "INSERT INTO documents (document_id, title, num_chunks, num_chars, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (document_id, title, len(chunks), len(text), time.time()),
+            )
+            self._conn.commit()
+        return len(chunks)
+
+    def search(self, query: str, top_k: int, document_id: Optional[str] = None) -> List[Passage]:
+        fts_query = _to_fts_query(query)
+        if not fts_query:
+            return []
+        sql = (
+            "SELECT chunks.document_id, documents.title, chunks.chunk_index, "
+            "bm25(chunks) AS score, chunks.text "
+            "FROM chunks JOIN documents ON documents.document_id = chunks.document_id "
+            "WHERE chunks MATCH ?"
+        )
+        params: List[Any] = [fts_query]
+        if document_id is not None:
+            sql += " AND chunks.document_id = ?"
+            params.append(document_id)
+        sql += " ORDER BY score LIMIT ?"
+        params.append(top_k)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        # FTS5 BM25 scores are negative, lower is better.
+        return [
+            Passage(
+                document_id=row[0],
+                title=row[1],
+                chunk_index=int(row[2]),
+                score=-float(row[3]),
+                text=row[4],
+            )
+            for row in rows
+        ]
+
+    def list_documents(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT document_id, title, num_chunks, num_chars FROM documents "
+                "ORDER BY created_at DESC"
+            ).fetchall()
+        return [
+            {"document_id": row[0], "title": row[1], "num_chunks": row[2], "num_chars": row[3]}
+            for row in rows
+        ]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+@functools.cache
+def get_document_store() -> DocumentStore:
+    return DocumentStore(
+        settings.DOCUMENT_INDEX_PATH,
+        chunk_chars=settings.DOCUMENT_CHUNK_CHARS,
+        overlap_chars=settings.DOCUMENT_CHUNK_OVERLAP_CHARS,
+    )
+
+
+async def search_documents(
+    query: str, top_k: int = 5, document_id: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Search downloaded papers and web pages, return only the most relevant passages.
+    Every long document returned by a download tool (arxiv_download, read_pdf, visit_webpage...)
+    is split into passages and indexed automatically, also across previous sessions.
+    Use it instead of printing or re-reading a whole paper when you need specific details.
+    Returns a list of passages with "document_id", "title", "chunk_index", "score" and "text".
+
+    Args:
+        query: What to look for, keywords or a natural language question.
+        top_k: Number of passages to return, 5 by default.
+        document_id: Optional id of a single document to search in, from previous results.
+    """
+    passages = await asyncio.to_thread(
+        get_document_store().search, query, top_k=top_k, document_id=document_id
+    )
+    return [asdict(passage) for passage in passages]
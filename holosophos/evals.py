@@ -0,0 +1,122 @@
+import json
+import statistics
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from holosophos.batch import BatchTask, read_jsonl
+
+# Takes a dataset record and the agent answer, None means the answer can not be scored.
+Scorer = Callable[[Dict[str, Any], str], Optional[bool]]
+
+
+def extract_json(text: str) -> Optional[Dict[str, Any]]:
+    if "{" not in text or "}" not in text:
+        return None
+    candidate = text[text.find("{") : text.rfind("}") + 1]
+    for variant in (candidate, candidate.replace("'", '"')):
+        try:
+            parsed = json.loads(variant)
+        except json.JSONDecodeError:
+            continue
+        return parsed if isinstance(parsed, dict) else None
+    return None
+
+
+def score_target_ids(record: Dict[str, Any], result: str) -> Optional[bool]:
+    """Correct if any of the target ids (ArXiv ids for the librarian) is in the answer."""
+    return any(target in result for target in record["target"])
+
+
+def score_json_field(record: Dict[str, Any], result: str) -> Optional[bool]:
+    """
+    Correct if the JSON in the answer has the field at least the target value,
+    or at most the target value with "mode": "less".
+    """
+    parsed = extract_json(result)
+    value = parsed.get(record["field"]) if parsed else None
+    if not isinstance(value, (int, float)):
+        return False
+    if record.get("mode") == "less":
+        return bool(value <= record["target"])
+    return bool(value >= record["target"])
+
+
+@dataclass
+class EvalSuite:
+    # Suites without a default dataset need an explicit input path.
+    input_path: Optional[str] = None
+    scorer: Optional[Scorer] = None
+    # Agents of most suites share the workspace and code execution, so tasks run one by one.
+    max_workers: int = 1
+
+
+SUITES: Dict[str, EvalSuite] = {
+    "librarian": EvalSuite("reports/data/librarian_test.jsonl", score_target_ids, max_workers=4),
+    "librarian_additional": EvalSuite(
+        "reports/data/librarian_additional_test.jsonl", score_target_ids, max_workers=4
+    ),
+    "mle_solver": EvalSuite("reports/data/mle_solver_test.jsonl", score_json_field),
+    "proposer": EvalSuite("reports/data/proposer_test.jsonl", score_json_field),
+    "reviewer": EvalSuite(),
+    "writer": EvalSuite(),
+}
+
+
+def stream_tasks(
+    input_path: Path,
+    records: Dict[str, Dict[str, Any]],
+    skip_ids: Set[str],
+    nrows: Optional[int] = None,
+) -> Iterator[BatchTask]:
+    """
+    Read a dataset line by line and yield tasks that are not in skip_ids.
+    Records are kept in the records dict until they are scored.
+    """
+    with open(input_path, encoding="utf-8") as f:
+        for index, line in enumerate(f):
+            if nrows is not None and index >= nrows:
+                return
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            task_id = str(record.get("task_id", index))
+            if task_id in skip_ids:
+                continue
+            records[task_id] = record
+            yield BatchTask(task_id=task_id, query=record["query"])
+
+
+def get_cost(record: Dict[str, Any]) -> float:
+    return sum(float(stats.get("cost", 0.0)) for stats in record.get("profile", {}).values())
+
+
+def get_tokens(record: Dict[str, Any]) -> int:
+    usage = record.get("token_usage", {})
+    return int(usage.get("prompt_tokens", 0)) + int(usage.get("completion_tokens", 0))
+
+
+def summarize(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    scored = [r["is_correct"] for r in records if r.get("is_correct") is not None]
+    durations = sorted(float(r["duration"]) for r in records)
+    return {
+        "tasks": len(records),
+        "accuracy": sum(scored) / len(scored) if scored else None,
+        "mean_duration": statistics.fmean(durations) if durations else 0.0,
+        "p90_duration": durations[int(0.9 * (len(durations) - 1))] if durations else 0.0,
+        "tokens": sum(get_tokens(r) for r in records),
+        "cost": sum(get_cost(r) for r in records),
+    }
+
+
+def compare_runs(paths: List[Path]) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Summarize runs on the tasks finished in all of them, so runs with different subsets
+    of finished tasks are compared fairly.
+    """
+    runs = {path.stem: {str(r["task_id"]): r for r in read_jsonl(path)} for path in paths}
+    common_ids = set.intersection(*(set(records) for records in runs.values())) if runs else set()
+    return [
+        (name, summarize([records[task_id] for task_id in sorted(common_ids)]))
+        for name, records in runs.items()
+    ]
@@ -0,0 +1,196 @@
+import asyncio
+import contextvars
+import functools
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from codearkt.llm import LLM, ChatMessages, ChatStreamGenerator
+from openai import APIConnectionError, InternalServerError, RateLimitError
+from openai.types.chat.chat_completion_chunk import ChatCompletionChunk
+from openai.types.completion_usage import CompletionUsage
+
+from holosophos.cache import SqliteCache, make_cache_key
+from holosophos.rate_limit import get_llm_bucket, parse_retry_after
+from holosophos.settings import settings
+from holosophos.trace import TraceStore, get_trace_store
+
+# Backoff of connection and server errors in seconds, as in the OpenAI client.
+TRANSIENT_BACKOFF = 0.5
+MAX_BACKOFF = 8.0
+# Prompt tokens served from the provider prompt cache, accumulated by the caller.
+CACHED_PROMPT_TOKENS: contextvars.ContextVar[int] = contextvars.ContextVar(
+    "cached_prompt_tokens", default=0
+)
+
+
+class RateLimitedLLM(LLM):
+    """
+    All retries happen here, the OpenAI client is created with max_retries=0.
+    Rate limit errors pause the shared bucket of the provider, connection and server errors
+    are retried num_retries times with exponential backoff.
+    """
+
+    def __init__(self, model_name: str, num_retries: int = 3, **kwargs: Any) -> None:
+        super().__init__(model_name=model_name, num_retries=0, **kwargs)
+        self._transient_retries = num_retries
+
+    async def astream(self, messages: ChatMessages, **kwargs: Any) -> ChatStreamGenerator:
+        bucket = get_llm_bucket(self._model_name)
+        rate_limit_retries = 0
+        transient_retries = 0
+        while True:
+            await bucket.acquire()
+            started = False
+            try:
+                async for event in super().astream(messages, **kwargs):
+                    started = True
+                    yield event
+                return
+            except RateLimitError as e:
+                if started or rate_limit_retries >= settings.RATE_LIMIT_MAX_RETRIES:
+                    raise
+                rate_limit_retries += 1
+                retry_after = parse_retry_after(e.response.headers.get("retry-after"))
+                bucket.block_for(retry_after or settings.RATE_LIMIT_DEFAULT_BACKOFF)
+            except (APIConnectionError, InternalServerError):
+                if started or transient_retries >= self._transient_retries:
+                    raise
+                await asyncio.sleep(min(TRANSIENT_BACKOFF * 2**transient_retries, MAX_BACKOFF))
+                transient_retries += 1
+
+
+class CachedLLM(RateLimitedLLM):
+    def __init__(self, model_name: str, cache: SqliteCache, **kwargs: Any) -> None:
+        super().__init__(model_name=model_name, **kwargs)
+        self._cache = cache
+
+    def _get_cache_key(self, messages: ChatMessages, **kwargs: Any) -> str:
+        return make_cache_key(
+            self._model_name,
+            self._max_history_tokens,
+            {**self._params, **kwargs},
+            [message.model_dump(exclude_none=True) for message in messages],
+        )
+
+    async def astream(self, messages: ChatMessages, **kwargs: Any) -> ChatStreamGenerator:
+        key = self._get_cache_key(messages, **kwargs)
+        cached = await self._cache.aget(key)
+        if cached is not None:
+            for chunk in cached:
+                yield ChatCompletionChunk.model_validate(chunk)
+            return
+
+        chunks: List[Dict[str, Any]] = []
+        async for event in super().astream(messages, **kwargs):
+            chunks.append(event.model_dump(mode="json"))
+            yield event
+        # Only completed streams reach this point, partial outputs are never cached.
+        await self._cache.aset(key, chunks)
+
+
+def get_trace_key(llm: LLM, messages: ChatMessages, **kwargs: Any) -> str:
+    # Prompts include the current date, a replay on another day should still match.
+    today = datetime.now().strftime("%Y-%m-%d")
+    return make_cache_key(
+        llm._model_name,
+        {**llm._params, **kwargs},
+        [message.model_dump_json(exclude_none=True).replace(today, "") for message in messages],
+    )
+
+
+class LLMWrapper(LLM):
+    def __init__(self, llm: LLM) -> None:
+        super().__init__(
+            model_name=llm._model_name,
+            base_url=llm._base_url,
+            api_key=llm._api_key,
+            max_history_tokens=llm._max_history_tokens,
+            num_retries=llm._num_retries,
+            **llm._params,
+        )
+        self._llm = llm
+
+    async def astream(self, messages: ChatMessages, **kwargs: Any) -> ChatStreamGenerator:
+        async for event in self._llm.astream(messages, **kwargs):
+            yield event
+
+
+def get_cached_tokens(usage: Optional[CompletionUsage]) -> int:
+    if usage is None or usage.prompt_tokens_details is None:
+        return 0
+    return usage.prompt_tokens_details.cached_tokens or 0
+
+
+class UsageTrackingLLM(LLMWrapper):
+    async def astream(self, messages: ChatMessages, **kwargs: Any) -> ChatStreamGenerator:
+        async for event in self._llm.astream(messages, **kwargs):
+            cached_tokens = get_cached_tokens(event.usage)
+            if cached_tokens:
+                CACHED_PROMPT_TOKENS.set(CACHED_PROMPT_TOKENS.get() + cached_tokens)
+            yield event
+
+
+class RecordingLLM(LLMWrapper):
+    def __init__(self, llm: LLM, trace: TraceStore) -> None:
+        super().__init__(llm)
+        self._trace = trace
+
+    async def astream(self, messages: ChatMessages, **kwargs: Any) -> ChatStreamGenerator:
+        chunks: List[Dict[str, Any]] = []
+        async for event in self._llm.astream(messages, **kwargs):
+            chunks.append(event.model_dump(mode="json"))
+            yield event
+        self._trace.record("llm", get_trace_key(self, messages, **kwargs), chunks)
+
+
+class ReplayLLM(LLM):
+    def __init__(self, model_name: str, trace: TraceStore, **kwargs: Any) -> None:
+        super().__init__(model_name=model_name, **kwargs)
+        self._trace = trace
+
+    async def astream(self, messages: ChatMessages, **kwargs: Any) -> ChatStreamGenerator:
+        chunks = self._trace.replay("llm", get_trace_key(self, messages, **kwargs))
+        if chunks is None:
+            raise RuntimeError(f"No recorded completion in {self._trace.path} for this request")
+        for chunk in chunks:
+            yield ChatCompletionChunk.model_validate(chunk)
+
+
+def estimate_cost(model_name: str, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+    prices = settings.MODEL_PRICES.get(model_name)
+    if prices is None:
+        return None
+    prompt_price, completion_price = prices
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+@functools.lru_cache(maxsize=None)
+def get_llm(
+    model_name: str,
+    max_completion_tokens: int = settings.MAX_COMPLETION_TOKENS,
+    max_history_tokens: int = settings.MAX_HISTORY_TOKENS,
+    **kwargs: Any,
+) -> LLM:
+    llm_kwargs = {
+        "max_completion_tokens": max_completion_tokens,
+        "max_history_tokens": max_history_tokens,
+        **kwargs,
+    }
+    llm: LLM
+    if settings.TRACE_MODE == "replay":
+        trace = get_trace_store(settings.TRACE_PATH)
+        return UsageTrackingLLM(ReplayLLM(model_name, trace=trace, **llm_kwargs))
+
+    llm = RateLimitedLLM(model_name=model_name, **llm_kwargs)
+    if settings.LLM_CACHE_ENABLED:
+        cache = SqliteCache(
+            Path(settings.CACHE_DIR) / "llm.sqlite",
+            ttl=settings.LLM_CACHE_TTL,
+            max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+        )
+        llm = CachedLLM(model_name=model_name, cache=cache, **llm_kwargs)
+
+    if settings.TRACE_MODE == "record":
+        llm = RecordingLLM(llm, trace=get_trace_store(settings.TRACE_PATH))
+    return UsageTrackingLLM(llm)
@@ -1,18 +1,23 @@
+import functools
 import logging
-from typing import Any, Optional, Sequence
+from typing import Any, Optional, Sequence, Tuple
 
 import fire  # type: ignore
 from phoenix.otel import register
 from codearkt.codeact import CodeActAgent
-from codearkt.prompt_storage import PromptStorage
 from codearkt.llm import LLM
 from codearkt.otel import CodeActInstrumentor
 from codearkt.server import run_query
 
-from holosophos.files import PROMPTS_DIR_PATH
+from holosophos.budget import get_agent_budget, get_agent_timeout
+from holosophos.llm import get_llm
+from holosophos.profiler import PROFILER
 from holosophos.settings import settings
+from holosophos.tools_server import install_server_extensions
+from holosophos.utils import load_prompts
 
 from holosophos.agents import (
+    HolosophosAgent,
     get_librarian_agent,
     get_mle_solver_agent,
     get_writer_agent,
@@ -38,21 +43,38 @@ def compose_main_agent(
     tools: Optional[Sequence[str]] = None,
     included_agents: Sequence[str] = AGENTS,
 ) -> CodeActAgent:
-    model = LLM(
-        model_name=model_name,
-        max_completion_tokens=max_completion_tokens,
-        max_history_tokens=max_history_tokens,
-    )
+    # Delegation, blackboard and document tools are served only by the holosophos tools server,
+    # so any codearkt run_query/run_batch/run_server with this agent needs the extensions.
+    install_server_extensions()
+
+    def _get_model(
+        agent_model_name: Optional[str],
+        agent_max_completion_tokens: Optional[int],
+        agent_max_history_tokens: Optional[int],
+    ) -> LLM:
+        return get_llm(
+            model_name=agent_model_name or model_name,
+            max_completion_tokens=agent_max_completion_tokens or max_completion_tokens,
+            max_history_tokens=agent_max_history_tokens or max_history_tokens,
+        )
 
     librarian_agent = get_librarian_agent(
-        model=model,
+        model=_get_model(
+            settings.LIBRARIAN_MODEL_NAME,
+            settings.LIBRARIAN_MAX_COMPLETION_TOKENS,
+            settings.LIBRARIAN_MAX_HISTORY_TOKENS,
+        ),
         verbosity_level=verbosity_level,
         max_iterations=settings.LIBRARIAN_MAX_ITERATIONS,
         planning_interval=settings.LIBRARIAN_PLANNING_INTERVAL,
         tools=settings.LIBRARIAN_TOOLS,
     )
     mle_solver_agent = get_mle_solver_agent(
-        model=model,
+        model=_get_model(
+            settings.MLE_SOLVER_MODEL_NAME,
+            settings.MLE_SOLVER_MAX_COMPLETION_TOKENS,
+            settings.MLE_SOLVER_MAX_HISTORY_TOKENS,
+        ),
         max_iterations=settings.MLE_SOLVER_MAX_ITERATIONS,
         verbosity_level=verbosity_level,
         planning_interval=settings.MLE_SOLVER_PLANNING_INTERVAL,
@@ -64,45 +86,103 @@ def compose_main_agent(
         ),
     )
     writer_agent = get_writer_agent(
-        model=model,
+        model=_get_model(
+            settings.WRITER_MODEL_NAME,
+            settings.WRITER_MAX_COMPLETION_TOKENS,
+            settings.WRITER_MAX_HISTORY_TOKENS,
+        ),
         max_iterations=settings.WRITER_MAX_ITERATIONS,
         verbosity_level=verbosity_level,
         planning_interval=settings.WRITER_PLANNING_INTERVAL,
         tools=settings.WRITER_TOOLS,
     )
     proposer_agent = get_proposer_agent(
-        model=model,
+        model=_get_model(
+            settings.PROPOSER_MODEL_NAME,
+            settings.PROPOSER_MAX_COMPLETION_TOKENS,
+            settings.PROPOSER_MAX_HISTORY_TOKENS,
+        ),
         max_iterations=settings.PROPOSER_MAX_ITERATIONS,
         verbosity_level=verbosity_level,
         planning_interval=settings.PROPOSER_PLANNING_INTERVAL,
         tools=settings.PROPOSER_TOOLS,
     )
     reviewer_agent = get_reviewer_agent(
-        model=model,
+        model=_get_model(
+            settings.REVIEWER_MODEL_NAME,
+            settings.REVIEWER_MAX_COMPLETION_TOKENS,
+            settings.REVIEWER_MAX_HISTORY_TOKENS,
+        ),
         max_iterations=settings.REVIEWER_MAX_ITERATIONS,
         verbosity_level=verbosity_level,
         planning_interval=settings.REVIEWER_PLANNING_INTERVAL,
         tools=settings.REVIEWER_TOOLS,
     )
-    prompts = PromptStorage.load(PROMPTS_DIR_PATH / "system.yaml")
+    prompts = load_prompts("system")
     agents = (librarian_agent, mle_solver_agent, writer_agent, proposer_agent, reviewer_agent)
     managed_agents = [agent for agent in agents if agent.name in included_agents]
     if tools is None:
         tools = settings.MANAGER_TOOLS
-    agent = CodeActAgent(
+    agent = HolosophosAgent(
         name="manager",
         description="Manager agent",
         tool_names=tools,
         managed_agents=managed_agents,
-        llm=model,
+        llm=_get_model(
+            settings.MANAGER_MODEL_NAME,
+            settings.MANAGER_MAX_COMPLETION_TOKENS,
+            settings.MANAGER_MAX_HISTORY_TOKENS,
+        ),
         max_iterations=settings.MANAGER_MAX_ITERATIONS,
         planning_interval=settings.MANAGER_PLANNING_INTERVAL,
         verbosity_level=verbosity_level,
         prompts=prompts,
     )
+    for sub_agent in [agent, *managed_agents]:
+        sub_agent.budget = get_agent_budget(sub_agent.name)
+        sub_agent.timeout = get_agent_timeout(sub_agent.name)
     return agent
 
 
+@functools.lru_cache(maxsize=16)
+def _get_main_agent(
+    model_name: str,
+    max_completion_tokens: int,
+    max_history_tokens: int,
+    verbosity_level: int,
+    tools: Optional[Tuple[str, ...]],
+    included_agents: Tuple[str, ...],
+) -> CodeActAgent:
+    return compose_main_agent(
+        model_name=model_name,
+        max_completion_tokens=max_completion_tokens,
+        max_history_tokens=max_history_tokens,
+        verbosity_level=verbosity_level,
+        tools=tools,
+        included_agents=included_agents,
+    )
+
+
+def get_main_agent(
+    model_name: str = settings.MODEL_NAME,
+    max_completion_tokens: int = settings.MAX_COMPLETION_TOKENS,
+    max_history_tokens: int = settings.MAX_HISTORY_TOKENS,
+    verbosity_level: int = logging.INFO,
+    tools: Optional[Sequence[str]] = None,
+    included_agents: Sequence[str] = AGENTS,
+) -> CodeActAgent:
+    # Agents keep no per-session state, so one graph can serve any number of queries.
+    # The rest of the configuration is read from settings once, on the first build.
+    return _get_main_agent(
+        model_name=model_name,
+        max_completion_tokens=max_completion_tokens,
+        max_history_tokens=max_history_tokens,
+        verbosity_level=verbosity_level,
+        tools=tuple(tools) if tools is not None else None,
+        included_agents=tuple(included_agents),
+    )
+
+
 async def run_main_agent(
     query: str,
     model_name: str = settings.MODEL_NAME,
@@ -111,6 +191,7 @@ async def run_main_agent(
     phoenix_project_name: str = settings.PHOENIX_PROJECT_NAME,
     phoenix_endpoint: str = settings.RESOLVED_PHOENIX_ENDPOINT,
     included_agents: Sequence[str] = AGENTS,
+    profile: bool = False,
 ) -> Any:
     if enable_phoenix and phoenix_project_name and phoenix_endpoint:
         register(
@@ -119,12 +200,15 @@ async def run_main_agent(
             auto_instrument=True,
         )
         CodeActInstrumentor().instrument()
-    agent = compose_main_agent(
+    agent = get_main_agent(
         model_name=model_name,
         verbosity_level=verbosity_level,
         included_agents=included_agents,
     )
-    return await run_query(query, agent, mcp_config=MCP_CONFIG, add_mcp_server_prefixes=False)
+    result = await run_query(query, agent, mcp_config=MCP_CONFIG, add_mcp_server_prefixes=False)
+    if profile:
+        print(PROFILER.format())
+    return result
 
 
 if __name__ == "__main__":
@@ -0,0 +1,138 @@
+import asyncio
+import contextlib
+import logging
+from typing import Any, Optional
+
+import mcp.types
+from fastmcp.client.transports import ClientTransport
+from fastmcp.server.proxy import ProxyClient
+
+logger = logging.getLogger(__name__)
+
+
+class PooledMCPClient(ProxyClient[ClientTransport]):
+    """
+    Long-lived MCP session to one server, shared by all concurrent tool calls.
+
+    A background task holds the session open with "async with client", so calls of the proxy
+    reuse it instead of initializing new sessions. Another task pings the server, a dead session
+    is closed and opened again with exponential backoff.
+    Only the public client API is used, the session is entered and exited in the same task.
+    """
+
+    def __init__(
+        self,
+        transport: ClientTransport,
+        name: str,
+        max_in_flight: int,
+        health_check_interval: float,
+        max_backoff: float,
+        connect_attempts: int,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(transport, **kwargs)
+        self.name = name
+        self.health_check_interval = health_check_interval
+        self.max_backoff = max_backoff
+        self.connect_attempts = connect_attempts
+        self._in_flight = asyncio.Semaphore(max(1, max_in_flight))
+        # Set while the session is held and usable.
+        self._ready = asyncio.Event()
+        # Set to make the holder close the session and open a new one.
+        self._reconnect = asyncio.Event()
+        # Replaced after every connection attempt, wakes up callers waiting for the session.
+        self._attempted = asyncio.Event()
+        self._failures = 0
+        self._last_error: Optional[BaseException] = None
+        self._session_task: Optional[asyncio.Task[None]] = None
+        self._health_task: Optional[asyncio.Task[None]] = None
+
+    def _notify(self) -> None:
+        self._attempted.set()
+        self._attempted = asyncio.Event()
+
+    async def _hold_session(self) -> None:
+        initial_backoff = min(0.5, self.max_backoff)
+        backoff = initial_backoff
+        while True:
+            entered = False
+            try:
+                async with self:
+                    entered = True
+                    self._failures = 0
+                    backoff = initial_backoff
+                    self._reconnect.clear()
+                    self._ready.set()
+                    self._notify()
+                    logger.info(f"MCP server {self.name} connected")
+                    await self._reconnect.wait()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if entered:
+                    # Closing a dead session fails too, a new one is opened right away.
+                    logger.debug(f"MCP server {self.name} session closed with an error: {e}")
+                    continue
+                self._failures += 1
+                self._last_error = e
+                self._notify()
+                logger.warning(
+                    f"MCP server {self.name} connection failed ({e}), retry in {backoff:.1f}s"
+                )
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+            finally:
+                self._ready.clear()
+
+    def reconnect(self) -> None:
+        """Close the current session, the next call waits for a new one."""
+        self._ready.clear()
+        self._reconnect.set()
+
+    async def ensure_connected(self) -> None:
+        if self._session_task is None:
+            self._session_task = asyncio.create_task(self._hold_session())
+        if self._ready.is_set() and not self.is_connected():
+            # The session is held but its connection is gone.
+            self.reconnect()
+        while not self._ready.is_set():
+            if self._failures >= self.connect_attempts:
+                raise ConnectionError(
+                    f"MCP server {self.name} is unavailable after {self._failures} attempts"
+                ) from self._last_error
+            await self._attempted.wait()
+
+    async def _health_loop(self) -> None:
+        while True:
+            try:
+                await self.ensure_connected()
+                await asyncio.sleep(self.health_check_interval)
+                await asyncio.wait_for(self.ping(), timeout=self.health_check_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"MCP server {self.name} health check failed: {e}")
+                self.reconnect()
+                await asyncio.sleep(min(self.health_check_interval, self.max_backoff))
+
+    async def start(self) -> None:
+        if self._health_task is None:
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def call_tool_mcp(
+        self, name: str, arguments: dict[str, Any], *args: Any, **kwargs: Any
+    ) -> mcp.types.CallToolResult:
+        await self.ensure_connected()
+        async with self._in_flight:
+            return await super().call_tool_mcp(name, arguments, *args, **kwargs)
+
+    async def close(self) -> None:
+        for task in (self._health_task, self._session_task):
+            if task is None:
+                continue
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self._health_task = None
+        self._session_task = None
+        await self.transport.close()  # type: ignore[no-untyped-call]
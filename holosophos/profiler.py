@@ -0,0 +1,141 @@
+import json
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+BAR_WIDTH = 40
+MAX_SESSIONS = 1000
+
+
+@dataclass
+class AgentStats:
+    model_name: str = ""
+    runs: int = 0
+    iterations: int = 0
+    wall_time: float = 0.0
+    llm_calls: int = 0
+    llm_time: float = 0.0
+    exec_time: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_prompt_tokens: int = 0
+    compaction_saved_tokens: int = 0
+    forced_stops: int = 0
+    timeouts: int = 0
+    cost: float = 0.0
+
+    def describe(self) -> str:
+        return (
+            f"{self.wall_time:.1f}s"
+            f" | llm {self.llm_time:.1f}s in {self.llm_calls} calls"
+            f" | exec {self.exec_time:.1f}s"
+            f" | {self.iterations} it, {self.forced_stops} forced stops, {self.timeouts} timeouts"
+            f" | {self.prompt_tokens}/{self.completion_tokens} tok"
+            f" ({self.cached_prompt_tokens} cached)"
+            f" | -{self.compaction_saved_tokens} tok compacted"
+            f" | ${self.cost:.4f}"
+            f" | {self.model_name}"
+        )
+
+
+@dataclass
+class ToolStats:
+    calls: int = 0
+    errors: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+
+
+class Profiler:
+    """In-process latency and token counters, per session and agent, and per tool."""
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS) -> None:
+        self.max_sessions = max_sessions
+        self.sessions: OrderedDict[str, Dict[str, AgentStats]] = OrderedDict()
+        self.session_start: Dict[str, float] = {}
+        self.tools: Dict[str, ToolStats] = {}
+
+    def agent(self, session_id: str, agent_name: str) -> AgentStats:
+        if session_id not in self.sessions:
+            self.sessions[session_id] = {}
+            self.session_start[session_id] = time.time()
+            while len(self.sessions) > self.max_sessions:
+                old_session_id, _ = self.sessions.popitem(last=False)
+                self.session_start.pop(old_session_id, None)
+        agents = self.sessions[session_id]
+        if agent_name not in agents:
+            agents[agent_name] = AgentStats()
+        return agents[agent_name]
+
+    def record_tool(self, tool_name: str, elapsed: float, is_error: bool = False) -> None:
+        stats = self.tools.setdefault(tool_name, ToolStats())
+        stats.calls += 1
+        stats.errors += int(is_error)
+        stats.total_time += elapsed
+        stats.max_time = max(stats.max_time, elapsed)
+
+    def summary(self, session_id: str) -> Dict[str, Any]:
+        agents = self.sessions.get(session_id, {})
+        return {
+            "session_id": session_id,
+            "start_time": self.session_start.get(session_id),
+            "agents": {name: asdict(stats) for name, stats in agents.items()},
+        }
+
+    def tool_summary(self) -> Dict[str, Any]:
+        # Tool calls carry no session, so tool counters are process-wide
+        # and are never mixed into session profiles.
+        return {name: asdict(stats) for name, stats in self.tools.items()}
+
+    def save(self, session_id: str, output_dir: str | Path) -> Path:
+        output_path = Path(output_dir) / f"{session_id}.json"
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(session_id), f, ensure_ascii=False, indent=2)
+        return output_path
+
+    def format(self, session_id: Optional[str] = None) -> str:
+        if session_id is None and self.sessions:
+            session_id = next(reversed(self.sessions))
+        if session_id is None:
+            return "No profiled sessions"
+        summary = self.summary(session_id)
+        agents: Dict[str, Dict[str, Any]] = summary["agents"]
+        tools: Dict[str, Dict[str, Any]] = self.tool_summary()
+        max_time = max(
+            [a["wall_time"] for a in agents.values()] + [t["total_time"] for t in tools.values()],
+            default=0.0,
+        )
+
+        def _bar(value: float) -> str:
+            width = int(round(BAR_WIDTH * value / max_time)) if max_time > 0 else 0
+            return ("█" * width).ljust(BAR_WIDTH)
+
+        lines = [f"Session {session_id}"]
+        for name, a in sorted(agents.items(), key=lambda x: -float(x[1]["wall_time"])):
+            stats = AgentStats(**a)
+            lines.append(f"  {name:<24} {_bar(stats.wall_time)} {stats.describe()}")
+        if tools:
+            lines.append("Tools of all sessions")
+        for name, t in sorted(tools.items(), key=lambda x: -float(x[1]["total_time"])):
+            lines.append(
+                f"  {name:<24} {_bar(t['total_time'])} {t['total_time']:8.1f}s"
+                f" | {t['calls']} calls, {t['errors']} errors, max {t['max_time']:.1f}s"
+            )
+        return "\n".join(lines)
+
+
+def sum_agent_stats(profiles: Iterable[Dict[str, Dict[str, Any]]]) -> Dict[str, AgentStats]:
+    totals: Dict[str, AgentStats] = {}
+    for profile in profiles:
+        for name, values in profile.items():
+            total = totals.setdefault(name, AgentStats(model_name=values.get("model_name", "")))
+            for key, value in values.items():
+                if isinstance(value, (int, float)):
+                    setattr(total, key, getattr(total, key) + value)
+    return totals
+
+
+PROFILER = Profiler()
@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import math
+import re
+import time
+from typing import Dict, Optional, Tuple
+
+from holosophos.settings import settings
+
+RETRY_AFTER_RE = re.compile(r"retry[- _]after\D{0,3}(\d+(?:\.\d+)?)", re.IGNORECASE)
+RATE_LIMIT_RE = re.compile(r"\b429\b|rate[- _]?limit|too many requests", re.IGNORECASE)
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Async token bucket shared by all agents and sessions in the process.
+    Callers reserve tokens upfront and sleep until they are refilled, so waiters are served in order.
+    """
+
+    def __init__(self, name: str, requests_per_minute: float = math.inf, burst: int = 1) -> None:
+        if requests_per_minute <= 0:
+            raise ValueError(f"Rate limit {name} must be positive, got {requests_per_minute}")
+        self.name = name
+        self.rate = requests_per_minute / 60.0
+        self.capacity = float(max(1, burst))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        if math.isinf(self.rate):
+            self.tokens = self.capacity
+        else:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self) -> float:
+        """Take a token, return how long to wait before using it."""
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens -= 1.0
+        wait = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+        return max(wait, self.blocked_until - now)
+
+    async def acquire(self) -> float:
+        wait = self.reserve()
+        if wait > 0:
+            logger.debug(f"Rate limit {self.name}: waiting {wait:.1f}s")
+            await asyncio.sleep(wait)
+        return wait
+
+    def block_for(self, seconds: float) -> None:
+        # Retry-After from the provider pauses everyone using the bucket, not only the caller.
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+_BUCKETS: Dict[Tuple[str, str], TokenBucket] = {}
+
+
+def _get_bucket(kind: str, name: str, limits: Dict[str, Tuple[float, int]]) -> TokenBucket:
+    key = (kind, name)
+    if key not in _BUCKETS:
+        # Buckets without a configured limit still honor Retry-After feedback.
+        requests_per_minute, burst = limits.get(name, (math.inf, 1))
+        _BUCKETS[key] = TokenBucket(f"{kind}:{name}", requests_per_minute, burst)
+    return _BUCKETS[key]
+
+
+def get_llm_bucket(model_name: str) -> TokenBucket:
+    provider = model_name.split("/")[0]
+    return _get_bucket("llm", provider, settings.LLM_RATE_LIMITS)
+
+
+def get_tool_bucket(tool_name: str) -> TokenBucket:
+    group = settings.TOOL_RATE_LIMIT_GROUPS.get(tool_name, tool_name)
+    return _get_bucket("tool", group, settings.TOOL_RATE_LIMITS)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        match = RETRY_AFTER_RE.search(value)
+        return float(match.group(1)) if match else None
+
+
+def is_rate_limit_error(message: str) -> bool:
+    return RATE_LIMIT_RE.search(message) is not None
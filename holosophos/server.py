@@ -8,8 +8,10 @@ from phoenix.otel import register
 from codearkt.otel import CodeActInstrumentor
 from codearkt.server import run_server
 
-from holosophos.main_agent import MCP_CONFIG, compose_main_agent
+from holosophos.main_agent import MCP_CONFIG, get_main_agent
 from holosophos.settings import settings
+from holosophos.tools_server import install_server_extensions
+from holosophos.utils import preload_prompts
 
 
 def configure_uvicorn_style_logging(level: int = logging.INFO) -> None:
@@ -42,12 +44,16 @@ def server(
             auto_instrument=True,
         )
         CodeActInstrumentor().instrument()
-    agent = compose_main_agent(
+    preload_prompts()
+    agent = get_main_agent(
         model_name=model_name,
         verbosity_level=verbosity_level,
         max_completion_tokens=max_completion_tokens,
         max_history_tokens=max_history_tokens,
     )
+    for sub_agent in agent.get_all_agents():
+        logger.info(f"Agent {sub_agent.name} runs with {sub_agent.llm._model_name} model")
+    install_server_extensions()
     run_server(agent, MCP_CONFIG, add_mcp_server_prefixes=False, port=port)
 
 
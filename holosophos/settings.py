@@ -1,6 +1,7 @@
 import logging
-from typing import Optional, Sequence
+from typing import Dict, Literal, Optional, Sequence, Tuple
 
+from pydantic import PositiveFloat
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -8,9 +9,37 @@ class Settings(BaseSettings):
     MODEL_NAME: str = "deepseek/deepseek-chat-v3-0324"
     MAX_COMPLETION_TOKENS: int = 16384
     MAX_HISTORY_TOKENS: int = 131072
+    # USD per million prompt and completion tokens, used for cost reports.
+    MODEL_PRICES: Dict[str, Tuple[float, float]] = {}
 
     ACADEMIA_MCP_URL: str = "http://0.0.0.0:5056/mcp"
     MLE_KIT_MCP_URL: str = "http://0.0.0.0:5057/mcp"
+    # One long-lived session per MCP server, shared by all concurrent tool calls.
+    MCP_POOL_ENABLED: bool = True
+    MCP_MAX_IN_FLIGHT: Dict[str, int] = {"academia": 32, "mle_kit": 8}
+    MCP_HEALTH_CHECK_INTERVAL: float = 30.0
+    MCP_RECONNECT_MAX_BACKOFF: float = 30.0
+    MCP_CONNECT_ATTEMPTS: int = 5
+
+    # Requests per minute and burst size, shared by all agents in the process.
+    # LLM limits are keyed by provider, the model name prefix before "/".
+    LLM_RATE_LIMITS: Dict[str, Tuple[PositiveFloat, int]] = {}
+    # Tool limits are keyed by tool name or by its group from TOOL_RATE_LIMIT_GROUPS.
+    TOOL_RATE_LIMITS: Dict[str, Tuple[PositiveFloat, int]] = {
+        "arxiv": (20, 3),
+        "semantic_scholar": (60, 5),
+    }
+    TOOL_RATE_LIMIT_GROUPS: Dict[str, str] = {
+        "arxiv_search": "arxiv",
+        "arxiv_download": "arxiv",
+        "s2_get_citations": "semantic_scholar",
+        "s2_get_references": "semantic_scholar",
+        "s2_get_info": "semantic_scholar",
+        "s2_search": "semantic_scholar",
+    }
+    RATE_LIMIT_MAX_RETRIES: int = 3
+    # Pause after a rate limit error without Retry-After, in seconds.
+    RATE_LIMIT_DEFAULT_BACKOFF: float = 10.0
 
     ENABLE_PHOENIX: bool = False
     PHOENIX_URL: str = "http://localhost:6006"
@@ -18,10 +47,125 @@ class Settings(BaseSettings):
     PHOENIX_ENDPOINT: Optional[str] = None
 
     PORT: int = 5055
+    # Admission control for new top-level sessions, 0 disables it.
+    SERVER_MAX_ACTIVE_SESSIONS: int = 0
+    SERVER_MAX_QUEUED_SESSIONS: int = 32
+    SERVER_MAX_QUEUED_PER_CLIENT: int = 8
+    SERVER_RETRY_AFTER: int = 60
+    SERVER_ADMISSION_AGENTS: Sequence[str] = ("manager",)
+    # X-Priority headers are capped to this value, clients are not authenticated.
+    SERVER_MAX_PRIORITY: int = 0
     WORKSPACE_DIR: str = "./workdir"
+    # Every session works in its own subdirectory of WORKSPACE_DIR.
+    SESSION_WORKSPACES_ENABLED: bool = True
+    SESSION_WORKSPACES_DIR: str = "sessions"
+    SESSION_WORKSPACE_ARCHIVE_DIR: str = ".archives"
+    # Soft limit, writes of the text editor are refused and bash results carry a warning above it.
+    SESSION_WORKSPACE_QUOTA_MB: Optional[int] = 2048
+    # Directory on a tmpfs for scratch data, mounted at the same path in all containers.
+    SESSION_SCRATCH_ROOT: Optional[str] = None
+    # What happens to a session workspace when the session ends.
+    SESSION_WORKSPACE_END_ACTION: Literal["keep", "archive", "delete"] = "keep"
+    # Mount points of WORKSPACE_DIR in the MCP server containers, to map absolute tool paths.
+    SESSION_WORKSPACE_CONTAINER_ROOTS: Sequence[str] = ("/workdir",)
+    # Workspaces and archives of ended sessions are removed after this many seconds,
+    # and beyond this many most recent ones. None disables the limit.
+    SESSION_WORKSPACE_MAX_AGE: Optional[int] = 7 * 24 * 60 * 60
+    SESSION_WORKSPACE_MAX_COUNT: Optional[int] = 500
+    SESSION_WORKSPACE_TOOLS: Sequence[str] = ("bash", "text_editor")
+    # Streaming of agent events to clients, in events per session.
+    STREAM_QUEUE_SIZE: int = 1000
+    # A client that does not read events for this long is detached, in seconds.
+    STREAM_PUBLISH_TIMEOUT: float = 10.0
+    # SSE streams send a progress event after this many seconds without events.
+    STREAM_HEARTBEAT_INTERVAL: float = 15.0
+    STREAM_CANCEL_ON_DISCONNECT: bool = True
+    # Characters of the latest output kept for delegate_status.
+    STREAM_PARTIAL_CHARS: int = 4000
+    # Deadlines of single tool calls in seconds, other tools have TOOL_DEFAULT_TIMEOUT.
+    # Without a timeout argument mle_kit kills bash and remote_bash after 60 seconds itself,
+    # larger arguments are clamped to these values.
+    TOOL_TIMEOUTS: Dict[str, float] = {
+        "bash": 30 * 60,
+        "remote_bash": 60 * 60,
+        "compile_latex": 10 * 60,
+        "visit_webpage": 2 * 60,
+        "web_search": 2 * 60,
+        "document_qa": 10 * 60,
+    }
+    # Long-running tools of MCP servers, like model training, must not be cut by a global default.
+    TOOL_DEFAULT_TIMEOUT: Optional[float] = None
+    # Batch task attachments are staged to per-task subdirectories of WORKSPACE_DIR.
+    ATTACHMENTS_DIR: str = "attachments"
+    # Tried in order, "copy" always works. "hardlink" also works across more filesystems,
+    # but agents editing a staged file change the cached original, so it is opt-in.
+    ATTACHMENT_STAGING_MODES: Sequence[str] = ("reflink", "copy")
+    # Attachments of crashed runs older than this are removed, in seconds.
+    ATTACHMENT_MAX_AGE: int = 24 * 60 * 60
+    # Long results of these tools are chunked and indexed for search_documents.
+    DOCUMENT_INDEX_ENABLED: bool = True
+    # Outside of WORKSPACE_DIR, so agents and the mle_kit container cannot change the index.
+    DOCUMENT_INDEX_PATH: str = "./.cache/documents.sqlite"
+    DOCUMENT_INDEX_TOOLS: Sequence[str] = (
+        "arxiv_download",
+        "read_pdf",
+        "download_pdf_paper",
+        "visit_webpage",
+    )
+    DOCUMENT_MIN_CHARS: int = 4000
+    DOCUMENT_CHUNK_CHARS: int = 1500
+    DOCUMENT_CHUNK_OVERLAP_CHARS: int = 200
+    # Indexed results are cut to this many characters in the agent context, None keeps them whole.
+    DOCUMENT_PREVIEW_CHARS: Optional[int] = 8000
+
+    # Budgets of a single agent run, keyed by agent name. Agents that are not listed have no limit.
+    AGENT_TOKEN_BUDGETS: Dict[str, int] = {}
+    AGENT_COST_BUDGETS: Dict[str, float] = {}
+    AGENT_TIME_BUDGETS: Dict[str, float] = {}
+    # Budgets of a whole session, shared by all agents.
+    SESSION_TOKEN_BUDGET: Optional[int] = None
+    SESSION_COST_BUDGET: Optional[float] = None
+    SESSION_TIME_BUDGET: Optional[float] = None
+    # Agents are asked to wrap up once this fraction of any budget or of their iterations is spent.
+    BUDGET_WARNING_FRACTION: float = 0.8
+    # Runs are stopped after this many identical code actions or errors in a row.
+    LOOP_MAX_REPEATS: int = 4
 
     VERBOSITY_LEVEL: int = logging.INFO
+    PROFILE_DIR: Optional[str] = None
+    # "record" saves LLM completions and tool results to TRACE_PATH, "replay" serves them back.
+    TRACE_MODE: Optional[Literal["record", "replay"]] = None
+    TRACE_PATH: str = "./trace.jsonl"
+
+    CACHE_DIR: str = "./.cache"
+    LLM_CACHE_ENABLED: bool = False
+    LLM_CACHE_TTL: Optional[int] = 7 * 24 * 60 * 60
+    LLM_CACHE_MAX_ENTRIES: Optional[int] = 100000
+
+    TOOL_CACHE_ENABLED: bool = False
+    TOOL_CACHE_MAX_ENTRIES: Optional[int] = 100000
+    TOOL_CACHE_TTLS: Dict[str, int] = {
+        "arxiv_search": 24 * 60 * 60,
+        "arxiv_download": 30 * 24 * 60 * 60,
+        "anthology_search": 24 * 60 * 60,
+        "s2_get_citations": 24 * 60 * 60,
+        "s2_get_references": 24 * 60 * 60,
+        "s2_get_info": 24 * 60 * 60,
+        "s2_search": 24 * 60 * 60,
+        "hf_datasets_search": 24 * 60 * 60,
+        "document_qa": 7 * 24 * 60 * 60,
+        "web_search": 60 * 60,
+        "visit_webpage": 60 * 60,
+        "yt_transcript": 30 * 24 * 60 * 60,
+        "get_latex_templates_list": 7 * 24 * 60 * 60,
+        "get_latex_template": 7 * 24 * 60 * 60,
+    }
 
+    MANAGER_MODEL_NAME: Optional[str] = None
+    MANAGER_MAX_COMPLETION_TOKENS: Optional[int] = None
+    MANAGER_MAX_HISTORY_TOKENS: Optional[int] = None
+    # Hard limit of a single run in seconds, None disables it.
+    MANAGER_TIMEOUT: Optional[float] = 4 * 60 * 60
     MANAGER_MAX_ITERATIONS: int = 100
     MANAGER_PLANNING_INTERVAL: int = 9
     MANAGER_TOOLS: Sequence[str] = (
@@ -30,8 +174,32 @@ class Settings(BaseSettings):
         "text_editor",
         "describe_image",
         "speech_to_text",
+        "delegate_parallel",
+        "delegate_start",
+        "delegate_status",
+        "delegate_cancel",
+        "blackboard_list",
+        "blackboard_read",
+        "blackboard_write",
     )
+    PARALLEL_DELEGATION_MAX_CONCURRENCY: Dict[str, int] = {
+        "librarian": 4,
+        "proposer": 2,
+        "reviewer": 2,
+        "mle_solver": 1,
+        "writer": 1,
+    }
+    # Observations each agent keeps verbatim, older ones are cut to digests.
+    # Agents that are not listed always see their full history, so compaction is off by default.
+    HISTORY_COMPACTION_KEEP_LAST: Dict[str, int] = {}
+    HISTORY_COMPACTION_BATCH_SIZE: int = 8
+    HISTORY_COMPACTION_DIGEST_CHARS: int = 1500
+    HISTORY_COMPACTION_MAX_OBSERVATION_CHARS: int = 30000
 
+    LIBRARIAN_MODEL_NAME: Optional[str] = None
+    LIBRARIAN_MAX_COMPLETION_TOKENS: Optional[int] = None
+    LIBRARIAN_MAX_HISTORY_TOKENS: Optional[int] = None
+    LIBRARIAN_TIMEOUT: Optional[float] = 30 * 60
     LIBRARIAN_MAX_ITERATIONS: int = 150
     LIBRARIAN_PLANNING_INTERVAL: int = 9
     LIBRARIAN_TOOLS: Sequence[str] = (
@@ -44,13 +212,21 @@ class Settings(BaseSettings):
         "s2_search",
         "hf_datasets_search",
         "document_qa",
+        "search_documents",
         "web_search",
         "visit_webpage",
         "text_editor",
         "describe_image",
         "yt_transcript",
+        "blackboard_list",
+        "blackboard_read",
+        "blackboard_write",
     )
 
+    MLE_SOLVER_MODEL_NAME: Optional[str] = None
+    MLE_SOLVER_MAX_COMPLETION_TOKENS: Optional[int] = None
+    MLE_SOLVER_MAX_HISTORY_TOKENS: Optional[int] = None
+    MLE_SOLVER_TIMEOUT: Optional[float] = 3 * 60 * 60
     MLE_SOLVER_MAX_ITERATIONS: int = 200
     MLE_SOLVER_PLANNING_INTERVAL: int = 14
     MLE_SOLVER_TOOLS_REMOTE: Sequence[str] = (
@@ -61,7 +237,11 @@ class Settings(BaseSettings):
         "hf_datasets_search",
         "web_search",
         "visit_webpage",
+        "search_documents",
         "describe_image",
+        "blackboard_list",
+        "blackboard_read",
+        "blackboard_write",
     )
     MLE_SOLVER_TOOLS: Sequence[str] = (
         "bash",
@@ -71,10 +251,18 @@ class Settings(BaseSettings):
         "hf_datasets_search",
         "web_search",
         "visit_webpage",
+        "search_documents",
         "describe_image",
+        "blackboard_list",
+        "blackboard_read",
+        "blackboard_write",
     )
     MLE_SOLVER_IS_REMOTE: bool = False
 
+    WRITER_MODEL_NAME: Optional[str] = None
+    WRITER_MAX_COMPLETION_TOKENS: Optional[int] = None
+    WRITER_MAX_HISTORY_TOKENS: Optional[int] = None
+    WRITER_TIMEOUT: Optional[float] = 60 * 60
     WRITER_MAX_ITERATIONS: int = 100
     WRITER_PLANNING_INTERVAL: int = 9
     WRITER_TOOLS: Sequence[str] = (
@@ -85,31 +273,51 @@ class Settings(BaseSettings):
         "install_with_apt",
         "text_editor",
         "read_pdf",
+        "search_documents",
         "describe_image",
+        "blackboard_list",
+        "blackboard_read",
+        "blackboard_write",
     )
 
+    PROPOSER_MODEL_NAME: Optional[str] = None
+    PROPOSER_MAX_COMPLETION_TOKENS: Optional[int] = None
+    PROPOSER_MAX_HISTORY_TOKENS: Optional[int] = None
+    PROPOSER_TIMEOUT: Optional[float] = 30 * 60
     PROPOSER_MAX_ITERATIONS: int = 200
     PROPOSER_PLANNING_INTERVAL: int = 9
     PROPOSER_TOOLS: Sequence[str] = (
         "web_search",
         "visit_webpage",
         "document_qa",
+        "search_documents",
         "extract_bitflip_info",
         "generate_research_proposals",
         "score_research_proposals",
         "text_editor",
+        "blackboard_list",
+        "blackboard_read",
+        "blackboard_write",
     )
 
+    REVIEWER_MODEL_NAME: Optional[str] = None
+    REVIEWER_MAX_COMPLETION_TOKENS: Optional[int] = None
+    REVIEWER_MAX_HISTORY_TOKENS: Optional[int] = None
+    REVIEWER_TIMEOUT: Optional[float] = 30 * 60
     REVIEWER_MAX_ITERATIONS: int = 50
     REVIEWER_PLANNING_INTERVAL: int = 9
     REVIEWER_TOOLS: Sequence[str] = (
         "review_pdf_paper",
         "download_pdf_paper",
+        "search_documents",
         "visit_webpage",
         "web_search",
         "bash",
         "text_editor",
         "describe_image",
+        "blackboard_list",
+        "blackboard_read",
+        "blackboard_write",
     )
 
     model_config = SettingsConfigDict(
@@ -0,0 +1,257 @@
+import asyncio
+import json
+import logging
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional, Sequence, Set
+
+import codearkt.server as codearkt_server
+from codearkt.codeact import CodeActAgent
+from codearkt.event_bus import AgentEvent, AgentEventBus, EventType
+from codearkt.metrics import TokenUsageStore
+from codearkt.server import AGENT_RESPONSE_HEADERS, AgentRequest
+from codearkt.util import get_unique_id
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+from holosophos.delegation import PARENT_SESSION_HEADER, PARENT_SESSION_ID
+from holosophos.profiler import PROFILER
+from holosophos.settings import settings
+
+# Text events of the same agent are merged into one when the client falls behind.
+MERGEABLE_EVENTS = (EventType.OUTPUT, EventType.PLANNING_OUTPUT, EventType.TOOL_RESPONSE)
+MAX_MERGED_EVENTS = 256
+
+logger = logging.getLogger(__name__)
+
+
+def merge_events(events: List[AgentEvent]) -> List[AgentEvent]:
+    merged: List[AgentEvent] = []
+    for event in events:
+        last = merged[-1] if merged else None
+        if (
+            last is not None
+            and event.event_type in MERGEABLE_EVENTS
+            and last.event_type == event.event_type
+            and last.agent_name == event.agent_name
+        ):
+            content = (last.content or "") + (event.content or "")
+            merged[-1] = last.model_copy(update={"content": content})
+        else:
+            merged.append(event)
+    return merged
+
+
+class StreamingEventBus(AgentEventBus):
+    """
+    Event bus with bounded queues for streamed sessions only.
+    Events of sessions nobody streams are dropped instead of piling up in memory.
+    A full queue blocks the publishing agent (backpressure) for up to publish_timeout seconds,
+    after that the client is considered gone and the session stops being streamed.
+    It also knows the runs started by delegation tools, so a parent that gives up can stop them.
+    """
+
+    def __init__(self, queue_size: int, publish_timeout: float) -> None:
+        super().__init__()
+        self.queue_size = queue_size
+        self.publish_timeout = publish_timeout
+        # Parent session id to the session ids of its running delegated runs.
+        self.delegations: Dict[str, Set[str]] = {}
+
+    def add_delegation(self, parent_session_id: str, session_id: str) -> None:
+        self.delegations.setdefault(parent_session_id, set()).add(session_id)
+
+    def remove_delegation(self, parent_session_id: str, session_id: str) -> None:
+        children = self.delegations.get(parent_session_id)
+        if children is not None:
+            children.discard(session_id)
+            if not children:
+                self.delegations.pop(parent_session_id, None)
+
+    def cancel_children(
+        self,
+        session_id: str,
+        agent_names: Sequence[str],
+        parent_session_id: Optional[str] = None,
+    ) -> int:
+        """
+        Cancel running team members of an agent that stopped waiting for them: runs of agent_names
+        in the session and, with parent_session_id, runs delegated by that session.
+        Returns the number of cancelled runs.
+        """
+        cancelled = 0
+        for task in self.running_tasks.get(session_id, []):
+            if task.get_name() in agent_names and not task.done():
+                task.cancel()
+                cancelled += 1
+        if parent_session_id is not None:
+            for child_session_id in self.delegations.pop(parent_session_id, set()):
+                self.finish_session(child_session_id)
+                cancelled += 1
+        return cancelled
+
+    def subscribe(self, session_id: str) -> None:
+        if session_id not in self.queues:
+            self.queues[session_id] = asyncio.Queue(maxsize=self.queue_size)
+
+    def unsubscribe(self, session_id: str) -> None:
+        self.queues.pop(session_id, None)
+
+    async def publish_event(
+        self,
+        session_id: str,
+        agent_name: str,
+        event_type: EventType = EventType.OUTPUT,
+        content: Optional[str] = None,
+    ) -> None:
+        queue = self.queues.get(session_id)
+        if queue is None:
+            return
+        event = AgentEvent(
+            session_id=session_id,
+            agent_name=agent_name,
+            event_type=event_type,
+            content=content,
+        )
+        try:
+            await asyncio.wait_for(queue.put(event), timeout=self.publish_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Client of session {session_id} is not reading events, detaching")
+            self.unsubscribe(session_id)
+
+    async def stream_batches(
+        self, session_id: str, heartbeat_interval: Optional[float] = None
+    ) -> AsyncGenerator[List[AgentEvent], None]:
+        """
+        Yield batches of merged events until the root agent ends.
+        Everything queued while the client was busy is sent at once, as few events as possible.
+        An empty batch is a heartbeat, yielded after heartbeat_interval seconds without events.
+        """
+        self.subscribe(session_id)
+        queue = self.queues[session_id]
+        root_agent_name = self.root_agent_name.get(session_id)
+        while True:
+            try:
+                first_event = await asyncio.wait_for(
+                    queue.get(), timeout=heartbeat_interval or self.publish_timeout
+                )
+            except asyncio.TimeoutError:
+                if self.queues.get(session_id) is not queue:
+                    # Detached by publish_event, nothing else will come.
+                    return
+                if heartbeat_interval:
+                    yield []
+                continue
+            events = [first_event]
+            while not queue.empty() and len(events) < MAX_MERGED_EVENTS:
+                events.append(queue.get_nowait())
+            yield merge_events(events)
+            if any(
+                e.event_type == EventType.AGENT_END and e.agent_name == root_agent_name
+                for e in events
+            ):
+                return
+
+
+def _format_sse(event_type: str, data: str) -> str:
+    return f"event: {event_type}\ndata: {data}\n\n"
+
+
+def create_agent_endpoint(
+    agent_app: FastAPI,
+    agent_instance: CodeActAgent,
+    server_host: str,
+    server_port: int,
+    event_bus: AgentEventBus,
+    token_usage_store: TokenUsageStore | None = None,
+) -> Callable[..., Any]:
+    """
+    Agent endpoint of codearkt with streaming through StreamingEventBus.
+    Streams are NDJSON of agent events by default and SSE with "Accept: text/event-stream".
+    SSE streams also carry "progress" events with the session profile while the agents are busy.
+    The AGENT_END event of the called agent carries its final answer.
+    """
+    assert isinstance(event_bus, StreamingEventBus)
+
+    @agent_app.post(f"/{agent_instance.name}")
+    async def agent_tool(request: AgentRequest, http_request: Request) -> Any:
+        session_id = request.session_id or get_unique_id()
+        parent_session_id = http_request.headers.get(PARENT_SESSION_HEADER)
+        if request.stream:
+            # Before the start, so no events are lost.
+            event_bus.subscribe(session_id)
+        # The task copies the context, so the run sees the parent session of a delegation.
+        parent_token = PARENT_SESSION_ID.set(parent_session_id)
+        try:
+            task = asyncio.create_task(
+                agent_instance.ainvoke(
+                    messages=request.messages,
+                    session_id=session_id,
+                    event_bus=event_bus,
+                    token_usage_store=token_usage_store,
+                    server_host=server_host,
+                    server_port=server_port,
+                ),
+                # Parents find the runs of their team members by name, see cancel_children.
+                name=agent_instance.name,
+            )
+        finally:
+            PARENT_SESSION_ID.reset(parent_token)
+        event_bus.register_task(session_id=session_id, agent_name=agent_instance.name, task=task)
+        if parent_session_id:
+            event_bus.add_delegation(parent_session_id, session_id)
+            task.add_done_callback(
+                lambda _: event_bus.remove_delegation(parent_session_id, session_id)
+            )
+        if not request.stream:
+            return await task
+
+        is_sse = "text/event-stream" in http_request.headers.get("accept", "")
+        heartbeat_interval = settings.STREAM_HEARTBEAT_INTERVAL if is_sse else None
+
+        async def _get_result() -> str:
+            try:
+                return str(await task)
+            except asyncio.CancelledError:
+                return "Cancelled"
+            except Exception as e:
+                return f"Error: {e}"
+
+        async def stream_response() -> AsyncGenerator[str, None]:
+            try:
+                async for batch in event_bus.stream_batches(session_id, heartbeat_interval):
+                    if not batch:
+                        profile = PROFILER.summary(parent_session_id or session_id)
+                        progress = json.dumps(profile, default=str)
+                        yield _format_sse("progress", progress)
+                        continue
+                    for event in batch:
+                        is_end = event.event_type == EventType.AGENT_END
+                        if is_end and event.agent_name == agent_instance.name:
+                            event = event.model_copy(update={"content": await _get_result()})
+                        data = event.model_dump_json()
+                        yield _format_sse(event.event_type, data) if is_sse else data + "\n"
+            finally:
+                event_bus.unsubscribe(session_id)
+                if not task.done() and settings.STREAM_CANCEL_ON_DISCONNECT:
+                    logger.info(f"Client of session {session_id} disconnected, cancelling")
+                    event_bus.finish_session(session_id)
+
+        media_type = "text/event-stream" if is_sse else "application/x-ndjson"
+        return StreamingResponse(
+            stream_response(), media_type=media_type, headers=AGENT_RESPONSE_HEADERS
+        )
+
+    return agent_tool
+
+
+def _create_event_bus() -> StreamingEventBus:
+    return StreamingEventBus(
+        queue_size=settings.STREAM_QUEUE_SIZE,
+        publish_timeout=settings.STREAM_PUBLISH_TIMEOUT,
+    )
+
+
+def install_streaming() -> None:
+    # codearkt creates the event bus and agent endpoints through these module-level names,
+    # so every run_server and temporary server streams through holosophos.
+    codearkt_server.AgentEventBus = _create_event_bus  # type: ignore
+    codearkt_server.create_agent_endpoint = create_agent_endpoint
@@ -0,0 +1,526 @@
+import asyncio
+import contextlib
+import functools
+import logging
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence
+
+import codearkt.server as codearkt_server
+from codearkt.server import PROXY_SSE_READ_TIMEOUT
+from fastmcp import FastMCP
+from fastmcp.client.transports import ClientTransport, SSETransport, StreamableHttpTransport
+from fastmcp.mcp_config import (
+    MCPConfig,
+    RemoteMCPServer,
+    StdioMCPServer,
+    infer_transport_type_from_url,
+)
+from fastmcp.server.middleware import CallNext, Middleware, MiddlewareContext
+from fastmcp.exceptions import ToolError
+from fastmcp.server.proxy import FastMCPProxy
+from fastmcp.tools.tool import Tool, ToolResult
+from mcp import types as mt
+from pydantic import PrivateAttr, TypeAdapter
+from starlette.applications import Starlette
+
+from holosophos.admission import AdmissionController, AdmissionMiddleware
+from holosophos.cache import SqliteCache, make_cache_key
+from holosophos.blackboard import blackboard_list, blackboard_read, blackboard_write
+from holosophos.delegation import (
+    delegate_cancel,
+    delegate_parallel,
+    delegate_start,
+    delegate_status,
+)
+from holosophos.documents import DocumentStore, get_document_store, search_documents
+from holosophos.mcp_pool import PooledMCPClient
+from holosophos.profiler import PROFILER
+from holosophos.rate_limit import get_tool_bucket, is_rate_limit_error, parse_retry_after
+from holosophos.settings import settings
+from holosophos.streaming import install_streaming
+from holosophos.trace import TraceStore, get_trace_store
+from holosophos.workspace import WORKSPACES, SessionWorkspaces
+
+# Tools with side effects, never cached even if configured.
+UNCACHEABLE_TOOLS = (
+    "bash",
+    "remote_bash",
+    "text_editor",
+    "remote_text_editor",
+    "install_with_apt",
+)
+CONTENT_ADAPTER: TypeAdapter[List[mt.ContentBlock]] = TypeAdapter(List[mt.ContentBlock])
+DEFAULT_MAX_IN_FLIGHT = 16
+DOCUMENT_ID_LENGTH = 16
+TEXT_EDITOR_WRITE_COMMANDS = ("write", "append", "insert", "str_replace")
+# Extra seconds for tools with a clamped "timeout" argument to kill the command and return output.
+TOOL_TIMEOUT_GRACE = 10.0
+# Tools served by this process, replays run them for real.
+LOCAL_TOOLS = (
+    "delegate_parallel",
+    "delegate_start",
+    "delegate_status",
+    "delegate_cancel",
+    "search_documents",
+    "blackboard_list",
+    "blackboard_read",
+    "blackboard_write",
+)
+
+logger = logging.getLogger(__name__)
+
+
+def dump_tool_result(result: ToolResult) -> Dict[str, Any]:
+    return {
+        "content": [block.model_dump(mode="json") for block in result.content],
+        "structured_content": result.structured_content,
+    }
+
+
+def load_tool_result(data: Dict[str, Any]) -> ToolResult:
+    return ToolResult(
+        content=CONTENT_ADAPTER.validate_python(data["content"]),
+        structured_content=data["structured_content"],
+    )
+
+
+def get_result_text(result: ToolResult) -> str:
+    return "\n\n".join(block.text for block in result.content if isinstance(block, mt.TextContent))
+
+
+def replace_result_text(result: ToolResult, text: str) -> ToolResult:
+    structured = result.structured_content
+    if structured is None:
+        return ToolResult(content=[mt.TextContent(type="text", text=text)])
+    if set(structured) == {"result"} and isinstance(structured["result"], str):
+        # Wrapped string outputs, the structured copy has to match the text.
+        return ToolResult(
+            content=[mt.TextContent(type="text", text=text)],
+            structured_content={"result": text},
+        )
+    # Other structured outputs are returned whole to keep them valid.
+    return result
+
+
+class ToolCacheMiddleware(Middleware):
+    def __init__(self, cache: SqliteCache, ttls: Dict[str, int]) -> None:
+        self.cache = cache
+        self.ttls = {
+            name: ttl for name, ttl in ttls.items() if name not in UNCACHEABLE_TOOLS and ttl > 0
+        }
+
+    async def on_call_tool(
+        self,
+        context: MiddlewareContext[mt.CallToolRequestParams],
+        call_next: CallNext[mt.CallToolRequestParams, ToolResult],
+    ) -> ToolResult:
+        name = context.message.name
+        if name not in self.ttls:
+            return await call_next(context)
+
+        key = make_cache_key(name, context.message.arguments or {})
+        cached = await self.cache.aget(key)
+        if cached is not None:
+            logger.debug(f"Tool cache hit: {name}")
+            return load_tool_result(cached)
+
+        # Failed calls raise and are never stored.
+        result: ToolResult = await call_next(context)
+        await self.cache.aset(key, dump_tool_result(result), ttl=self.ttls[name])
+        return result
+
+
+class ToolRecorderMiddleware(Middleware):
+    def __init__(self, trace: TraceStore) -> None:
+        self.trace = trace
+
+    async def on_list_tools(
+        self,
+        context: MiddlewareContext[mt.ListToolsRequest],
+        call_next: CallNext[mt.ListToolsRequest, List[Tool]],
+    ) -> List[Tool]:
+        tools: List[Tool] = await call_next(context)
+        for tool in tools:
+            self.trace.record(
+                "tool_definition",
+                tool.name,
+                {
+                    "description": tool.description,
+                    "parameters": tool.parameters,
+                    "output_schema": tool.output_schema,
+                },
+            )
+        return tools
+
+    async def on_call_tool(
+        self,
+        context: MiddlewareContext[mt.CallToolRequestParams],
+        call_next: CallNext[mt.CallToolRequestParams, ToolResult],
+    ) -> ToolResult:
+        result: ToolResult = await call_next(context)
+        key = make_cache_key(context.message.name, context.message.arguments or {})
+        self.trace.record("tool", key, dump_tool_result(result))
+        return result
+
+
+class ReplayTool(Tool):
+    """Stub of a recorded MCP tool, returns recorded results without calling the real server."""
+
+    _trace: TraceStore = PrivateAttr()
+
+    @classmethod
+    def from_trace(cls, name: str, trace: TraceStore) -> "ReplayTool":
+        definition = trace.tools[name]
+        tool = cls(
+            name=name,
+            description=definition["description"],
+            parameters=definition["parameters"],
+            output_schema=definition["output_schema"],
+        )
+        tool._trace = trace
+        return tool
+
+    async def run(self, arguments: Dict[str, Any]) -> ToolResult:
+        recorded = self._trace.replay("tool", make_cache_key(self.name, arguments))
+        if recorded is None:
+            raise ValueError(f"No recorded result in {self._trace.path} for {self.name}")
+        return load_tool_result(recorded)
+
+
+class DocumentIndexMiddleware(Middleware):
+    """Chunks and indexes long documents returned by download tools for search_documents."""
+
+    def __init__(
+        self,
+        store: DocumentStore,
+        tool_names: Sequence[str],
+        min_chars: int,
+        preview_chars: Optional[int],
+    ) -> None:
+        self.store = store
+        self.tool_names = set(tool_names)
+        self.min_chars = min_chars
+        self.preview_chars = preview_chars
+
+    async def on_call_tool(
+        self,
+        context: MiddlewareContext[mt.CallToolRequestParams],
+        call_next: CallNext[mt.CallToolRequestParams, ToolResult],
+    ) -> ToolResult:
+        result: ToolResult = await call_next(context)
+        name = context.message.name
+        if name not in self.tool_names:
+            return result
+        text = get_result_text(result)
+        if len(text) < self.min_chars:
+            return result
+
+        arguments = context.message.arguments or {}
+        document_id = make_cache_key(name, arguments)[:DOCUMENT_ID_LENGTH]
+        title = f"{name}({', '.join(str(value) for value in arguments.values())})"
+        await asyncio.to_thread(self.store.add, document_id, text, title)
+        if self.preview_chars is None or len(text) <= self.preview_chars:
+            return result
+        preview = (
+            text[: self.preview_chars]
+            + f"\n...[{len(text) - self.preview_chars} more characters]...\n"
+            + f'The full text is indexed as document_id="{document_id}", '
+            + "use search_documents to find the relevant passages."
+        )
+        return replace_result_text(result, preview)
+
+
+class SessionWorkspaceMiddleware(Middleware):
+    """
+    Soft disk quota of session workspaces. Tool calls carry no session id,
+    so the session is found by the path or cwd argument pointing into its workspace.
+    """
+
+    def __init__(self, workspaces: SessionWorkspaces, tool_names: Sequence[str]) -> None:
+        self.workspaces = workspaces
+        self.tool_names = set(tool_names)
+
+    def _quota_message(self, session_dir: str) -> str:
+        quota_mb = (self.workspaces.quota_bytes or 0) / 1024 / 1024
+        return (
+            f"Workspace quota of {quota_mb:.0f} MB is exceeded in "
+            f"{self.workspaces.sessions_dir}/{session_dir}. Delete files you do not need."
+        )
+
+    async def on_call_tool(
+        self,
+        context: MiddlewareContext[mt.CallToolRequestParams],
+        call_next: CallNext[mt.CallToolRequestParams, ToolResult],
+    ) -> ToolResult:
+        arguments = context.message.arguments or {}
+        path = arguments.get("path") or arguments.get("cwd")
+        if (
+            context.message.name not in self.tool_names
+            or self.workspaces.quota_bytes is None
+            or not isinstance(path, str)
+        ):
+            return await call_next(context)
+        session_dir = self.workspaces.find_session(path)
+        if session_dir is None:
+            return await call_next(context)
+
+        is_write = arguments.get("command") in TEXT_EDITOR_WRITE_COMMANDS
+        if is_write and await asyncio.to_thread(self.workspaces.is_over_quota, session_dir):
+            raise ToolError(self._quota_message(session_dir))
+        result: ToolResult = await call_next(context)
+        if await asyncio.to_thread(self.workspaces.is_over_quota, session_dir):
+            # Commands that delete files must still work, so bash is only warned.
+            text = get_result_text(result) + "\n\n" + self._quota_message(session_dir)
+            return replace_result_text(result, text)
+        return result
+
+
+class ToolTimeoutMiddleware(Middleware):
+    """
+    Deadlines of single tool calls. A call over its deadline is cancelled, which also cancels
+    the request to the MCP server, and fails with a "timed out" error the agent can react to.
+    Tools with their own "timeout" argument, like bash, get it clamped to the deadline,
+    so the command is killed on the MCP server side first and its output is returned.
+    """
+
+    def __init__(
+        self,
+        timeouts: Dict[str, float],
+        default_timeout: Optional[float],
+        local_tools: Sequence[str] = LOCAL_TOOLS,
+    ) -> None:
+        self.timeouts = timeouts
+        self.default_timeout = default_timeout
+        self.local_tools = set(local_tools)
+
+    def get_timeout(self, name: str) -> Optional[float]:
+        if name in self.timeouts:
+            return self.timeouts[name]
+        # Local tools run team members, they are limited by agent timeouts.
+        return None if name in self.local_tools else self.default_timeout
+
+    async def on_call_tool(
+        self,
+        context: MiddlewareContext[mt.CallToolRequestParams],
+        call_next: CallNext[mt.CallToolRequestParams, ToolResult],
+    ) -> ToolResult:
+        name = context.message.name
+        timeout = self.get_timeout(name)
+        if timeout is None:
+            return await call_next(context)
+        arguments = context.message.arguments or {}
+        tool_timeout = arguments.get("timeout")
+        deadline_seconds = timeout
+        if isinstance(tool_timeout, (int, float)):
+            deadline_seconds += TOOL_TIMEOUT_GRACE
+            if tool_timeout > timeout:
+                arguments = {**arguments, "timeout": int(timeout)}
+                context = context.copy(
+                    message=context.message.model_copy(update={"arguments": arguments})
+                )
+        try:
+            async with asyncio.timeout(deadline_seconds) as deadline:
+                result: ToolResult = await call_next(context)
+                return result
+        except TimeoutError:
+            if not deadline.expired():
+                raise
+            raise ToolError(
+                f"Timed out: {name} did not finish in {timeout:.0f} seconds and was cancelled. "
+                "Try a smaller input, a cheaper alternative or another approach."
+            )
+
+
+class ToolProfilerMiddleware(Middleware):
+    async def on_call_tool(
+        self,
+        context: MiddlewareContext[mt.CallToolRequestParams],
+        call_next: CallNext[mt.CallToolRequestParams, ToolResult],
+    ) -> ToolResult:
+        start_time = time.perf_counter()
+        is_error = True
+        try:
+            result: ToolResult = await call_next(context)
+            is_error = False
+            return result
+        finally:
+            elapsed = time.perf_counter() - start_time
+            PROFILER.record_tool(context.message.name, elapsed, is_error=is_error)
+
+
+class ToolRateLimitMiddleware(Middleware):
+    async def on_call_tool(
+        self,
+        context: MiddlewareContext[mt.CallToolRequestParams],
+        call_next: CallNext[mt.CallToolRequestParams, ToolResult],
+    ) -> ToolResult:
+        bucket = get_tool_bucket(context.message.name)
+        for attempt in range(settings.RATE_LIMIT_MAX_RETRIES + 1):
+            await bucket.acquire()
+            try:
+                result: ToolResult = await call_next(context)
+                return result
+            except ToolError as e:
+                # MCP errors carry no headers, Retry-After can only be found in the message.
+                if attempt == settings.RATE_LIMIT_MAX_RETRIES or not is_rate_limit_error(str(e)):
+                    raise
+                retry_after = parse_retry_after(str(e))
+                bucket.block_for(retry_after or settings.RATE_LIMIT_DEFAULT_BACKOFF)
+        raise AssertionError("unreachable")
+
+
+def get_tool_middlewares() -> List[Middleware]:
+    # Middlewares run in order, the profiler goes first to see cache hits as well.
+    middlewares: List[Middleware] = [ToolProfilerMiddleware()]
+    if settings.DOCUMENT_INDEX_ENABLED:
+        # Before the cache, so cached documents are indexed too.
+        middlewares.append(
+            DocumentIndexMiddleware(
+                get_document_store(),
+                tool_names=settings.DOCUMENT_INDEX_TOOLS,
+                min_chars=settings.DOCUMENT_MIN_CHARS,
+                preview_chars=settings.DOCUMENT_PREVIEW_CHARS,
+            )
+        )
+    if settings.SESSION_WORKSPACES_ENABLED and settings.TRACE_MODE != "replay":
+        middlewares.append(SessionWorkspaceMiddleware(WORKSPACES, settings.SESSION_WORKSPACE_TOOLS))
+    if settings.TOOL_CACHE_ENABLED:
+        cache = SqliteCache(
+            Path(settings.CACHE_DIR) / "tools.sqlite",
+            max_entries=settings.TOOL_CACHE_MAX_ENTRIES,
+        )
+        middlewares.append(ToolCacheMiddleware(cache, settings.TOOL_CACHE_TTLS))
+    if settings.TRACE_MODE == "record":
+        middlewares.append(ToolRecorderMiddleware(get_trace_store(settings.TRACE_PATH)))
+    if settings.TRACE_MODE != "replay":
+        # Last, so cache hits do not spend rate limit tokens.
+        middlewares.append(ToolRateLimitMiddleware())
+    # Innermost, waiting for rate limits does not count against deadlines.
+    middlewares.append(ToolTimeoutMiddleware(settings.TOOL_TIMEOUTS, settings.TOOL_DEFAULT_TIMEOUT))
+    return middlewares
+
+
+async def _get_pooled(pool: PooledMCPClient) -> PooledMCPClient:
+    await pool.ensure_connected()
+    return pool
+
+
+def get_mcp_app(
+    mcp_config: Optional[Dict[str, Any]],
+    additional_tools: Optional[Dict[str, Callable[..., Any]]] = None,
+    add_prefixes: bool = True,
+) -> Starlette:
+    mcp: FastMCP[Any] = FastMCP(name="Holosophos MCP Proxy")
+    pools: List[PooledMCPClient] = []
+    # Replays serve recorded tools instead of connecting to the real servers.
+    if mcp_config and settings.TRACE_MODE != "replay":
+        cfg = MCPConfig.from_dict(mcp_config)
+        server_count = len(cfg.mcpServers)
+
+        for name, server in cfg.mcpServers.items():
+            transport: Optional[ClientTransport] = None
+            if isinstance(server, RemoteMCPServer):
+                transport_type = server.transport or infer_transport_type_from_url(server.url)
+                transport_cls = SSETransport if transport_type == "sse" else StreamableHttpTransport
+                transport = transport_cls(
+                    server.url,
+                    headers=server.headers,
+                    auth=server.auth,
+                    sse_read_timeout=PROXY_SSE_READ_TIMEOUT,
+                )
+            elif isinstance(server, StdioMCPServer):
+                transport = server.to_transport()
+
+            assert transport is not None, "Transport is required for the MCP server in the config"
+            sub_proxy: FastMCP[Any]
+            if settings.MCP_POOL_ENABLED:
+                pool = PooledMCPClient(
+                    transport,
+                    name=name,
+                    max_in_flight=settings.MCP_MAX_IN_FLIGHT.get(name, DEFAULT_MAX_IN_FLIGHT),
+                    health_check_interval=settings.MCP_HEALTH_CHECK_INTERVAL,
+                    max_backoff=settings.MCP_RECONNECT_MAX_BACKOFF,
+                    connect_attempts=settings.MCP_CONNECT_ATTEMPTS,
+                )
+                pools.append(pool)
+                sub_proxy = FastMCPProxy(client_factory=functools.partial(_get_pooled, pool))
+            else:
+                sub_proxy = FastMCP.as_proxy(backend=transport)
+            prefix: Optional[str] = None if server_count == 1 else name
+            if not add_prefixes:
+                prefix = None
+            mcp.mount(prefix=prefix, server=sub_proxy)
+
+    for delegation_tool in (delegate_parallel, delegate_start, delegate_status, delegate_cancel):
+        mcp.tool(delegation_tool, name=delegation_tool.__name__)
+    mcp.tool(search_documents, name="search_documents")
+    for blackboard_tool in (blackboard_list, blackboard_read, blackboard_write):
+        mcp.tool(blackboard_tool, name=blackboard_tool.__name__)
+    if additional_tools:
+        for name, tool in additional_tools.items():
+            mcp.tool(tool, name=name)
+
+    if settings.TRACE_MODE == "replay":
+        trace = get_trace_store(settings.TRACE_PATH)
+        local_tools = {*LOCAL_TOOLS, *(additional_tools or {})}
+        for name in trace.tools:
+            if name not in local_tools:
+                mcp.add_tool(ReplayTool.from_trace(name, trace))
+
+    for middleware in get_tool_middlewares():
+        mcp.add_middleware(middleware)
+
+    app = mcp.http_app()
+    if pools:
+        mcp_lifespan = app.router.lifespan_context
+
+        @contextlib.asynccontextmanager
+        async def lifespan(app: Starlette) -> AsyncIterator[None]:
+            # Pools live as long as the app: the whole server.py process or a batch run.
+            for pool in pools:
+                await pool.start()
+            try:
+                async with mcp_lifespan(app):
+                    yield
+            finally:
+                for pool in pools:
+                    with contextlib.suppress(Exception):
+                        await pool.close()
+
+        app.router.lifespan_context = lifespan
+
+    if settings.SERVER_MAX_ACTIVE_SESSIONS > 0:
+        # Only sessions started by clients are queued, calls to sub-agents from running sessions
+        # go to other endpoints and are never blocked.
+        controller = AdmissionController(
+            max_active=settings.SERVER_MAX_ACTIVE_SESSIONS,
+            max_queued=settings.SERVER_MAX_QUEUED_SESSIONS,
+            max_queued_per_client=settings.SERVER_MAX_QUEUED_PER_CLIENT,
+            default_retry_after=settings.SERVER_RETRY_AFTER,
+        )
+        paths = [f"/agents/{name}" for name in settings.SERVER_ADMISSION_AGENTS]
+        app.add_middleware(
+            AdmissionMiddleware,
+            controller=controller,
+            paths=paths,
+            max_priority=settings.SERVER_MAX_PRIORITY,
+        )
+        app.add_route("/admission", controller.stats_endpoint, methods=["GET"])
+    return app
+
+
+def install_tools_server() -> None:
+    # codearkt builds its tools proxy through this module-level function,
+    # so every run_query/run_batch/run_server goes through holosophos middlewares.
+    codearkt_server.get_mcp_app = get_mcp_app  # type: ignore[assignment]
+
+
+def install_server_extensions() -> None:
+    """
+    Route codearkt servers through holosophos: the tools proxy with middlewares and streaming.
+    Called by compose_main_agent and by entry points that start servers, importing holosophos
+    never patches codearkt. Calling it again does nothing new.
+    """
+    install_tools_server()
+    install_streaming()
@@ -0,0 +1,52 @@
+import functools
+import json
+import threading
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Any, Deque, Dict, Optional, Tuple
+
+
+class TraceStore:
+    """Append-only JSONL log of LLM completions and tool results for deterministic replays."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, str], Deque[Any]] = defaultdict(deque)
+        self._last: Dict[Tuple[str, str], Any] = {}
+        self.tools: Dict[str, Dict[str, Any]] = {}
+        if self.path.exists():
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self._load_entry(json.loads(line))
+
+    def _load_entry(self, entry: Dict[str, Any]) -> None:
+        if entry["type"] == "tool_definition":
+            self.tools[entry["key"]] = entry["value"]
+            return
+        self._entries[(entry["type"], entry["key"])].append(entry["value"])
+
+    def record(self, entry_type: str, key: str, value: Any) -> None:
+        entry = {"type": entry_type, "key": key, "value": value}
+        with self._lock:
+            if entry_type == "tool_definition":
+                if key in self.tools:
+                    return
+                self.tools[key] = value
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def replay(self, entry_type: str, key: str) -> Optional[Any]:
+        # Identical requests get recorded values in order, the last one is repeated after that.
+        with self._lock:
+            entries = self._entries.get((entry_type, key))
+            if entries:
+                self._last[(entry_type, key)] = entries.popleft()
+            return self._last.get((entry_type, key))
+
+
+@functools.lru_cache(maxsize=None)
+def get_trace_store(path: str) -> TraceStore:
+    return TraceStore(path)
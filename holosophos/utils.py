@@ -1,19 +1,59 @@
-from typing import Any, Dict
+import functools
+import os
+from pathlib import Path
+from typing import Any, Dict, Sequence, Tuple
 
 import yaml
-from jinja2 import Template
+from jinja2 import Environment, Template
+from codearkt.prompt_storage import PromptStorage
 
 from holosophos.files import PROMPTS_DIR_PATH
 
+TEMPLATE_CACHE_SIZE = 256
+
+JINJA_ENV = Environment()
+_PROMPT_FILES_CACHE: Dict[Path, Tuple[int, Dict[str, Any]]] = {}
+
 
 def get_prompt(template_name: str) -> Dict[str, Any]:
     template_path = PROMPTS_DIR_PATH / f"{template_name}.yaml"
+    mtime = template_path.stat().st_mtime_ns
+    cached = _PROMPT_FILES_CACHE.get(template_path)
+    if cached is not None and cached[0] == mtime:
+        return dict(cached[1])
     with open(template_path, encoding="utf-8") as f:
         template = f.read()
     templates: Dict[str, Any] = yaml.safe_load(template)
-    return templates
+    _PROMPT_FILES_CACHE[template_path] = (mtime, templates)
+    return dict(templates)
+
+
+@functools.lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def compile_template(prompt: str) -> Template:
+    # Strings cache their hash, so repeated lookups of the same prompt are O(1).
+    return JINJA_ENV.from_string(prompt)
 
 
 def render_prompt(prompt: str, **kwargs: Any) -> str:
-    template = Template(prompt)
-    return template.render(**kwargs).strip() + "\n"
+    template = compile_template(prompt)
+    rendered: str = template.render(**kwargs)
+    return rendered.strip() + "\n"
+
+
+@functools.cache
+def load_prompts(name: str) -> PromptStorage:
+    return PromptStorage.load(PROMPTS_DIR_PATH / f"{name}.yaml")
+
+
+def preload_prompts() -> None:
+    for path in sorted(PROMPTS_DIR_PATH.glob("*.yaml")):
+        load_prompts(path.stem)
+
+
+def get_cacheable_prefix_length(
+    prompts: PromptStorage, tools: Sequence[Any] = ()
+) -> Tuple[int, int]:
+    """Return the length of the date-independent system prompt prefix and the full length."""
+    first = prompts.system.render(tools=tools, current_date="1970-01-01")
+    second = prompts.system.render(tools=tools, current_date="2099-12-31")
+    return len(os.path.commonprefix([first, second])), len(first)
@@ -0,0 +1,216 @@
+import logging
+import math
+import os
+import re
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Literal, Optional, Sequence, Tuple
+
+from holosophos.settings import settings
+
+SESSION_ID_RE = re.compile(r"[^\w-]")
+SCRATCH_DIR_NAME = "scratch"
+
+logger = logging.getLogger(__name__)
+
+EndAction = Literal["keep", "archive", "delete"]
+
+
+def get_dir_size(path: Path) -> int:
+    """Total size of files under the path in bytes, symlinks are not followed."""
+    total = 0
+    stack = [path]
+    while stack:
+        current = stack.pop()
+        try:
+            entries = list(os.scandir(current))
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            continue
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(Path(entry.path))
+                elif entry.is_file(follow_symlinks=False):
+                    total += entry.stat(follow_symlinks=False).st_size
+            except FileNotFoundError:
+                continue
+    return total
+
+
+class SessionWorkspaces:
+    """
+    Per-session subdirectories of the shared workspace, so files of concurrent sessions never
+    collide and directory listings stay short. A workspace is created when the first agent of the
+    session starts and is archived or deleted when the last one finishes. Archived workspaces are
+    restored when the session continues. Ended workspaces and archives are pruned by age and count.
+    Scratch data can live on a tmpfs: the scratch subdirectory is then a symlink to scratch_root,
+    which must be mounted at the same path in all containers.
+    Tools of the MCP servers see the workspace under their own mount points, container_roots.
+    """
+
+    def __init__(
+        self,
+        root_dir: str | Path,
+        sessions_dir: str = "sessions",
+        archive_dir: str = ".archives",
+        quota_bytes: Optional[int] = None,
+        scratch_root: Optional[str | Path] = None,
+        end_action: EndAction = "keep",
+        container_roots: Sequence[str] = (),
+        max_age: Optional[float] = None,
+        max_count: Optional[int] = None,
+    ) -> None:
+        self.root_dir = Path(root_dir)
+        self.sessions_dir = sessions_dir
+        self.archive_dir = archive_dir
+        self.quota_bytes = quota_bytes
+        self.scratch_root = Path(scratch_root) if scratch_root else None
+        self.end_action = end_action
+        self.container_roots = [Path(root) for root in container_roots]
+        self.max_age = max_age
+        self.max_count = max_count
+        self._lock = threading.Lock()
+        self._active: Dict[str, int] = {}
+
+    def relative_path(self, session_id: str) -> str:
+        """Path of the session workspace relative to the workspace root, as tools expect it."""
+        return f"{self.sessions_dir}/{SESSION_ID_RE.sub('_', session_id)}"
+
+    def path(self, session_id: str) -> Path:
+        return self.root_dir / self.relative_path(session_id)
+
+    def scratch_path(self, session_id: str) -> Optional[Path]:
+        if self.scratch_root is None:
+            return None
+        return self.scratch_root / SESSION_ID_RE.sub("_", session_id)
+
+    def find_session(self, path: str) -> Optional[str]:
+        """Directory name of the session that a tool path argument points into."""
+        normalized = Path(os.path.normpath(path))
+        parts = normalized.parts
+        if normalized.is_absolute():
+            for root in [*self.container_roots, self.root_dir.resolve()]:
+                if normalized.is_relative_to(root):
+                    parts = normalized.relative_to(root).parts
+                    break
+            else:
+                return None
+        if len(parts) >= 2 and parts[0] == self.sessions_dir:
+            return parts[1]
+        return None
+
+    def acquire(self, session_id: str) -> Path:
+        with self._lock:
+            self._active[session_id] = self._active.get(session_id, 0) + 1
+            path = self.path(session_id)
+            archive_path = self._archive_base(path).with_suffix(".tar.gz")
+            if not path.exists() and archive_path.exists():
+                # Sessions continued by clients get their files back.
+                shutil.unpack_archive(archive_path, path, filter="data")
+                archive_path.unlink()
+            path.mkdir(parents=True, exist_ok=True)
+            # The modification time tells pruning when the workspace was last used.
+            os.utime(path)
+            scratch_path = self.scratch_path(session_id)
+            scratch_link = path / SCRATCH_DIR_NAME
+            if scratch_path is not None and not scratch_link.exists():
+                scratch_path.mkdir(parents=True, exist_ok=True)
+                scratch_link.symlink_to(scratch_path, target_is_directory=True)
+        return path
+
+    def release(self, session_id: str) -> None:
+        with self._lock:
+            count = self._active.get(session_id, 0) - 1
+            if count > 0:
+                self._active[session_id] = count
+                return
+            self._active.pop(session_id, None)
+        self._finish(session_id)
+        self.prune()
+
+    def usage(self, session_id: str) -> int:
+        scratch_path = self.scratch_path(session_id)
+        scratch_size = get_dir_size(scratch_path) if scratch_path else 0
+        return get_dir_size(self.path(session_id)) + scratch_size
+
+    def is_over_quota(self, session_id: str) -> bool:
+        return self.quota_bytes is not None and self.usage(session_id) > self.quota_bytes
+
+    def prune(self) -> int:
+        """
+        Remove workspaces and archives of ended sessions older than max_age seconds
+        or beyond the max_count most recent ones, return how many were removed.
+        """
+        if self.max_age is None and self.max_count is None:
+            return 0
+        with self._lock:
+            active = {SESSION_ID_RE.sub("_", session_id) for session_id in self._active}
+            entries: List[Tuple[float, Path]] = []
+            sessions_path = self.root_dir / self.sessions_dir
+            if sessions_path.exists():
+                entries += [
+                    (path.stat().st_mtime, path)
+                    for path in sessions_path.iterdir()
+                    if path.is_dir() and path.name not in active
+                ]
+            archives_path = self.root_dir / self.archive_dir
+            if archives_path.exists():
+                entries += [
+                    (path.stat().st_mtime, path)
+                    for path in archives_path.glob("*.tar.gz")
+                    if path.name.removesuffix(".tar.gz") not in active
+                ]
+            entries.sort(reverse=True)
+            deadline = time.time() - self.max_age if self.max_age is not None else -math.inf
+            removed = 0
+            for index, (mtime, path) in enumerate(entries):
+                if mtime >= deadline and (self.max_count is None or index < self.max_count):
+                    continue
+                if path.is_dir():
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    path.unlink(missing_ok=True)
+                removed += 1
+        if removed:
+            logger.info(f"Pruned {removed} ended session workspaces")
+        return removed
+
+    def _archive_base(self, path: Path) -> Path:
+        return self.root_dir / self.archive_dir / path.name
+
+    def _finish(self, session_id: str) -> None:
+        path = self.path(session_id)
+        scratch_path = self.scratch_path(session_id)
+        if scratch_path is not None:
+            shutil.rmtree(scratch_path, ignore_errors=True)
+            (path / SCRATCH_DIR_NAME).unlink(missing_ok=True)
+        if not path.exists():
+            return
+        if self.end_action == "keep":
+            os.utime(path)
+            return
+        if self.end_action == "archive" and any(path.iterdir()):
+            archive_base = self._archive_base(path)
+            archive_base.parent.mkdir(parents=True, exist_ok=True)
+            shutil.make_archive(str(archive_base), "gztar", root_dir=path)
+            logger.info(f"Archived workspace of session {session_id} to {archive_base}.tar.gz")
+        shutil.rmtree(path, ignore_errors=True)
+
+
+WORKSPACES = SessionWorkspaces(
+    settings.WORKSPACE_DIR,
+    sessions_dir=settings.SESSION_WORKSPACES_DIR,
+    archive_dir=settings.SESSION_WORKSPACE_ARCHIVE_DIR,
+    quota_bytes=(
+        settings.SESSION_WORKSPACE_QUOTA_MB * 1024 * 1024
+        if settings.SESSION_WORKSPACE_QUOTA_MB is not None
+        else None
+    ),
+    scratch_root=settings.SESSION_SCRATCH_ROOT,
+    end_action=settings.SESSION_WORKSPACE_END_ACTION,
+    container_roots=settings.SESSION_WORKSPACE_CONTAINER_ROOTS,
+    max_age=settings.SESSION_WORKSPACE_MAX_AGE,
+    max_count=settings.SESSION_WORKSPACE_MAX_COUNT,
+)
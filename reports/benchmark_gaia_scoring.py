@@ -0,0 +1,28 @@
+import timeit
+
+import fire  # type: ignore
+
+from reports.gaia_scoring import GaiaScorer
+
+CASES = [
+    ("$1,000", "1000"),
+    ("3.0", "3"),
+    ("New-York ", "new york"),
+    ("a, b; 3", "A,b,3"),
+    ("x,$2", "x; 2"),
+    ("St. Petersburg", "Saint Petersburg"),
+]
+
+
+def benchmark_gaia_scoring(size: int = 100000, number: int = 5) -> None:
+    predicted = [p for p, _ in CASES] * (size // len(CASES))
+    true = [t for _, t in CASES] * (size // len(CASES))
+    scorer = GaiaScorer()
+    seconds = timeit.timeit(lambda: scorer.score(predicted, true), number=number) / number
+    print(
+        f"{len(predicted)} answers: {seconds:.3f}s, {seconds / len(predicted) * 1e6:.2f} us/answer"
+    )
+
+
+if __name__ == "__main__":
+    fire.Fire(benchmark_gaia_scoring)
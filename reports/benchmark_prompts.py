@@ -0,0 +1,43 @@
+import timeit
+
+import fire  # type: ignore
+import yaml
+from jinja2 import Template
+
+from holosophos.files import PROMPTS_DIR_PATH
+from holosophos.utils import get_prompt, render_prompt
+from reports.run_gaia import QUESTION_PROMPT
+
+
+def _render_uncached(prompt: str, **kwargs: str) -> str:
+    rendered: str = Template(prompt).render(**kwargs)
+    return rendered.strip() + "\n"
+
+
+def _get_prompt_uncached(template_name: str) -> None:
+    with open(PROMPTS_DIR_PATH / f"{template_name}.yaml", encoding="utf-8") as f:
+        yaml.safe_load(f.read())
+
+
+def _report(name: str, seconds: float, number: int) -> None:
+    print(f"{name:<28} {seconds / number * 1e6:10.1f} us/call")
+
+
+def benchmark_prompts(number: int = 1000, template_name: str = "system") -> None:
+    kwargs = {"question": "What is the capital of France?", "attached_files": "file.pdf"}
+    assert _render_uncached(QUESTION_PROMPT, **kwargs) == render_prompt(QUESTION_PROMPT, **kwargs)
+
+    seconds = timeit.timeit(lambda: _render_uncached(QUESTION_PROMPT, **kwargs), number=number)
+    _report("render_prompt (no cache)", seconds, number)
+    seconds = timeit.timeit(lambda: render_prompt(QUESTION_PROMPT, **kwargs), number=number)
+    _report("render_prompt (cached)", seconds, number)
+
+    yaml_number = max(1, number // 10)
+    seconds = timeit.timeit(lambda: _get_prompt_uncached(template_name), number=yaml_number)
+    _report("get_prompt (no cache)", seconds, yaml_number)
+    seconds = timeit.timeit(lambda: get_prompt(template_name), number=yaml_number)
+    _report("get_prompt (cached)", seconds, yaml_number)
+
+
+if __name__ == "__main__":
+    fire.Fire(benchmark_prompts)
@@ -0,0 +1,36 @@
+import asyncio
+import time
+
+import fire  # type: ignore
+from codearkt.server import run_query
+
+from holosophos.main_agent import MCP_CONFIG, get_main_agent
+from holosophos.profiler import PROFILER
+from holosophos.settings import settings
+
+
+async def _run(query: str, number: int) -> None:
+    agent = get_main_agent()
+    durations = []
+    for _ in range(number):
+        start_time = time.perf_counter()
+        await run_query(query, agent, mcp_config=MCP_CONFIG, add_mcp_server_prefixes=False)
+        durations.append(time.perf_counter() - start_time)
+    durations.sort()
+    print(f"runs: {number}")
+    print(f"min: {durations[0]:.2f}s median: {durations[len(durations) // 2]:.2f}s")
+    print(PROFILER.format())
+
+
+def benchmark_replay(query: str, trace_path: str = settings.TRACE_PATH, number: int = 3) -> None:
+    """
+    Replay a recorded run without network calls to benchmark the orchestration overhead.
+    Record the trace first: TRACE_MODE=record python -m holosophos.main_agent "<query>".
+    """
+    settings.TRACE_MODE = "replay"
+    settings.TRACE_PATH = trace_path
+    asyncio.run(_run(query, number))
+
+
+if __name__ == "__main__":
+    fire.Fire(benchmark_replay)
@@ -0,0 +1,35 @@
+import asyncio
+from typing import Optional
+
+import fire  # type: ignore
+from codearkt.tools import fetch_tools
+
+from holosophos.compaction import CHARS_PER_TOKEN
+from holosophos.main_agent import get_main_agent
+from holosophos.utils import get_cacheable_prefix_length
+
+
+async def _check(tools_url: Optional[str]) -> None:
+    all_tools = await fetch_tools(tools_url) if tools_url else []
+    for agent in get_main_agent().get_all_agents():
+        tools = sorted(
+            [tool for tool in all_tools if tool.name in agent.tool_names], key=lambda t: t.name
+        )
+        prefix_length, total_length = get_cacheable_prefix_length(agent.prompts, tools)
+        print(
+            f"{agent.name:<12} {prefix_length:>8} / {total_length:<8} chars"
+            f" | ~{prefix_length // CHARS_PER_TOKEN} tokens"
+            f" | {prefix_length / total_length:.1%} cacheable"
+        )
+
+
+def check_prompt_prefix(tools_url: Optional[str] = None) -> None:
+    """
+    Report how much of every system prompt is identical across sessions.
+    Pass the tools server address, for example localhost:5055, to include tool descriptions.
+    """
+    asyncio.run(_check(tools_url))
+
+
+if __name__ == "__main__":
+    fire.Fire(check_prompt_prefix)
@@ -0,0 +1,165 @@
+import re
+import string
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd  # type: ignore
+
+WHITESPACE_RE = re.compile(r"\s")
+PUNCTUATION_RE = re.compile(f"[{re.escape(string.punctuation)}]")
+
+
+@dataclass(frozen=True)
+class ScoringRules:
+    # Removed from predicted numbers before parsing.
+    number_chars: str = "$%,"
+    # Ground truth answers with these characters are scored as lists.
+    list_separators: str = ",;"
+    strip_punctuation: bool = True
+
+
+def get_final_answer(text: str) -> str:
+    if "Final answer:**" in text:
+        return text.split("Final answer:**")[-1].strip()
+    if "Final answer:" in text:
+        return text.split("Final answer:")[-1].strip()
+    return text.strip()
+
+
+def _compile_char_set(chars: str) -> re.Pattern[str]:
+    # An empty set never matches.
+    return re.compile(f"[{re.escape(chars)}]" if chars else "(?!)")
+
+
+class GaiaScorer:
+    """
+    Official GAIA answer matching for whole columns of predictions.
+    Normalizers are compiled once per rule set, numbers are parsed with float() like the official
+    scorer and compared for all answers at once.
+    """
+
+    def __init__(self, rules: ScoringRules = ScoringRules()) -> None:
+        self.rules = rules
+        self._number_chars_re = _compile_char_set(rules.number_chars)
+        self._separators_re = _compile_char_set(rules.list_separators)
+
+    def parse_numbers(
+        self, values: Sequence[str], strip_chars: bool = False
+    ) -> Tuple[npt.NDArray[np.float64], npt.NDArray[np.bool_]]:
+        """Parse strings with float(), return the values and the mask of valid numbers."""
+        numbers = np.full(len(values), np.inf)
+        is_valid = np.zeros(len(values), dtype=bool)
+        for index, value in enumerate(values):
+            if strip_chars:
+                value = self._number_chars_re.sub("", value)
+            try:
+                numbers[index] = float(value)
+                is_valid[index] = True
+            except ValueError:
+                pass
+        return numbers, is_valid
+
+    def normalize(self, values: Sequence[str], strip_punctuation: bool) -> List[str]:
+        normalized = [WHITESPACE_RE.sub("", value).lower() for value in values]
+        if strip_punctuation:
+            return [PUNCTUATION_RE.sub("", value) for value in normalized]
+        return normalized
+
+    def _match_strings(
+        self, predicted: Sequence[str], true: Sequence[str], strip_punctuation: bool
+    ) -> List[bool]:
+        predicted_normalized = self.normalize(predicted, strip_punctuation)
+        true_normalized = self.normalize(true, strip_punctuation)
+        return [p == t for p, t in zip(predicted_normalized, true_normalized)]
+
+    def _match_numbers(
+        self, predicted: Sequence[str], true_numbers: npt.NDArray[np.float64]
+    ) -> npt.NDArray[np.bool_]:
+        predicted_numbers, is_valid = self.parse_numbers(predicted, strip_chars=True)
+        predicted_numbers[~is_valid] = np.inf
+        result: npt.NDArray[np.bool_] = predicted_numbers == true_numbers
+        return result
+
+    def _match_lists(self, predicted: Sequence[str], true: Sequence[str]) -> List[bool]:
+        predicted_lists = [self._separators_re.split(value) for value in predicted]
+        true_lists = [self._separators_re.split(value) for value in true]
+        same_length = [len(p) == len(t) for p, t in zip(predicted_lists, true_lists)]
+        # All elements of all comparable lists are scored at once, then reduced per row.
+        rows = [index for index, same in enumerate(same_length) if same]
+        predicted_elements = [e for index in rows for e in predicted_lists[index]]
+        true_elements = [e for index in rows for e in true_lists[index]]
+        if not true_elements:
+            return same_length
+        true_numbers, is_number = self.parse_numbers(true_elements)
+        matches = np.zeros(len(true_elements), dtype=bool)
+        number_indices: List[int] = np.flatnonzero(is_number).tolist()
+        if number_indices:
+            matches[number_indices] = self._match_numbers(
+                [predicted_elements[i] for i in number_indices], true_numbers[number_indices]
+            )
+        string_indices: List[int] = np.flatnonzero(~is_number).tolist()
+        if string_indices:
+            matches[string_indices] = self._match_strings(
+                [predicted_elements[i] for i in string_indices],
+                [true_elements[i] for i in string_indices],
+                strip_punctuation=False,
+            )
+        offsets = np.cumsum([0] + [len(true_lists[index]) for index in rows[:-1]])
+        row_matches = np.logical_and.reduceat(matches, offsets)
+        result = [False] * len(predicted)
+        for index, is_match in zip(rows, row_matches):
+            result[index] = bool(is_match)
+        return result
+
+    def score(
+        self, predicted: Sequence[Optional[str]], true: Sequence[str]
+    ) -> npt.NDArray[np.bool_]:
+        pairs = [("None" if p is None else p, t) for p, t in zip(predicted, true)]
+        # Archives of runs repeat the same answers a lot, every distinct pair is scored once.
+        unique_pairs = {pair: index for index, pair in enumerate(dict.fromkeys(pairs))}
+        unique_result = self._score_unique(
+            [p for p, _ in unique_pairs], [t for _, t in unique_pairs]
+        )
+        indices = np.fromiter(
+            (unique_pairs[pair] for pair in pairs), dtype=np.int64, count=len(pairs)
+        )
+        result: npt.NDArray[np.bool_] = unique_result[indices]
+        return result
+
+    def _score_unique(
+        self, predicted_answers: Sequence[str], true: Sequence[str]
+    ) -> npt.NDArray[np.bool_]:
+        result = np.zeros(len(true), dtype=bool)
+        true_numbers, is_number = self.parse_numbers(true)
+
+        number_indices: List[int] = np.flatnonzero(is_number).tolist()
+        other_indices: List[int] = np.flatnonzero(~is_number).tolist()
+        if number_indices:
+            result[number_indices] = self._match_numbers(
+                [predicted_answers[i] for i in number_indices], true_numbers[number_indices]
+            )
+
+        list_indices = [i for i in other_indices if self._separators_re.search(true[i])]
+        if list_indices:
+            result[list_indices] = self._match_lists(
+                [predicted_answers[i] for i in list_indices], [true[i] for i in list_indices]
+            )
+
+        listed = set(list_indices)
+        string_indices = [i for i in other_indices if i not in listed]
+        if string_indices:
+            result[string_indices] = self._match_strings(
+                [predicted_answers[i] for i in string_indices],
+                [true[i] for i in string_indices],
+                strip_punctuation=self.rules.strip_punctuation,
+            )
+        return result
+
+
+def accuracy_by_level(levels: Sequence[str], is_correct: Sequence[bool]) -> Dict[str, float]:
+    frame = pd.DataFrame({"level": [str(level) for level in levels], "is_correct": is_correct})
+    accuracy: Dict[str, float] = frame.groupby("level")["is_correct"].mean().to_dict()
+    accuracy["all"] = float(frame["is_correct"].mean()) if len(frame) else 0.0
+    return accuracy
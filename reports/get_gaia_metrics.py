@@ -1,48 +1,114 @@
 import json
+import re
+from pathlib import Path
 from statistics import mean, median
+from typing import Any, Dict, List, Optional
 
 from datasets import load_dataset  # type: ignore
-import pandas as pd  # type: ignore
 import fire  # type: ignore
 
-from reports.run_gaia import _answer_scorer, _get_final_answer
+from holosophos.batch import read_jsonl
+from holosophos.profiler import sum_agent_stats
+from holosophos.settings import settings
+from reports.gaia_scoring import GaiaScorer, ScoringRules, accuracy_by_level, get_final_answer
 
+QUESTION_RE = re.compile(r"Here is the question:\n===\n(.*?)\n===", re.DOTALL)
 
-def get_gaia_metrics(predictions_path: str) -> None:
-    with open(predictions_path) as r:
-        records = [json.loads(line) for line in r]
 
-    eval_ds = load_dataset("gaia-benchmark/GAIA", "2023_all")["validation"]
-    eval_ds = eval_ds.rename_columns(
-        {"Question": "question", "Final answer": "true_answer", "Level": "task"}
+def load_ground_truth(
+    split: str = "validation", revision: Optional[str] = None, refresh: bool = False
+) -> Dict[str, Dict[str, Any]]:
+    # Without a revision the cache holds the latest version at download time, refresh updates it.
+    cache_path = Path(settings.CACHE_DIR) / f"gaia_{split}_{revision or 'latest'}_ground_truth.json"
+    if cache_path.exists() and not refresh:
+        with open(cache_path, encoding="utf-8") as f:
+            cached: Dict[str, Dict[str, Any]] = json.load(f)
+        return cached
+
+    eval_ds = load_dataset("gaia-benchmark/GAIA", "2023_all", revision=revision)[split]
+    columns = zip(
+        eval_ds["task_id"], eval_ds["Question"], eval_ds["Final answer"], eval_ds["Level"]
     )
-    eval_df = pd.DataFrame(eval_ds)
-    tasks_to_run = eval_df.to_dict(orient="records")
-    correct_count = 0
-    timeout_count = 0
-    all_count = 0
+    ground_truth: Dict[str, Dict[str, Any]] = {}
+    for task_id, question, answer, level in columns:
+        if str(task_id) in ground_truth:
+            raise ValueError(f"Duplicate task_id {task_id} in GAIA {split}")
+        ground_truth[str(task_id)] = {
+            "question": question,
+            "true_answer": str(answer),
+            "task": level,
+        }
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(cache_path, "w", encoding="utf-8") as f:
+        json.dump(ground_truth, f, ensure_ascii=False)
+    return ground_truth
+
+
+def _find_task_id(
+    record: Dict[str, Any],
+    ground_truth: Dict[str, Dict[str, Any]],
+    question_index: Dict[str, str],
+) -> Optional[str]:
+    task_id = record.get("task_id")
+    if task_id is not None:
+        return str(task_id)
+
+    # Older prediction files have no task_id, recover the question from the prompt.
+    match = QUESTION_RE.search(record["query"])
+    if match and match.group(1) in question_index:
+        return question_index[match.group(1)]
+    for candidate_id, task in ground_truth.items():
+        if task["question"] in record["query"]:
+            return candidate_id
+    return None
+
+
+def _score_records(
+    records: List[Dict[str, Any]],
+    ground_truth: Dict[str, Dict[str, Any]],
+    scorer: GaiaScorer,
+) -> Dict[str, Dict[str, Any]]:
+    question_index = {task["question"]: task_id for task_id, task in ground_truth.items()}
+    scored = {}
     for record in records:
-        true_answer = None
-        for task in tasks_to_run:
-            if task["question"] in record["query"]:
-                true_answer = task["true_answer"]
-                break
-        assert true_answer is not None
-        predicted_answer = record["result"]
-        predicted_answer = _get_final_answer(predicted_answer)
-        if "timeout" in predicted_answer.lower():
-            timeout_count += 1
-        is_correct = _answer_scorer(predicted_answer, str(true_answer))
-        correct_count += int(is_correct)
-        all_count += 1
-
-        if not is_correct:
-            print("True answer:", true_answer)
-            print("Predicted answwer:", predicted_answer)
-            print("Session ID:", record["session_id"])
-            print()
-    print("Accuracy:", correct_count / all_count)
-    print("Timeouts:", timeout_count / all_count)
+        task_id = _find_task_id(record, ground_truth, question_index)
+        assert task_id is not None, f"No ground truth for session {record['session_id']}"
+        predicted_answer = get_final_answer(record["result"])
+        scored[task_id] = {
+            **record,
+            "task_id": task_id,
+            "task": ground_truth[task_id]["task"],
+            "true_answer": ground_truth[task_id]["true_answer"],
+            "predicted_answer": predicted_answer,
+            "is_timeout": "timeout" in predicted_answer.lower(),
+        }
+
+    # The whole run is scored at once.
+    scored_records = list(scored.values())
+    labels = scorer.score(
+        [r["predicted_answer"] for r in scored_records], [r["true_answer"] for r in scored_records]
+    )
+    for record, is_correct in zip(scored_records, labels):
+        record["is_correct"] = bool(is_correct)
+    return scored
+
+
+def _print_metrics(name: str, records: List[Dict[str, Any]], verbose: bool) -> None:
+    if verbose:
+        for record in records:
+            if not record["is_correct"]:
+                print("True answer:", record["true_answer"])
+                print("Predicted answwer:", record["predicted_answer"])
+                print("Session ID:", record["session_id"])
+                print()
+
+    all_count = len(records)
+    print(f"=== {name}")
+    accuracy = accuracy_by_level([r["task"] for r in records], [r["is_correct"] for r in records])
+    print("Accuracy:", accuracy.pop("all"))
+    for level, level_accuracy in sorted(accuracy.items()):
+        print(f"Accuracy (level {level}):", level_accuracy)
+    print("Timeouts:", sum(int(r["is_timeout"]) for r in records) / all_count)
 
     total_prompt_tokens = sum([r["token_usage"]["prompt_tokens"] for r in records])
     total_completion_tokens = sum([r["token_usage"]["completion_tokens"] for r in records])
@@ -53,6 +119,56 @@ def get_gaia_metrics(predictions_path: str) -> None:
     print(f"Completion tokens: {total_completion_tokens // 1000000}M, {total_completion_tokens}")
     print("Avg duration:", avg_duration)
     print("Median duration:", median_duration)
+    agent_totals = sum_agent_stats(r["profile"] for r in records if "profile" in r)
+    for agent_name, stats in agent_totals.items():
+        print(f"Agent {agent_name}: {stats.describe()}")
+    print()
+
+
+def _print_diff(runs: Dict[str, Dict[str, Dict[str, Any]]]) -> None:
+    names = list(runs.keys())
+    common_ids = set.intersection(*(set(run.keys()) for run in runs.values()))
+    print(f"=== Diff over {len(common_ids)} common tasks")
+    for task_id in sorted(common_ids):
+        labels = [runs[name][task_id]["is_correct"] for name in names]
+        if len(set(labels)) == 1:
+            continue
+        print("Task ID:", task_id)
+        print("True answer:", runs[names[0]][task_id]["true_answer"])
+        for name in names:
+            record = runs[name][task_id]
+            print(f"{name}: {record['is_correct']}, {record['predicted_answer']}")
+        print()
+
+
+def get_gaia_metrics(
+    *predictions_paths: str,
+    split: str = "validation",
+    revision: Optional[str] = None,
+    refresh: bool = False,
+    diff: bool = False,
+    verbose: bool = True,
+    number_chars: str = ScoringRules.number_chars,
+    list_separators: str = ScoringRules.list_separators,
+    strip_punctuation: bool = ScoringRules.strip_punctuation,
+) -> None:
+    ground_truth = load_ground_truth(split, revision=revision, refresh=refresh)
+    scorer = GaiaScorer(ScoringRules(number_chars, list_separators, strip_punctuation))
+    runs = {}
+    for path in predictions_paths:
+        runs[path] = _score_records(read_jsonl(Path(path)), ground_truth, scorer)
+        _print_metrics(
+            path, list(runs[path].values()), verbose=verbose and len(predictions_paths) == 1
+        )
+
+    if len(runs) > 1:
+        # Later files take precedence for tasks present in several runs.
+        merged: Dict[str, Dict[str, Any]] = {}
+        for run in runs.values():
+            merged.update(run)
+        _print_metrics("merged", list(merged.values()), verbose=False)
+        if diff:
+            _print_diff(runs)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,115 @@
+import logging
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import fire  # type: ignore
+from dotenv import load_dotenv
+from phoenix.otel import register
+from codearkt.otel import CodeActInstrumentor
+
+from holosophos.batch import append_jsonl, iter_batch, read_completed_ids, read_jsonl
+from holosophos.evals import SUITES, compare_runs, stream_tasks, summarize
+from holosophos.main_agent import MCP_CONFIG, compose_main_agent
+from holosophos.settings import settings
+
+
+def _format_summary(name: str, summary: Dict[str, Any], baseline: Dict[str, Any]) -> str:
+    def _delta(key: str) -> str:
+        if not baseline.get(key) or summary is baseline:
+            return ""
+        return f" ({(summary[key] / baseline[key] - 1) * 100:+.0f}%)"
+
+    accuracy = summary["accuracy"]
+    accuracy_str = f"{accuracy * 100:.1f}" if accuracy is not None else "-"
+    return (
+        f"{name:<32} acc {accuracy_str:>5} | tasks {summary['tasks']:>4}"
+        f" | mean {summary['mean_duration']:.0f}s{_delta('mean_duration')}"
+        f" | p90 {summary['p90_duration']:.0f}s{_delta('p90_duration')}"
+        f" | {summary['tokens']} tok{_delta('tokens')}"
+        f" | ${summary['cost']:.3f}{_delta('cost')}"
+    )
+
+
+async def run(
+    suite: str,
+    input_path: Optional[str] = None,
+    run_name: Optional[str] = None,
+    output_dir: str = "eval_runs",
+    model_name: str = settings.MODEL_NAME,
+    max_workers: Optional[int] = None,
+    verbosity_level: int = logging.INFO,
+    nrows: Optional[int] = None,
+    task_timeout: Optional[int] = None,
+    enable_phoenix: bool = False,
+    phoenix_project_name: str = settings.PHOENIX_PROJECT_NAME,
+    phoenix_endpoint: str = settings.RESOLVED_PHOENIX_ENDPOINT,
+) -> None:
+    """
+    Run a suite and save one record per task to <output_dir>/<suite>/<run_name>.jsonl.
+    Rerunning with the same run name resumes the run.
+    Tasks run in parallel up to max_workers, the suite default without it.
+    """
+    load_dotenv()
+    eval_suite = SUITES[suite]
+    dataset_path = input_path or eval_suite.input_path
+    assert dataset_path, f"Suite {suite} has no default dataset, provide input_path"
+    if enable_phoenix and phoenix_project_name and phoenix_endpoint:
+        register(
+            project_name=phoenix_project_name,
+            endpoint=phoenix_endpoint,
+            auto_instrument=True,
+        )
+        CodeActInstrumentor().instrument()
+
+    run_name = run_name or time.strftime("%Y%m%d-%H%M%S")
+    output_path = Path(output_dir) / suite / f"{run_name}.jsonl"
+    completed_ids = read_completed_ids(output_path)
+    if completed_ids:
+        print(f"Skipping {len(completed_ids)} tasks already in {output_path}")
+
+    agent = compose_main_agent(model_name=model_name, verbosity_level=verbosity_level)
+    dataset_records: Dict[str, Dict[str, Any]] = {}
+    tasks = stream_tasks(Path(dataset_path), dataset_records, completed_ids, nrows=nrows)
+    records = iter_batch(
+        tasks,
+        agent,
+        mcp_config=MCP_CONFIG,
+        max_concurrency=max_workers or eval_suite.max_workers,
+        add_mcp_server_prefixes=False,
+        task_timeout=task_timeout,
+    )
+    async for record in records:
+        dataset_record = dataset_records.pop(record["task_id"])
+        is_correct = None
+        if eval_suite.scorer is not None:
+            is_correct = eval_suite.scorer(dataset_record, str(record["result"]))
+        record.update({"target": dataset_record.get("target"), "is_correct": is_correct})
+        append_jsonl(output_path, record)
+        print(f"Query: {record['query']}\nResult: {record['result']}\nLabel: {is_correct}\n\n")
+
+    print(_format_summary(run_name, summarize(read_jsonl(output_path)), {}))
+
+
+def compare(suite: str, runs: Optional[List[str]] = None, output_dir: str = "eval_runs") -> None:
+    """
+    Compare runs of a suite on their common tasks: accuracy, latency, tokens and cost.
+    Without run names, all runs are compared in the order they were made.
+    Relative changes are given against the first run.
+    """
+    suite_dir = Path(output_dir) / suite
+    if runs:
+        paths = [suite_dir / f"{name}.jsonl" for name in runs]
+    else:
+        paths = sorted(suite_dir.glob("*.jsonl"), key=lambda path: path.stat().st_mtime)
+    summaries = compare_runs(paths)
+    if not summaries:
+        print(f"No runs in {suite_dir}")
+        return
+    baseline = summaries[0][1]
+    for name, summary in summaries:
+        print(_format_summary(name, summary, baseline))
+
+
+if __name__ == "__main__":
+    fire.Fire({"run": run, "compare": compare})
@@ -1,19 +1,27 @@
-import shutil
+import functools
 import logging
-import re
-import string
 from pathlib import Path
-from typing import Optional, Any
+from typing import Dict, Optional, Tuple
 
 import fire  # type: ignore
 import pandas as pd  # type: ignore
 from datasets import load_dataset  # type: ignore
 from phoenix.otel import register
 from codearkt.otel import CodeActInstrumentor
-from codearkt.server import run_batch
 
+from holosophos.attachments import get_attachment_stager
+from holosophos.batch import (
+    BatchTask,
+    append_jsonl,
+    iter_batch,
+    iter_batch_processes,
+    read_completed_ids,
+    read_jsonl,
+    sort_jsonl,
+)
 from holosophos.utils import render_prompt
-from holosophos.main_agent import compose_main_agent, MCP_CONFIG
+from reports.gaia_scoring import GaiaScorer, accuracy_by_level, get_final_answer
+from holosophos.main_agent import get_main_agent, MCP_CONFIG
 from holosophos.settings import settings
 
 
@@ -28,7 +36,7 @@ Here is the question:
 {{question}}
 ===
 
-{% if attached_files %}Attached files (copied to the workspace):
+{% if attached_files %}Attached files (paths in the workspace):
 {{attached_files}}{% endif %}
 
 Return only the answer after the 'Final answer:'.
@@ -39,85 +47,11 @@ Don't include measurement units (like m³ or Å or %) in a numerical final answe
 """
 
 
-def _normalize_number_str(number_str: str) -> float:
-    for char in ["$", "%", ","]:
-        number_str = number_str.replace(char, "")
-    try:
-        return float(number_str)
-    except ValueError:
-        return float("inf")
-
-
-def _split_string(
-    s: str,
-    char_list: list[str] = [",", ";"],
-) -> list[str]:
-    pattern = f"[{''.join(char_list)}]"
-    return re.split(pattern, s)
-
-
-def _normalize_str(input_str: str, remove_punct: bool = True) -> str:
-    no_spaces = re.sub(r"\s", "", input_str)
-    if remove_punct:
-        translator = str.maketrans("", "", string.punctuation)
-        return no_spaces.lower().translate(translator)
-    else:
-        return no_spaces.lower()
-
-
-def _answer_scorer(
-    model_answer: Optional[str],
-    ground_truth: str,
-) -> bool:
-    def is_float(element: Any) -> bool:
-        try:
-            float(element)
-            return True
-        except ValueError:
-            return False
-
-    if model_answer is None:
-        model_answer = "None"
-
-    if is_float(ground_truth):
-        normalized_answer = _normalize_number_str(model_answer)
-        return normalized_answer == float(ground_truth)
-
-    elif any(char in ground_truth for char in [",", ";"]):
-        gt_elems = _split_string(ground_truth)
-        ma_elems = _split_string(model_answer)
-
-        if len(gt_elems) != len(ma_elems):
-            return False
-
-        comparisons = []
-        for ma_elem, gt_elem in zip(ma_elems, gt_elems):
-            if is_float(gt_elem):
-                normalized_ma_elem = _normalize_number_str(ma_elem)
-                comparisons.append(normalized_ma_elem == float(gt_elem))
-            else:
-                comparisons.append(
-                    _normalize_str(ma_elem, remove_punct=False)
-                    == _normalize_str(gt_elem, remove_punct=False)
-                )
-        return all(comparisons)
-
-    else:
-        return _normalize_str(model_answer) == _normalize_str(ground_truth)
-
-
-def _get_final_answer(text: str) -> str:
-    if "Final answer:**" in text:
-        return text.split("Final answer:**")[-1].strip()
-    if "Final answer:" in text:
-        return text.split("Final answer:")[-1].strip()
-    return text.strip()
-
-
 async def run_gaia(
     split: str = "validation",
     model_name: str = "deepseek/deepseek-chat-v3.1",
     max_workers: int = 1,
+    num_processes: int = 1,
     verbosity_level: int = logging.INFO,
     nrows: Optional[int] = None,
     enable_phoenix: bool = False,
@@ -127,6 +61,7 @@ async def run_gaia(
     files_only: bool = False,
     max_completion_tokens: int = settings.MAX_COMPLETION_TOKENS,
     max_history_tokens: int = settings.MAX_HISTORY_TOKENS,
+    task_timeout: int = 7200,
 ) -> None:
     if enable_phoenix and phoenix_project_name and phoenix_endpoint:
         register(
@@ -136,56 +71,97 @@ async def run_gaia(
         )
         CodeActInstrumentor().instrument()
 
+    output_path = Path(predictions_path)
+    completed_ids = read_completed_ids(output_path)
+    if completed_ids:
+        print(f"Skipping {len(completed_ids)} tasks already in {output_path}")
+
     eval_ds = load_dataset("gaia-benchmark/GAIA", "2023_all")[split]
     eval_ds = eval_ds.rename_columns(
         {"Question": "question", "Final answer": "true_answer", "Level": "task"}
     )
     eval_df = pd.DataFrame(eval_ds)
     tasks_to_run = eval_df.to_dict(orient="records")
+    # Attachments are linked into the workspace only while their task runs.
+    stager = get_attachment_stager()
+    stager.collect_garbage(settings.ATTACHMENT_MAX_AGE)
     tasks = []
-    true_answers = []
+    true_answers: Dict[str, str] = {}
+    levels: Dict[str, str] = {}
     for example in tasks_to_run[:nrows]:
+        task_id = str(example["task_id"])
+        if task_id in completed_ids:
+            continue
         file_path = example["file_path"]
         if files_only and not file_path:
             continue
-        file_name = None
+        attached_file = None
+        attachments: Tuple[str, ...] = ()
         if file_path:
-            file_name = file_path.split("/")[-1]
-            shutil.copy(file_path, Path(settings.WORKSPACE_DIR) / file_name)
-        task = render_prompt(
-            QUESTION_PROMPT, question=example["question"], attached_files=file_name
+            staged_path = stager.path(task_id, file_path)
+            attached_file = str(staged_path.relative_to(settings.WORKSPACE_DIR))
+            attachments = (file_path,)
+        query = render_prompt(
+            QUESTION_PROMPT, question=example["question"], attached_files=attached_file
         )
-        tasks.append(task)
-        true_answers.append(example["true_answer"])
+        tasks.append(BatchTask(task_id=task_id, query=query, attachments=attachments))
+        true_answers[task_id] = str(example["true_answer"])
+        levels[task_id] = str(example["task"])
 
-    agent = compose_main_agent(
+    agent_factory = functools.partial(
+        get_main_agent,
         model_name=model_name,
         verbosity_level=verbosity_level,
         included_agents=("librarian", "mle_solver"),
         max_completion_tokens=max_completion_tokens,
         max_history_tokens=max_history_tokens,
     )
-    predicted_answers = await run_batch(
-        tasks,
-        agent,
-        mcp_config=MCP_CONFIG,
-        max_concurrency=max_workers,
-        add_mcp_server_prefixes=False,
-        task_timeout=7200,
-        output_path=Path(predictions_path),
-    )
-
-    correct_count = 0
-    all_count = 0
-    for predicted_answer, true_answer in zip(predicted_answers, true_answers):
-        predicted_answer = _get_final_answer(predicted_answer)
-        is_correct = _answer_scorer(predicted_answer, true_answer)
+    if num_processes > 1:
+        # max_workers tasks run concurrently in each of the worker processes.
+        records = iter_batch_processes(
+            tasks,
+            agent_factory,
+            num_workers=num_processes,
+            mcp_config=MCP_CONFIG,
+            max_concurrency=max_workers,
+            add_mcp_server_prefixes=False,
+            task_timeout=task_timeout,
+        )
+    else:
+        records = iter_batch(
+            tasks,
+            agent_factory(),
+            mcp_config=MCP_CONFIG,
+            max_concurrency=max_workers,
+            add_mcp_server_prefixes=False,
+            task_timeout=task_timeout,
+        )
+    scorer = GaiaScorer()
+    async for record in records:
+        true_answer = true_answers[record["task_id"]]
+        predicted_answer = get_final_answer(record["result"])
+        is_correct = bool(scorer.score([predicted_answer], [true_answer])[0])
+        record.update(
+            {
+                "task": levels[record["task_id"]],
+                "true_answer": true_answer,
+                "predicted_answer": predicted_answer,
+                "is_correct": is_correct,
+            }
+        )
+        append_jsonl(output_path, record)
         print(f"True answer: {true_answer}\nPredicted answer: {predicted_answer}")
         print(f"Is correct: {is_correct}")
         print()
-        correct_count += int(is_correct)
-        all_count += 1
-    print(f"Overall accuracy: {correct_count / all_count * 100.0:.1f}")
+
+    sort_jsonl(output_path, [str(example["task_id"]) for example in tasks_to_run])
+    all_records = [r for r in read_jsonl(output_path) if "is_correct" in r]
+    if all_records:
+        accuracy = accuracy_by_level(
+            [r.get("task", "unknown") for r in all_records], [r["is_correct"] for r in all_records]
+        )
+        for level, level_accuracy in accuracy.items():
+            print(f"Accuracy ({level}): {level_accuracy * 100.0:.1f}")
 
 
 if __name__ == "__main__":
@@ -1,3 +1,5 @@
+from pathlib import Path
+
 import pytest
 from codearkt.llm import LLM
 
@@ -10,3 +12,10 @@ settings.LIBRARIAN_TOOLS = ("arxiv_search", "arxiv_download")
 @pytest.fixture
 def deepseek() -> LLM:
     return LLM(model_name="deepseek/deepseek-chat-v3-0324", temperature=0.0)
+
+
+@pytest.fixture(autouse=True)
+def document_index(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    path = tmp_path / "documents.sqlite"
+    monkeypatch.setattr(settings, "DOCUMENT_INDEX_PATH", str(path))
+    return path
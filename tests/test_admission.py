@@ -0,0 +1,70 @@
+import asyncio
+from typing import List
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from holosophos.admission import AdmissionController, AdmissionMiddleware, QueueFullError
+
+
+async def test_admission_order() -> None:
+    controller = AdmissionController(
+        max_active=1, max_queued=4, max_queued_per_client=2, default_retry_after=5
+    )
+    assert await controller.acquire("first") == 0.0
+    order: List[str] = []
+
+    async def _session(client_id: str, priority: int = 0) -> None:
+        await controller.acquire(client_id, priority)
+        order.append(client_id)
+
+    tasks = []
+    for client_id, priority in [("a", 0), ("a", 0), ("b", 0), ("c", 1)]:
+        tasks.append(asyncio.create_task(_session(client_id, priority)))
+        await asyncio.sleep(0)
+    assert controller.stats()["queued"] == 4
+    with pytest.raises(QueueFullError) as e:
+        await controller.acquire("d")
+    assert e.value.retry_after == 5
+
+    for _ in range(4):
+        controller.release(duration=1.0)
+        await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    assert order == ["c", "a", "b", "a"]
+    assert controller.stats()["rejected"] == 1
+
+
+async def test_admission_middleware() -> None:
+    async def manager(request: Request) -> JSONResponse:
+        await asyncio.sleep(0.1)
+        return JSONResponse(await request.json())
+
+    app = Starlette()
+    app.add_route("/agents/manager", manager, methods=["POST"])
+    controller = AdmissionController(
+        max_active=1, max_queued=2, max_queued_per_client=1, default_retry_after=5
+    )
+    app.add_middleware(
+        AdmissionMiddleware, controller=controller, paths=["/agents/manager"], max_priority=1
+    )
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+
+        async def _post(i: int, priority: int = 0) -> httpx.Response:
+            await asyncio.sleep(0.01 * i)
+            headers = {"X-Client-Id": str(i), "X-Priority": str(priority)}
+            return await client.post("/agents/manager", json={"i": i}, headers=headers)
+
+        responses = await asyncio.gather(_post(0), _post(1), _post(2, priority=100), _post(3))
+    assert [r.status_code for r in responses] == [200, 200, 200, 429]
+    assert responses[1].json() == {"i": 1}
+    assert float(responses[1].headers["x-queue-wait"]) > 0
+    # The third request jumped the queue, with its priority capped to 1.
+    assert float(responses[2].headers["x-queue-wait"]) < float(responses[1].headers["x-queue-wait"])
+    assert responses[3].headers["retry-after"] == "5"
+    assert controller.stats()["active"] == 0
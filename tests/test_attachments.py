@@ -0,0 +1,92 @@
+import os
+import time
+from pathlib import Path
+
+from codearkt.codeact import CodeActAgent
+from codearkt.event_bus import AgentEventBus
+from codearkt.metrics import TokenUsageStore
+from codearkt.llm import LLM, ChatMessages
+
+from holosophos.attachments import AttachmentStager, link_or_copy
+from holosophos.batch import BatchTask, iter_batch
+
+
+class ReadingAgent(CodeActAgent):
+    async def ainvoke(
+        self,
+        messages: ChatMessages,
+        session_id: str,
+        event_bus: AgentEventBus | None = None,
+        token_usage_store: TokenUsageStore | None = None,
+        server_host: str | None = None,
+        server_port: int | None = None,
+    ) -> str:
+        return Path(str(messages[-1].content)).read_text()
+
+
+def test_link_or_copy_falls_back(tmp_path: Path) -> None:
+    source = tmp_path / "audio.mp3"
+    source.write_text("data")
+    mode = link_or_copy(source, tmp_path / "linked.mp3", ["reflink", "hardlink"])
+    assert mode in ("reflink", "hardlink")
+    assert os.path.samefile(source, tmp_path / "linked.mp3") == (mode == "hardlink")
+    assert (tmp_path / "linked.mp3").read_text() == "data"
+    assert link_or_copy(source, tmp_path / "copied.mp3", ["copy"]) == "copy"
+    assert not os.path.samefile(source, tmp_path / "copied.mp3")
+    assert (tmp_path / "copied.mp3").read_text() == "data"
+
+
+def test_stager_uses_task_dirs(tmp_path: Path) -> None:
+    stager = AttachmentStager(tmp_path / "attachments")
+    first = tmp_path / "a" / "table.xlsx"
+    second = tmp_path / "b" / "table.xlsx"
+    for index, path in enumerate((first, second)):
+        path.parent.mkdir()
+        path.write_text(str(index))
+
+    first_paths = stager.stage("task/1", [first])
+    second_paths = stager.stage("task/2", [second])
+    assert first_paths == [stager.path("task/1", first)]
+    assert first_paths[0].read_text() == "0"
+    assert second_paths[0].read_text() == "1"
+    assert first_paths[0].parent.parent == stager.root_dir
+    # Edits of a staged file never reach the cached original with the default modes.
+    first_paths[0].write_text("changed")
+    assert first.read_text() == "0"
+
+    stager.cleanup("task/1")
+    assert not first_paths[0].exists()
+    assert second_paths[0].exists()
+
+
+def test_collect_garbage(tmp_path: Path) -> None:
+    stager = AttachmentStager(tmp_path)
+    source = tmp_path / "file.txt"
+    source.write_text("data")
+    stager.stage("old", [source])
+    stager.stage("new", [source])
+    old_time = time.time() - 3600
+    os.utime(stager.task_dir("old"), (old_time, old_time))
+    assert stager.collect_garbage(max_age=60) == 1
+    assert not stager.task_dir("old").exists()
+    assert stager.task_dir("new").exists()
+
+
+async def test_iter_batch_stages_lazily(tmp_path: Path) -> None:
+    stager = AttachmentStager(tmp_path / "attachments")
+    source = tmp_path / "question.txt"
+    source.write_text("answer")
+    task = BatchTask(
+        task_id="1",
+        query=str(stager.path("1", source)),
+        attachments=(str(source),),
+    )
+    missing = BatchTask(task_id="2", query="", attachments=(str(tmp_path / "missing.txt"),))
+    agent = ReadingAgent(name="reader", description="Reads", llm=LLM(model_name="none"))
+
+    records = [r async for r in iter_batch([task, missing], agent, attachment_stager=stager)]
+    results = {r["task_id"]: r["result"] for r in records}
+    assert results["1"] == "answer"
+    assert results["2"].startswith("Error")
+    assert not stager.task_dir("1").exists()
+    assert source.exists()
@@ -0,0 +1,67 @@
+import asyncio
+from pathlib import Path
+
+from codearkt.codeact import CodeActAgent
+from codearkt.event_bus import AgentEventBus
+from codearkt.metrics import TokenUsageStore
+from codearkt.llm import LLM, ChatMessages
+
+from holosophos.batch import (
+    BatchTask,
+    append_jsonl,
+    iter_batch,
+    iter_batch_processes,
+    read_completed_ids,
+    read_jsonl,
+    sort_jsonl,
+)
+
+
+class SleepyAgent(CodeActAgent):
+    async def ainvoke(
+        self,
+        messages: ChatMessages,
+        session_id: str,
+        event_bus: AgentEventBus | None = None,
+        token_usage_store: TokenUsageStore | None = None,
+        server_host: str | None = None,
+        server_port: int | None = None,
+    ) -> str:
+        delay = float(str(messages[-1].content))
+        await asyncio.sleep(delay)
+        return f"slept {delay}"
+
+
+def make_sleepy_agent() -> CodeActAgent:
+    return SleepyAgent(name="sleepy", description="Sleeps", llm=LLM(model_name="none"))
+
+
+async def test_iter_batch_yields_in_completion_order(tmp_path: Path) -> None:
+    agent = SleepyAgent(name="sleepy", description="Sleeps", llm=LLM(model_name="none"))
+    tasks = [BatchTask(task_id=str(i), query=delay) for i, delay in enumerate(["0.3", "0.1", "5"])]
+    output_path = tmp_path / "predictions.jsonl"
+    records = []
+    async for record in iter_batch(tasks, agent, max_concurrency=3, task_timeout=1):
+        append_jsonl(output_path, record)
+        records.append(record)
+    assert [r["task_id"] for r in records] == ["1", "0", "2"]
+    assert records[0]["result"] == "slept 0.1"
+    assert records[2]["result"].startswith("Timeout")
+    assert read_completed_ids(output_path) == {"0", "1", "2"}
+
+
+async def test_iter_batch_processes_merges_in_order(tmp_path: Path) -> None:
+    delays = ["0.4", "0.1", "0.3", "0.1", "0.2"]
+    tasks = [BatchTask(task_id=str(i), query=delay) for i, delay in enumerate(delays)]
+    output_path = tmp_path / "predictions.jsonl"
+    append_jsonl(output_path, {"task_id": "old"})
+    records = iter_batch_processes(
+        tasks, make_sleepy_agent, num_workers=2, max_concurrency=2, show_progress=False
+    )
+    async for record in records:
+        append_jsonl(output_path, record)
+    sort_jsonl(output_path, [task.task_id for task in tasks])
+    merged = read_jsonl(output_path)
+    assert [r["task_id"] for r in merged] == ["0", "1", "2", "3", "4", "old"]
+    assert {r["worker_id"] for r in merged[:-1]} == {0, 1}
+    assert merged[1]["result"] == "slept 0.1"
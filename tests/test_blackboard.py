@@ -0,0 +1,43 @@
+import pytest
+from codearkt.llm import ChatMessage
+
+from holosophos.agents.base import _add_blackboard_notice
+from holosophos.blackboard import (
+    Blackboard,
+    blackboard_list,
+    blackboard_read,
+    blackboard_write,
+)
+
+
+def test_blackboard_sessions() -> None:
+    blackboard = Blackboard(max_sessions=2)
+    blackboard.write("s1", "papers/vq-vae", "1711.00937 Neural Discrete Representation Learning")
+    blackboard.write("s1", "files/report", "report.md", description="Final report")
+    blackboard.write("s2", "papers/vq-vae", "other")
+    assert str(blackboard.read("s1", "papers/vq-vae")).startswith("1711.00937")
+    assert blackboard.read("s2", "files/report") is None
+    assert [e["key"] for e in blackboard.list("s1", prefix="papers/")] == ["papers/vq-vae"]
+    listing = blackboard.format("s1")
+    assert "files/report: Final report" in listing and "1711.00937" in listing
+    blackboard.write("s3", "key", "value")
+    assert blackboard.read("s1", "files/report") is None
+    assert blackboard.format("s1") == "(empty)"
+
+
+def test_blackboard_tools() -> None:
+    blackboard_write("tools", "experiments/baseline", '{"accuracy": 0.71}', "Baseline run")
+    assert blackboard_read("tools", "experiments/baseline") == '{"accuracy": 0.71}'
+    assert blackboard_list("tools")[0]["description"] == "Baseline run"
+    with pytest.raises(KeyError, match="experiments/baseline"):
+        blackboard_read("tools", "experiments/baselin")
+
+
+def test_blackboard_notice() -> None:
+    blackboard_write("notice", "papers/attention", "1706.03762")
+    messages = [ChatMessage(role="user", content="Find related work")]
+    new_messages = _add_blackboard_notice(messages, "notice")
+    assert messages[0].content == "Find related work"
+    content = str(new_messages[0].content)
+    assert content.startswith("Find related work")
+    assert 'session_id="notice"' in content and "papers/attention" in content
@@ -0,0 +1,127 @@
+from typing import Any, cast
+
+from codearkt.llm import LLM, ChatMessage, ChatMessages, ChatStreamGenerator
+from codearkt.python_executor import ExecResult, PythonExecutor
+from openai.types.chat.chat_completion_chunk import ChatCompletionChunk
+
+from holosophos.agents import HolosophosAgent
+from holosophos.agents.base import _GOVERNOR
+from holosophos.budget import Budget, BudgetGovernor
+from holosophos.profiler import PROFILER
+
+
+def _chunk(model_name: str, content: str) -> ChatCompletionChunk:
+    return ChatCompletionChunk.model_validate(  # type: ignore[no-any-return]
+        {
+            "id": "1",
+            "object": "chat.completion.chunk",
+            "created": 0,
+            "model": model_name,
+            "choices": [{"index": 0, "delta": {"content": content}}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 2, "total_tokens": 12},
+        }
+    )
+
+
+class LoopingLLM(LLM):
+    async def astream(self, messages: ChatMessages, **kwargs: Any) -> ChatStreamGenerator:
+        if any(str(message.content).startswith("Stop:") for message in messages):
+            yield _chunk(self._model_name, "Best guess: 42")
+        else:
+            yield _chunk(self._model_name, "Thought\n<execute>\nprint(1 / 0)\n</execute>")
+
+
+class ChangingLLM(LLM):
+    calls = 0
+
+    async def astream(self, messages: ChatMessages, **kwargs: Any) -> ChatStreamGenerator:
+        ChangingLLM.calls += 1
+        code = f"print(read_pdf(page={ChangingLLM.calls}))"
+        yield _chunk(self._model_name, f"Thought\n<execute>\n{code}\n</execute>")
+
+
+def test_governor_loop_detection() -> None:
+    governor = BudgetGovernor("governor", "agent", Budget(), Budget(), 0.8, max_repeats=3)
+    governor.observe("print(1)", None)
+    assert governor.stop_reason() is None
+    governor.observe("print(1)", None)
+    assert governor.stop_reason() is None
+    warning = governor.warning(None, 10)
+    assert warning is not None and "Loop warning" in warning
+    assert governor.warning(None, 10) is None
+
+    governor.observe("print(2)", "Error: same")
+    assert governor.warning(None, 10) is None
+    governor.observe("print(3)", "Error: same")
+    assert governor.warning(None, 10) is not None
+    governor.observe("print(4)", "Error: same")
+    assert governor.stop_reason() is not None
+
+
+def test_governor_budget_warning() -> None:
+    PROFILER.agent("governor_budget", "agent").prompt_tokens = 50
+    governor = BudgetGovernor("governor_budget", "agent", Budget(tokens=100), Budget(), 0.8, 5)
+    assert governor.warning(8, 10) is not None
+    assert governor.warning(8, 10) is None
+    PROFILER.agent("governor_budget", "agent").prompt_tokens = 130
+    warning = governor.warning(None, 10)
+    assert warning is not None and "agent tokens" in warning
+    assert governor.stop_reason() is None
+    PROFILER.agent("governor_budget", "agent").prompt_tokens = 150
+    assert governor.stop_reason() is not None
+
+
+class FailingExecutor:
+    async def ainvoke(self, code: str) -> ExecResult:
+        return ExecResult(stdout="", error="ZeroDivisionError: division by zero")
+
+
+class ErrorMentioningExecutor:
+    async def ainvoke(self, code: str) -> ExecResult:
+        return ExecResult(stdout="Error analysis of the paper: section 5 discusses ValueError")
+
+
+async def test_agent_error_mentions_are_not_loops() -> None:
+    agent = HolosophosAgent(name="reading", description="Reads", llm=ChangingLLM(model_name="c"))
+    governor = BudgetGovernor("reading", "reading", Budget(), Budget(), 0.8, max_repeats=3)
+    token = _GOVERNOR.set(governor)
+    try:
+        for step_number in range(1, 6):
+            new_messages = await agent._step(
+                [ChatMessage(role="user", content="Read")],
+                python_executor=cast(PythonExecutor, ErrorMentioningExecutor()),
+                session_id="reading",
+                run_id="run",
+                step_number=step_number,
+            )
+            assert new_messages[-1].role == "user"
+    finally:
+        _GOVERNOR.reset(token)
+    assert governor.repeats == 0
+    assert governor.stop_reason() is None
+
+
+async def test_agent_forced_stop() -> None:
+    llm = LoopingLLM(model_name="loop")
+    agent = HolosophosAgent(name="looping", description="Loops", llm=llm)
+    governor = BudgetGovernor("loop", "looping", Budget(), Budget(), 0.8, max_repeats=3)
+    token = _GOVERNOR.set(governor)
+    messages: ChatMessages = [ChatMessage(role="user", content="Divide")]
+    try:
+        for step_number in range(1, 10):
+            new_messages = await agent._step(
+                messages,
+                python_executor=cast(PythonExecutor, FailingExecutor()),
+                session_id="loop",
+                run_id="run",
+                step_number=step_number,
+            )
+            messages.extend(new_messages)
+            if messages[-1].role == "assistant":
+                break
+    finally:
+        _GOVERNOR.reset(token)
+    assert messages[-1].content == "Best guess: 42"
+    assert any(str(m.content).startswith("Loop warning") for m in messages)
+    assert PROFILER.agent("loop", "looping").forced_stops == 1
+    assert step_number == 4
@@ -0,0 +1,98 @@
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any
+
+from codearkt.llm import ChatMessage
+from fastmcp import Client, FastMCP
+
+from holosophos.cache import SqliteCache, make_cache_key
+from holosophos.llm import CachedLLM
+from holosophos.tools_server import ToolCacheMiddleware
+
+
+def test_cache_ttl(tmp_path: Path) -> None:
+    cache = SqliteCache(tmp_path / "cache.sqlite", ttl=1)
+    cache.set("key", {"value": 1})
+    assert cache.get("key") == {"value": 1}
+    cache._conn.execute("UPDATE cache SET expires_at = ?", (time.time() - 10,))
+    assert cache.get("key") is None
+    cache.set("other", 2, ttl=100)
+    assert cache.get("other") == 2
+
+
+def test_cache_drops_old_schema(tmp_path: Path) -> None:
+    path = tmp_path / "cache.sqlite"
+    conn = sqlite3.connect(str(path))
+    conn.execute(
+        "CREATE TABLE cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+        "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+    )
+    conn.execute("INSERT INTO cache VALUES ('old', '1', 0, 0)")
+    conn.commit()
+    conn.close()
+
+    cache = SqliteCache(path, ttl=100)
+    assert cache.get("old") is None
+    cache.set("key", 1)
+    assert cache.get("key") == 1
+
+
+async def test_cache_async(tmp_path: Path) -> None:
+    cache = SqliteCache(tmp_path / "cache.sqlite")
+    await cache.aset("key", [1, 2], ttl=100)
+    assert await cache.aget("key") == [1, 2]
+    assert await cache.aget("missing") is None
+
+
+def test_cache_max_entries(tmp_path: Path) -> None:
+    cache = SqliteCache(tmp_path / "cache.sqlite", max_entries=2)
+    for i in range(3):
+        cache.set(str(i), i)
+        time.sleep(0.01)
+    assert len(cache) == 2
+    assert cache.get("0") is None
+    assert cache.get("2") == 2
+
+
+async def test_cached_llm_hit(tmp_path: Path) -> None:
+    cache = SqliteCache(tmp_path / "llm.sqlite")
+    llm = CachedLLM(model_name="test-model", cache=cache, temperature=0.0)
+    messages = [ChatMessage(role="user", content="Hello")]
+    chunk = {
+        "id": "1",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": "test-model",
+        "choices": [{"index": 0, "delta": {"content": "Hi"}}],
+    }
+    cache.set(llm._get_cache_key(messages, stop=["Observation:"]), [chunk])
+    events = [event async for event in llm.astream(messages, stop=["Observation:"])]
+    assert len(events) == 1
+    assert events[0].choices[0].delta.content == "Hi"
+    assert make_cache_key("a", 1) != make_cache_key("a", 2)
+
+
+async def test_tool_cache_middleware(tmp_path: Path) -> None:
+    calls = {"arxiv_search": 0, "bash": 0}
+    mcp: FastMCP[Any] = FastMCP(name="test")
+
+    @mcp.tool(name="arxiv_search")
+    def arxiv_search(query: str) -> str:
+        calls["arxiv_search"] += 1
+        return f"papers about {query}"
+
+    @mcp.tool(name="bash")
+    def bash(command: str) -> str:
+        calls["bash"] += 1
+        return command
+
+    cache = SqliteCache(tmp_path / "tools.sqlite")
+    mcp.add_middleware(ToolCacheMiddleware(cache, {"arxiv_search": 60, "bash": 60}))
+    async with Client(mcp) as client:
+        for _ in range(2):
+            result = await client.call_tool("arxiv_search", {"query": "agents"})
+            assert result.content[0].text == "papers about agents"
+            await client.call_tool("bash", {"command": "ls"})
+        await client.call_tool("arxiv_search", {"query": "rag"})
+    assert calls == {"arxiv_search": 2, "bash": 2}
@@ -0,0 +1,41 @@
+from codearkt.llm import ChatMessage
+
+from holosophos.compaction import compact_history, make_digest
+
+
+def _observation(text: str) -> ChatMessage:
+    return ChatMessage(role="user", content=[{"type": "text", "text": text}])
+
+
+def test_make_digest() -> None:
+    assert make_digest("short", 100) == ("short", 0)
+    digest, saved = make_digest("word " * 1000, 90)
+    assert digest.startswith("word word")
+    assert "characters omitted" in digest
+    assert saved > 0
+
+
+def test_compact_history() -> None:
+    messages = [
+        ChatMessage(role="system", content="system " * 1000),
+        ChatMessage(role="user", content="task " * 1000),
+    ]
+    for _ in range(6):
+        messages.append(ChatMessage(role="assistant", content="code"))
+        messages.append(_observation("result " * 1000))
+
+    compacted, saved = compact_history(
+        messages, keep_last=2, batch_size=2, digest_chars=100, max_observation_chars=10000
+    )
+    assert saved > 0
+    assert compacted[:2] == messages[:2]
+    lengths = [len(str(m.content)) for m in compacted[3::2]]
+    assert all(length < 200 for length in lengths[:4])
+    assert lengths[4:] == [len(str(m.content)) for m in messages[11::2]]
+
+    # One more observation does not move the batch boundary, the prefix stays the same.
+    messages.append(_observation("result " * 1000))
+    next_compacted, _ = compact_history(
+        messages, keep_last=2, batch_size=2, digest_chars=100, max_observation_chars=10000
+    )
+    assert next_compacted[: len(compacted)] == compacted
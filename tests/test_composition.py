@@ -1,8 +1,14 @@
+import pytest
+from codearkt import server as codearkt_server
 from codearkt.llm import LLM
 from codearkt.server import run_query
 from academia_mcp.tools import arxiv_search, arxiv_download
 
-from holosophos.main_agent import compose_main_agent
+from holosophos.main_agent import compose_main_agent, get_main_agent
+from holosophos.files import PROMPTS_DIR_PATH
+from holosophos.streaming import create_agent_endpoint
+from holosophos.tools_server import get_mcp_app
+from holosophos.utils import get_cacheable_prefix_length, load_prompts
 
 
 async def test_composition(deepseek: LLM) -> None:
@@ -20,3 +26,26 @@ async def test_composition(deepseek: LLM) -> None:
         add_mcp_server_prefixes=False,
     )
     assert "leverages different language models to simulate users" in str(answer)
+
+
+def test_get_main_agent_is_memoized() -> None:
+    agent = get_main_agent(included_agents=["librarian"], tools=[])
+    assert get_main_agent(included_agents=("librarian",), tools=()) is agent
+    assert get_main_agent(included_agents=("librarian", "writer"), tools=()) is not agent
+    librarian = agent.managed_agents[0] if agent.managed_agents else None
+    assert librarian is not None and librarian.prompts is load_prompts("librarian")
+
+
+def test_composition_installs_server_extensions(monkeypatch: pytest.MonkeyPatch) -> None:
+    # Plain codearkt run_query/run_batch must see the holosophos tools and agent endpoints.
+    monkeypatch.setattr(codearkt_server, "get_mcp_app", None)
+    monkeypatch.setattr(codearkt_server, "create_agent_endpoint", None)
+    compose_main_agent(included_agents=("librarian",), tools=())
+    assert codearkt_server.get_mcp_app is get_mcp_app
+    assert codearkt_server.create_agent_endpoint is create_agent_endpoint
+
+
+def test_system_prompts_have_static_prefix() -> None:
+    for path in PROMPTS_DIR_PATH.glob("*.yaml"):
+        prefix_length, total_length = get_cacheable_prefix_length(load_prompts(path.stem))
+        assert total_length - prefix_length < 200, path.stem
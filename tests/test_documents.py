@@ -0,0 +1,91 @@
+from pathlib import Path
+
+from fastmcp import Client, FastMCP
+
+from holosophos.documents import DocumentStore, chunk_text, get_document_store, search_documents
+from holosophos.settings import Settings
+from holosophos.tools_server import DocumentIndexMiddleware
+
+PAPER = "\n\n".join(
+    [
+        "Vector quantization maps continuous encoder outputs to a discrete codebook.",
+        "The commitment loss keeps encoder outputs close to the chosen embeddings.",
+        "We train the prior over latent codes with a PixelCNN autoregressive model.",
+    ]
+    * 20
+)
+
+
+def test_chunk_text() -> None:
+    chunks = chunk_text(PAPER, chunk_chars=300, overlap_chars=50)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 300 for chunk in chunks)
+    assert chunk_text("a" * 250, chunk_chars=100, overlap_chars=20)[1].startswith("a" * 20)
+    assert chunk_text("", chunk_chars=100) == []
+
+
+def test_document_store_search(tmp_path: Path) -> None:
+    store = DocumentStore(tmp_path / "documents.sqlite", chunk_chars=200, overlap_chars=0)
+    num_chunks = store.add("vqvae", PAPER, title="VQ-VAE")
+    assert store.add("vqvae", PAPER, title="VQ-VAE") == num_chunks
+    store.add("other", "Transformers use attention over tokens.\n\nNothing else here.")
+    passages = store.search("What is the commitment loss?", top_k=3)
+    assert len(passages) == 3
+    assert all(p.document_id == "vqvae" and "commitment" in p.text for p in passages)
+    assert store.search("attention", top_k=3, document_id="vqvae") == []
+    assert store.search('"*(', top_k=3) == []
+    store.close()
+
+    reopened = DocumentStore(tmp_path / "documents.sqlite", chunk_chars=200, overlap_chars=0)
+    assert "vqvae" in reopened
+    assert {d["document_id"] for d in reopened.list_documents()} == {"vqvae", "other"}
+
+
+async def test_document_index_middleware(tmp_path: Path) -> None:
+    mcp: FastMCP[None] = FastMCP(name="test")
+
+    @mcp.tool(name="arxiv_download")
+    def arxiv_download(paper_id: str) -> str:
+        return PAPER
+
+    @mcp.tool(name="arxiv_search")
+    def arxiv_search(query: str) -> str:
+        return PAPER
+
+    store = DocumentStore(tmp_path / "documents.sqlite", chunk_chars=500, overlap_chars=50)
+    middleware = DocumentIndexMiddleware(
+        store, tool_names=("arxiv_download",), min_chars=1000, preview_chars=300
+    )
+    mcp.add_middleware(middleware)
+    async with Client(mcp) as client:
+        result = await client.call_tool("arxiv_download", {"paper_id": "1711.00937"})
+        preview = result.content[0].text
+        assert len(preview) < len(PAPER) and "search_documents" in preview
+        result = await client.call_tool("arxiv_search", {"query": "vq-vae"})
+        assert result.content[0].text == PAPER
+    documents = store.list_documents()
+    assert len(documents) == 1
+    assert documents[0]["title"] == "arxiv_download(1711.00937)"
+    assert documents[0]["document_id"] in preview
+    assert store.search("PixelCNN prior", top_k=1)[0].document_id == documents[0]["document_id"]
+
+
+async def test_search_documents() -> None:
+    get_document_store.cache_clear()
+    try:
+        get_document_store().add("vqvae", PAPER, title="VQ-VAE")
+        passages = await search_documents("commitment loss", top_k=2)
+        assert [p["document_id"] for p in passages] == ["vqvae", "vqvae"]
+    finally:
+        get_document_store().close()
+        get_document_store.cache_clear()
+
+
+def test_agents_reading_documents_can_search_them() -> None:
+    # Long documents are cut to previews, the rest is only reachable with search_documents.
+    defaults = Settings()
+    for agent_name in ("LIBRARIAN", "MLE_SOLVER", "WRITER", "PROPOSER", "REVIEWER", "MANAGER"):
+        for name in (f"{agent_name}_TOOLS", f"{agent_name}_TOOLS_REMOTE"):
+            tools = getattr(defaults, name, ())
+            if set(tools) & set(defaults.DOCUMENT_INDEX_TOOLS):
+                assert "search_documents" in tools, name
@@ -0,0 +1,68 @@
+import json
+from pathlib import Path
+from typing import Any, Dict
+
+from holosophos.batch import append_jsonl
+from holosophos.evals import (
+    SUITES,
+    compare_runs,
+    score_json_field,
+    score_target_ids,
+    stream_tasks,
+)
+
+
+def test_scorers() -> None:
+    librarian_record = {"query": "q", "target": ["2310.11511", "2401.10774"]}
+    assert score_target_ids(librarian_record, "Self-RAG, arXiv:2310.11511")
+    assert not score_target_ids(librarian_record, "No idea")
+
+    solver_record = {"query": "q", "field": "rmse", "target": 0.15, "mode": "less"}
+    assert score_json_field(solver_record, 'Final: {"rmse": 0.13, "model": "lgbm"}')
+    assert not score_json_field(solver_record, "{'rmse': 0.2}")
+    assert not score_json_field(solver_record, "no json")
+    assert score_json_field({"field": "Novelty", "target": 7}, "{'Novelty': 8}")
+
+
+def test_suite_max_workers() -> None:
+    # Baseline mle_solver and proposer runs were sequential, only librarian suites ran 4 at once.
+    assert SUITES["librarian"].max_workers == 4
+    assert SUITES["mle_solver"].max_workers == 1
+    assert SUITES["proposer"].max_workers == 1
+
+
+def test_stream_tasks(tmp_path: Path) -> None:
+    input_path = tmp_path / "data.jsonl"
+    input_path.write_text(
+        "\n".join(json.dumps({"query": f"q{i}", "target": [str(i)]}) for i in range(4))
+    )
+    records: Dict[str, Dict[str, Any]] = {}
+    tasks = stream_tasks(input_path, records, skip_ids={"1"}, nrows=3)
+    first = next(tasks)
+    assert first.task_id == "0" and list(records) == ["0"]
+    assert [task.query for task in tasks] == ["q2"]
+    assert list(records) == ["0", "2"]
+
+
+def test_compare_runs(tmp_path: Path) -> None:
+    def _record(task_id: str, duration: float, is_correct: bool) -> Dict[str, Any]:
+        return {
+            "task_id": task_id,
+            "duration": duration,
+            "is_correct": is_correct,
+            "token_usage": {"prompt_tokens": 100, "completion_tokens": 10},
+            "profile": {"manager": {"cost": 0.01}},
+        }
+
+    for task_id in ("0", "1"):
+        append_jsonl(tmp_path / "base.jsonl", _record(task_id, 10.0, True))
+    for task_id, correct in (("0", True), ("2", False)):
+        append_jsonl(tmp_path / "new.jsonl", _record(task_id, 20.0, correct))
+    (base_name, base), (new_name, new) = compare_runs(
+        [tmp_path / "base.jsonl", tmp_path / "new.jsonl"]
+    )
+    assert (base_name, new_name) == ("base", "new")
+    assert base["tasks"] == new["tasks"] == 1
+    assert base["accuracy"] == new["accuracy"] == 1.0
+    assert new["mean_duration"] == 2 * base["mean_duration"]
+    assert new["tokens"] == 110 and abs(new["cost"] - 0.01) < 1e-9
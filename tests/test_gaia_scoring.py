@@ -0,0 +1,126 @@
+import random
+import re
+import string
+from pathlib import Path
+from typing import Optional
+
+import pytest
+
+from holosophos.settings import settings
+from reports import get_gaia_metrics
+from reports.gaia_scoring import GaiaScorer, ScoringRules, accuracy_by_level, get_final_answer
+from reports.get_gaia_metrics import load_ground_truth
+
+CASES = [
+    # predicted, true, is_correct
+    ("42", "42", True),
+    ("$1,000", "1000", True),
+    ("17%", "17", True),
+    ("1_000", "1000", True),
+    ("forty two", "42", False),
+    (None, "42", False),
+    ("3.0", "3", True),
+    ("Paris", "paris", True),
+    ("St. Petersburg", "Saint Petersburg", False),
+    ("New-York ", "new york", True),
+    ("a, b; 3", "A,b,3", True),
+    ("a, b", "a, b, c", False),
+    ("1, 2", "1, 3", False),
+    ("x,$2", "x; 2", True),
+    ("rock, paper", "Rock, Paper", True),
+]
+
+
+def test_gaia_scorer_matches_official_rules() -> None:
+    scorer = GaiaScorer()
+    labels = scorer.score([c[0] for c in CASES], [c[1] for c in CASES])
+    assert labels.tolist() == [c[2] for c in CASES]
+    assert scorer.score([], []).tolist() == []
+
+
+def test_gaia_scorer_rules() -> None:
+    scorer = GaiaScorer(ScoringRules(strip_punctuation=False, list_separators=";"))
+    assert scorer.score(["New-York", "a,b"], ["new york", "a, b"]).tolist() == [False, True]
+
+
+def _official_scorer(model_answer: Optional[str], ground_truth: str) -> bool:
+    # Reference: question_scorer of the GAIA leaderboard, which GaiaScorer must match.
+    def is_float(element: str) -> bool:
+        try:
+            float(element)
+            return True
+        except ValueError:
+            return False
+
+    def normalize_number_str(number_str: str) -> float:
+        for char in ["$", "%", ","]:
+            number_str = number_str.replace(char, "")
+        try:
+            return float(number_str)
+        except ValueError:
+            return float("inf")
+
+    def normalize_str(input_str: str, remove_punct: bool = True) -> str:
+        no_spaces = re.sub(r"\s", "", input_str)
+        if remove_punct:
+            translator = str.maketrans("", "", string.punctuation)
+            return no_spaces.lower().translate(translator)
+        return no_spaces.lower()
+
+    if model_answer is None:
+        model_answer = "None"
+    if is_float(ground_truth):
+        return normalize_number_str(model_answer) == float(ground_truth)
+    if any(char in ground_truth for char in [",", ";"]):
+        gt_elems = re.split("[,;]", ground_truth)
+        ma_elems = re.split("[,;]", model_answer)
+        if len(gt_elems) != len(ma_elems):
+            return False
+        for ma_elem, gt_elem in zip(ma_elems, gt_elems):
+            if is_float(gt_elem):
+                if normalize_number_str(ma_elem) != float(gt_elem):
+                    return False
+            elif normalize_str(ma_elem, remove_punct=False) != normalize_str(
+                gt_elem, remove_punct=False
+            ):
+                return False
+        return True
+    return normalize_str(model_answer) == normalize_str(ground_truth)
+
+
+def test_gaia_scorer_matches_official_scorer_on_generated_answers() -> None:
+    rng = random.Random(0)
+    atoms = ["1", "42", "3.0", "1_000", "inf", "nan", "-0", "1e3", "٣", "Paris", "a", "New-York"]
+    atoms += ["$", "%", ",", ";", ".", " ", "\t", "_", "-", "+", "e", "x"]
+
+    def generate() -> str:
+        return "".join(rng.choice(atoms) for _ in range(rng.randint(0, 4)))
+
+    true = [generate() for _ in range(5000)]
+    predicted: list[Optional[str]] = [
+        t if rng.random() < 0.3 else (None if rng.random() < 0.05 else generate()) for t in true
+    ]
+    labels = GaiaScorer().score(predicted, true).tolist()
+    assert labels == [_official_scorer(p, t) for p, t in zip(predicted, true)]
+
+
+def test_accuracy_by_level() -> None:
+    accuracy = accuracy_by_level(["1", "1", "2", "3"], [True, False, True, False])
+    assert accuracy == {"1": 0.5, "2": 1.0, "3": 0.0, "all": 0.5}
+    assert get_final_answer("Thinking...\nFinal answer:** 42") == "42"
+
+
+def test_load_ground_truth(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    rows = {"task_id": ["t1", "t2"], "Question": ["q1", "q2"], "Final answer": [1, "b"]}
+    rows["Level"] = ["1", "2"]
+    monkeypatch.setattr(settings, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(get_gaia_metrics, "load_dataset", lambda *a, **kw: {"validation": rows})
+    assert load_ground_truth()["t1"]["true_answer"] == "1"
+
+    rows["Final answer"] = [2, "b"]
+    assert load_ground_truth()["t1"]["true_answer"] == "1"
+    assert load_ground_truth(refresh=True)["t1"]["true_answer"] == "2"
+
+    rows["task_id"] = ["t1", "t1"]
+    with pytest.raises(ValueError, match="Duplicate task_id t1"):
+        load_ground_truth(revision="v2")
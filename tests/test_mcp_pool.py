@@ -0,0 +1,111 @@
+import asyncio
+import contextlib
+import functools
+from typing import Any, AsyncIterator
+
+import pytest
+
+from fastmcp import Client, FastMCP
+from fastmcp.client.transports import FastMCPTransport
+from fastmcp.server.proxy import FastMCPProxy
+from mcp import ClientSession
+
+from holosophos.mcp_pool import PooledMCPClient
+from holosophos.tools_server import _get_pooled
+
+
+async def test_pooled_mcp_client() -> None:
+    state = {"running": 0, "max_running": 0}
+    server: FastMCP[Any] = FastMCP(name="test")
+
+    @server.tool(name="slow_search")
+    async def slow_search(query: str) -> str:
+        state["running"] += 1
+        state["max_running"] = max(state["max_running"], state["running"])
+        await asyncio.sleep(0.05)
+        state["running"] -= 1
+        return f"papers about {query}"
+
+    pool = PooledMCPClient(
+        FastMCPTransport(server),
+        name="test",
+        max_in_flight=2,
+        health_check_interval=60.0,
+        max_backoff=1.0,
+        connect_attempts=2,
+    )
+    proxy = FastMCPProxy(client_factory=functools.partial(_get_pooled, pool))
+    await pool.start()
+    try:
+        async with Client(proxy) as client:
+            await client.list_tools()
+            session = pool.session
+            results = await asyncio.gather(
+                *[client.call_tool("slow_search", {"query": str(i)}) for i in range(6)]
+            )
+            assert [r.content[0].text for r in results] == [f"papers about {i}" for i in range(6)]
+            assert state["max_running"] == 2
+            assert pool.session is session
+
+            # A closed session is replaced by a new one on the next call.
+            pool.reconnect()
+            result = await client.call_tool("slow_search", {"query": "agents"})
+            assert result.content[0].text == "papers about agents"
+            assert pool.is_connected()
+            assert pool.session is not session
+    finally:
+        await pool.close()
+    assert not pool.is_connected()
+
+
+class FlakyTransport(FastMCPTransport):
+    def __init__(self, server: FastMCP[Any], failures: int) -> None:
+        super().__init__(server)
+        self.failures = failures
+
+    @contextlib.asynccontextmanager
+    async def connect_session(self, **session_kwargs: Any) -> AsyncIterator[ClientSession]:
+        if self.failures > 0:
+            self.failures -= 1
+            raise ConnectionError("Server is restarting")
+        async with super().connect_session(**session_kwargs) as session:
+            yield session
+
+
+async def test_pooled_mcp_client_reconnects() -> None:
+    server: FastMCP[Any] = FastMCP(name="test")
+
+    @server.tool(name="search")
+    def search(query: str) -> str:
+        return f"papers about {query}"
+
+    transport = FlakyTransport(server, failures=2)
+    pool = PooledMCPClient(
+        transport,
+        name="test",
+        max_in_flight=2,
+        health_check_interval=60.0,
+        max_backoff=0.05,
+        connect_attempts=3,
+    )
+    try:
+        # Two failed attempts are retried with backoff.
+        result = await pool.call_tool_mcp("search", {"query": "agents"})
+        assert result.content[0].text == "papers about agents"
+
+        # The server goes away for good: callers get an error instead of waiting forever.
+        transport.failures = 100
+        pool.reconnect()
+        with pytest.raises(ConnectionError, match="unavailable"):
+            await pool.call_tool_mcp("search", {"query": "rag"})
+
+        # And the session comes back in the background once the server is up.
+        transport.failures = 0
+        for _ in range(100):
+            if pool.is_connected():
+                break
+            await asyncio.sleep(0.01)
+        result = await pool.call_tool_mcp("search", {"query": "rag"})
+        assert result.content[0].text == "papers about rag"
+    finally:
+        await pool.close()
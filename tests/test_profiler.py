@@ -0,0 +1,78 @@
+from typing import Any
+
+from codearkt.llm import LLM, ChatMessage, ChatMessages, ChatStreamGenerator
+from codearkt.metrics import TokenUsageStore
+from openai.types.chat.chat_completion_chunk import ChatCompletionChunk
+
+from holosophos.agents import HolosophosAgent
+from holosophos.llm import UsageTrackingLLM
+from holosophos.profiler import PROFILER
+
+
+class EchoLLM(LLM):
+    async def astream(self, messages: ChatMessages, **kwargs: Any) -> ChatStreamGenerator:
+        yield ChatCompletionChunk.model_validate(
+            {
+                "id": "1",
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": self._model_name,
+                "choices": [{"index": 0, "delta": {"content": str(messages[-1].content)}}],
+                "usage": {"prompt_tokens": 10, "completion_tokens": 2, "total_tokens": 12},
+            }
+        )
+
+
+async def test_agent_llm_profiling() -> None:
+    agent = HolosophosAgent(name="echo", description="Echo", llm=EchoLLM(model_name="echo"))
+    usage_store = TokenUsageStore()
+    for _ in range(2):
+        output = await agent._run_llm(
+            [ChatMessage(role="user", content="ping")],
+            session_id="profiled",
+            excluded_stop_sequences=[],
+            included_stop_sequences=[],
+            token_usage_store=usage_store,
+        )
+        assert output == "ping"
+    stats = PROFILER.agent("profiled", "echo")
+    assert stats.llm_calls == 2
+    assert stats.prompt_tokens == 20
+    assert usage_store.get("profiled").completion_tokens == 4
+    PROFILER.record_tool("arxiv_search", 0.5)
+    report = PROFILER.format("profiled")
+    assert "echo" in report and "arxiv_search" in report
+    assert "tools" not in PROFILER.summary("profiled")
+    assert PROFILER.tool_summary()["arxiv_search"]["calls"] >= 1
+
+
+class CachingLLM(LLM):
+    async def astream(self, messages: ChatMessages, **kwargs: Any) -> ChatStreamGenerator:
+        yield ChatCompletionChunk.model_validate(
+            {
+                "id": "1",
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": self._model_name,
+                "choices": [{"index": 0, "delta": {"content": "pong"}}],
+                "usage": {
+                    "prompt_tokens": 100,
+                    "completion_tokens": 2,
+                    "total_tokens": 102,
+                    "prompt_tokens_details": {"cached_tokens": 80},
+                },
+            }
+        )
+
+
+async def test_agent_cached_tokens() -> None:
+    llm = UsageTrackingLLM(CachingLLM(model_name="caching"))
+    agent = HolosophosAgent(name="caching", description="Caching", llm=llm)
+    for _ in range(2):
+        await agent._run_llm(
+            [ChatMessage(role="user", content="ping")],
+            session_id="cached",
+            excluded_stop_sequences=[],
+            included_stop_sequences=[],
+        )
+    assert PROFILER.agent("cached", "caching").cached_prompt_tokens == 160
@@ -0,0 +1,96 @@
+import time
+from typing import Any
+
+import httpx
+import pytest
+from codearkt.llm import LLM, ChatMessage, ChatMessages, ChatStreamGenerator
+from fastmcp import Client, FastMCP
+from fastmcp.exceptions import ToolError
+from openai import RateLimitError
+from openai.types.chat.chat_completion_chunk import ChatCompletionChunk
+from pydantic import ValidationError
+
+from holosophos.llm import RateLimitedLLM
+from holosophos.rate_limit import TokenBucket, get_llm_bucket, parse_retry_after
+from holosophos.settings import Settings
+from holosophos.tools_server import ToolRateLimitMiddleware
+
+
+def test_token_bucket() -> None:
+    bucket = TokenBucket("test", requests_per_minute=120, burst=1)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(0.5, abs=0.05)
+    assert bucket.reserve() == pytest.approx(1.0, abs=0.05)
+    unlimited = TokenBucket("unlimited")
+    assert unlimited.reserve() == 0.0
+    unlimited.block_for(2.0)
+    assert unlimited.reserve() == pytest.approx(2.0, abs=0.05)
+    assert parse_retry_after("7") == 7.0
+    assert parse_retry_after("429 Too Many Requests, retry after 3 seconds") == 3.0
+
+
+def test_non_positive_rate_limits_are_rejected() -> None:
+    with pytest.raises(ValidationError, match="greater than 0"):
+        Settings(LLM_RATE_LIMITS={"openai": (0, 1)})
+    with pytest.raises(ValueError, match="must be positive"):
+        TokenBucket("test", requests_per_minute=0)
+
+
+class FlakyLLM(LLM):
+    calls = 0
+
+    async def astream(self, messages: ChatMessages, **kwargs: Any) -> ChatStreamGenerator:
+        FlakyLLM.calls += 1
+        if FlakyLLM.calls == 1:
+            request = httpx.Request("POST", "http://provider")
+            response = httpx.Response(429, headers={"retry-after": "0.2"}, request=request)
+            raise RateLimitError(
+                "Too many requests", response=response, body=None  # type: ignore[arg-type]
+            )
+        yield ChatCompletionChunk.model_validate(
+            {
+                "id": "1",
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": self._model_name,
+                "choices": [{"index": 0, "delta": {"content": "pong"}}],
+            }
+        )
+
+
+class FlakyRateLimitedLLM(RateLimitedLLM, FlakyLLM):
+    pass
+
+
+async def test_rate_limited_llm_retries() -> None:
+    llm = FlakyRateLimitedLLM(model_name="flaky/model")
+    start_time = time.monotonic()
+    events = [event async for event in llm.astream([ChatMessage(role="user", content="ping")])]
+    assert events[0].choices[0].delta.content == "pong"
+    assert FlakyLLM.calls == 2
+    assert time.monotonic() - start_time >= 0.2
+    assert get_llm_bucket("flaky/other").blocked_until > 0
+
+
+async def test_rate_limited_llm_has_one_retry_loop() -> None:
+    llm = RateLimitedLLM(model_name="flaky/model", num_retries=2)
+    assert llm._num_retries == 0
+    assert llm._transient_retries == 2
+
+
+async def test_tool_rate_limit_middleware() -> None:
+    calls = {"s2_search": 0}
+    mcp: FastMCP[Any] = FastMCP(name="test")
+
+    @mcp.tool(name="s2_search")
+    def s2_search(query: str) -> str:
+        calls["s2_search"] += 1
+        if calls["s2_search"] == 1:
+            raise ToolError("429 Too Many Requests, retry after 0.1")
+        return f"papers about {query}"
+
+    mcp.add_middleware(ToolRateLimitMiddleware())
+    async with Client(mcp) as client:
+        result = await client.call_tool("s2_search", {"query": "agents"})
+    assert result.content[0].text == "papers about agents"
+    assert calls["s2_search"] == 2
@@ -0,0 +1,136 @@
+import asyncio
+import json
+from typing import List
+
+import httpx
+from codearkt.codeact import CodeActAgent
+from codearkt.event_bus import AgentEvent, AgentEventBus, EventType
+from codearkt.metrics import TokenUsageStore
+from codearkt.llm import LLM, ChatMessages
+from codearkt.server import _shutdown_server, _start_temporary_server
+from fastmcp import Client
+
+from holosophos.delegation import get_state_session_id
+from holosophos.streaming import StreamingEventBus, merge_events
+from holosophos.tools_server import install_server_extensions
+
+
+class ChattyAgent(CodeActAgent):
+    state_sessions: List[str] = []
+
+    async def ainvoke(
+        self,
+        messages: ChatMessages,
+        session_id: str,
+        event_bus: AgentEventBus | None = None,
+        token_usage_store: TokenUsageStore | None = None,
+        server_host: str | None = None,
+        server_port: int | None = None,
+    ) -> str:
+        self.state_sessions.append(get_state_session_id(session_id))
+        await self._publish_event(event_bus, session_id, EventType.AGENT_START)
+        try:
+            for word in str(messages[-1].content).split():
+                await self._publish_event(event_bus, session_id, EventType.OUTPUT, word + " ")
+                await asyncio.sleep(0.05)
+        finally:
+            await self._publish_event(event_bus, session_id, EventType.AGENT_END)
+        return "final answer"
+
+
+def _event(event_type: EventType, content: str | None = None, agent: str = "a") -> AgentEvent:
+    return AgentEvent(session_id="s", agent_name=agent, event_type=event_type, content=content)
+
+
+def test_merge_events() -> None:
+    events = [
+        _event(EventType.AGENT_START),
+        _event(EventType.OUTPUT, "Hel"),
+        _event(EventType.OUTPUT, "lo"),
+        _event(EventType.OUTPUT, "!", agent="b"),
+        _event(EventType.TOOL_RESPONSE, "ok"),
+        _event(EventType.AGENT_END),
+    ]
+    merged = merge_events(events)
+    assert [(e.event_type, e.content) for e in merged] == [
+        (EventType.AGENT_START, None),
+        (EventType.OUTPUT, "Hello"),
+        (EventType.OUTPUT, "!"),
+        (EventType.TOOL_RESPONSE, "ok"),
+        (EventType.AGENT_END, None),
+    ]
+
+
+async def test_event_bus_backpressure() -> None:
+    bus = StreamingEventBus(queue_size=2, publish_timeout=0.1)
+    # Nobody streams this session, the events are dropped.
+    await bus.publish_event("other", "a", EventType.OUTPUT, "x")
+    assert "other" not in bus.queues
+
+    bus.subscribe("s")
+    await bus.publish_event("s", "a", EventType.OUTPUT, "1")
+    await bus.publish_event("s", "a", EventType.OUTPUT, "2")
+    publish = asyncio.create_task(bus.publish_event("s", "a", EventType.OUTPUT, "3"))
+    await asyncio.sleep(0.05)
+    assert not publish.done()
+    bus.queues["s"].get_nowait()
+    await publish
+    assert bus.queues["s"].qsize() == 2
+
+    # A client that stopped reading is detached.
+    await bus.publish_event("s", "a", EventType.OUTPUT, "4")
+    assert "s" not in bus.queues
+
+
+async def test_streaming_endpoint_and_background_delegation() -> None:
+    install_server_extensions()
+    agent = ChattyAgent(name="chatty", description="Talks", llm=LLM(model_name="none"))
+    server, server_task, _, port, _ = await _start_temporary_server(agent)
+    url = f"http://localhost:{port}"
+    try:
+        payload = {"messages": [{"role": "user", "content": "one two three"}], "stream": True}
+        async with httpx.AsyncClient(timeout=10) as client:
+            response = await client.post(f"{url}/agents/chatty", json=payload)
+            events = [AgentEvent.model_validate_json(line) for line in response.text.splitlines()]
+            sse_response = await client.post(
+                f"{url}/agents/chatty", json=payload, headers={"Accept": "text/event-stream"}
+            )
+        assert events[0].event_type == EventType.AGENT_START
+        text = "".join(e.content or "" for e in events if e.event_type == EventType.OUTPUT)
+        assert text == "one two three "
+        assert events[-1].event_type == EventType.AGENT_END
+        assert events[-1].content == "final answer"
+        assert sse_response.headers["content-type"].startswith("text/event-stream")
+        assert "event: agent_end" in sse_response.text
+
+        async with Client(f"{url}/mcp") as client:
+            result = await client.call_tool(
+                "delegate_start",
+                {"session_id": "parent", "agent_name": "chatty", "task": "a b c d e f g h i j"},
+            )
+            task_id = result.structured_content["result"]
+            await asyncio.sleep(0.2)
+            result = await client.call_tool("delegate_status", {"task_id": task_id})
+            assert result.structured_content["status"] == "running"
+            result = await client.call_tool("delegate_cancel", {"task_id": task_id})
+            status = result.structured_content
+            assert status["status"] == "cancelled"
+            assert status["partial_output"].startswith("a b")
+            assert status["result"] is None
+
+            result = await client.call_tool(
+                "delegate_start", {"session_id": "parent", "agent_name": "chatty", "task": "short"}
+            )
+            task_id = result.structured_content["result"]
+            result = await client.call_tool(
+                "delegate_status", {"task_id": task_id, "wait_seconds": 5}
+            )
+            assert json.loads(result.content[0].text)["result"] == "final answer"
+
+            arguments = {"session_id": "parent", "agent_name": "chatty", "tasks": ["a", "b"]}
+            result = await client.call_tool("delegate_parallel", arguments)
+            assert result.structured_content["result"] == ["final answer", "final answer"]
+        # Delegated runs keep the state of the session that started them.
+        assert ChattyAgent.state_sessions[-4:] == ["parent"] * 4
+    finally:
+        await _shutdown_server(server, server_task)
@@ -0,0 +1,116 @@
+import asyncio
+import json
+from typing import List
+
+import pytest
+from codearkt.codeact import CodeActAgent
+from codearkt.event_bus import AgentEventBus
+from codearkt.llm import LLM, ChatMessage, ChatMessages
+from codearkt.metrics import TokenUsageStore
+from fastmcp import Client, FastMCP
+from fastmcp.exceptions import ToolError
+
+from holosophos.agents.base import _GOVERNOR, HolosophosAgent
+from holosophos.profiler import PROFILER
+from holosophos.settings import settings
+from holosophos.streaming import StreamingEventBus
+from holosophos.tools_server import ToolTimeoutMiddleware
+
+
+class StuckAgent(CodeActAgent):
+    cancelled: List[str] = []
+
+    async def ainvoke(
+        self,
+        messages: ChatMessages,
+        session_id: str,
+        event_bus: AgentEventBus | None = None,
+        token_usage_store: TokenUsageStore | None = None,
+        server_host: str | None = None,
+        server_port: int | None = None,
+    ) -> str:
+        governor = _GOVERNOR.get()
+        assert governor is not None
+        governor.last_output = "Training the baseline, epoch 3 of 10"
+        try:
+            await asyncio.sleep(float(str(messages[-1].content).split()[0]))
+        except asyncio.CancelledError:
+            self.cancelled.append(session_id)
+            raise
+        return "finished"
+
+
+class StuckHolosophosAgent(HolosophosAgent, StuckAgent):
+    pass
+
+
+async def test_agent_timeout(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "SESSION_WORKSPACES_ENABLED", False)
+    agent = StuckHolosophosAgent(name="mle_solver", description="Stuck", llm=LLM(model_name="none"))
+    agent.timeout = 0.2
+
+    result = await agent.ainvoke([ChatMessage(role="user", content="10")], session_id="stuck")
+    observation = json.loads(result)
+    assert observation["status"] == "timed_out"
+    assert observation["agent"] == "mle_solver"
+    assert observation["last_output"] == "Training the baseline, epoch 3 of 10"
+    assert StuckAgent.cancelled == ["stuck"]
+    assert PROFILER.agent("stuck", "mle_solver").timeouts == 1
+
+    result = await agent.ainvoke([ChatMessage(role="user", content="0")], session_id="fast")
+    assert result == "finished"
+
+
+async def test_agent_timeout_cancels_children(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "SESSION_WORKSPACES_ENABLED", False)
+    llm = LLM(model_name="none")
+    child = StuckHolosophosAgent(name="librarian", description="Stuck", llm=llm)
+    parent = StuckHolosophosAgent(
+        name="manager",
+        description="Stuck",
+        llm=llm,
+        tool_names=["delegate_start"],
+        managed_agents=[child],
+    )
+    parent.timeout = 0.2
+    event_bus = StreamingEventBus(queue_size=10, publish_timeout=1.0)
+
+    # Runs of team members as the agent endpoint starts them: in the session and delegated.
+    messages = [ChatMessage(role="user", content="10")]
+    child_task = asyncio.create_task(child.ainvoke(messages, "root"), name="librarian")
+    event_bus.register_task("root", "librarian", child_task)
+    delegated_task = asyncio.create_task(child.ainvoke(messages, "run1"), name="librarian")
+    event_bus.register_task("run1", "librarian", delegated_task)
+    event_bus.add_delegation("root", "run1")
+
+    result = await parent.ainvoke(messages, session_id="root", event_bus=event_bus)
+    assert json.loads(result)["status"] == "timed_out"
+    await asyncio.gather(child_task, delegated_task, return_exceptions=True)
+    assert child_task.cancelled() and delegated_task.cancelled()
+    assert "run1" not in event_bus.running_tasks
+
+
+async def test_tool_timeout_middleware() -> None:
+    mcp: FastMCP[None] = FastMCP(name="test")
+
+    @mcp.tool(name="visit_webpage")
+    async def visit_webpage(url: str) -> str:
+        await asyncio.sleep(10)
+        return "page"
+
+    @mcp.tool(name="bash")
+    async def bash(command: str, timeout: int = 60) -> str:
+        return str(timeout)
+
+    middleware = ToolTimeoutMiddleware({"visit_webpage": 0.2, "bash": 30}, default_timeout=None)
+    mcp.add_middleware(middleware)
+    async with Client(mcp) as client:
+        with pytest.raises(ToolError, match="Timed out: visit_webpage"):
+            await client.call_tool("visit_webpage", {"url": "https://example.com"})
+        result = await client.call_tool("bash", {"command": "sleep 1000", "timeout": 1200})
+        assert result.content[0].text == "30"
+        result = await client.call_tool("bash", {"command": "ls", "timeout": 5})
+        assert result.content[0].text == "5"
+
+    assert ToolTimeoutMiddleware({}, default_timeout=60).get_timeout("delegate_parallel") is None
+    assert ToolTimeoutMiddleware({}, default_timeout=60).get_timeout("arxiv_search") == 60
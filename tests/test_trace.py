@@ -0,0 +1,67 @@
+from pathlib import Path
+from typing import Any
+
+from codearkt.llm import LLM, ChatMessage, ChatMessages, ChatStreamGenerator
+from fastmcp import Client, FastMCP
+from openai.types.chat.chat_completion_chunk import ChatCompletionChunk
+
+from holosophos.llm import RecordingLLM, ReplayLLM
+from holosophos.trace import TraceStore
+from holosophos.tools_server import ReplayTool, ToolRecorderMiddleware
+
+
+class CountingLLM(LLM):
+    def __init__(self) -> None:
+        super().__init__(model_name="test-model", temperature=0.0)
+        self.calls = 0
+
+    async def astream(self, messages: ChatMessages, **kwargs: Any) -> ChatStreamGenerator:
+        self.calls += 1
+        yield ChatCompletionChunk.model_validate(
+            {
+                "id": str(self.calls),
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": "test-model",
+                "choices": [{"index": 0, "delta": {"content": f"Answer {self.calls}"}}],
+            }
+        )
+
+
+async def test_llm_record_replay(tmp_path: Path) -> None:
+    path = tmp_path / "trace.jsonl"
+    messages = [ChatMessage(role="user", content="Hello")]
+    recorder = RecordingLLM(CountingLLM(), TraceStore(path))
+    for _ in range(2):
+        [event async for event in recorder.astream(messages, stop=["Observation:"])]
+
+    replay = ReplayLLM(model_name="test-model", trace=TraceStore(path), temperature=0.0)
+    contents = []
+    for _ in range(3):
+        events = [event async for event in replay.astream(messages, stop=["Observation:"])]
+        contents.append(events[0].choices[0].delta.content)
+    assert contents == ["Answer 1", "Answer 2", "Answer 2"]
+
+
+async def test_tool_record_replay(tmp_path: Path) -> None:
+    path = tmp_path / "trace.jsonl"
+    mcp: FastMCP[Any] = FastMCP(name="test")
+
+    @mcp.tool(name="arxiv_search")
+    def arxiv_search(query: str) -> str:
+        """Search arXiv."""
+        return f"papers about {query}"
+
+    mcp.add_middleware(ToolRecorderMiddleware(TraceStore(path)))
+    async with Client(mcp) as client:
+        await client.list_tools()
+        await client.call_tool("arxiv_search", {"query": "agents"})
+
+    trace = TraceStore(path)
+    stub: FastMCP[Any] = FastMCP(name="stub")
+    stub.add_tool(ReplayTool.from_trace("arxiv_search", trace))
+    async with Client(stub) as client:
+        tools = await client.list_tools()
+        assert tools[0].description == "Search arXiv."
+        result = await client.call_tool("arxiv_search", {"query": "agents"})
+        assert result.content[0].text == "papers about agents"
@@ -0,0 +1,116 @@
+import os
+import time
+from pathlib import Path
+
+import pytest
+from fastmcp import Client, FastMCP
+from fastmcp.exceptions import ToolError
+
+from holosophos.tools_server import SessionWorkspaceMiddleware
+from holosophos.workspace import SessionWorkspaces, get_dir_size
+
+
+def test_workspace_lifecycle(tmp_path: Path) -> None:
+    workspaces = SessionWorkspaces(tmp_path, end_action="archive")
+    path = workspaces.acquire("abc/1")
+    assert path == tmp_path / "sessions" / "abc_1"
+    workspaces.acquire("abc/1")
+    (path / "model.py").write_text("print(1)")
+
+    # Still held by the other agent of the session.
+    workspaces.release("abc/1")
+    assert path.exists()
+    workspaces.release("abc/1")
+    assert not path.exists()
+    assert (tmp_path / ".archives" / "abc_1.tar.gz").exists()
+
+    # A continued session gets its files back.
+    path = workspaces.acquire("abc/1")
+    assert (path / "model.py").read_text() == "print(1)"
+    assert not (tmp_path / ".archives" / "abc_1.tar.gz").exists()
+
+
+def test_workspace_scratch_and_delete(tmp_path: Path) -> None:
+    scratch_root = tmp_path / "tmpfs"
+    workspaces = SessionWorkspaces(
+        tmp_path / "workdir", scratch_root=scratch_root, end_action="delete"
+    )
+    path = workspaces.acquire("s1")
+    (path / "scratch" / "data.bin").write_bytes(b"0" * 100)
+    (path / "notes.txt").write_text("abc")
+    assert (scratch_root / "s1" / "data.bin").exists()
+    assert get_dir_size(path) == 3
+    assert workspaces.usage("s1") == 103
+
+    workspaces.release("s1")
+    assert not path.exists()
+    assert not (scratch_root / "s1").exists()
+    assert not (tmp_path / "workdir" / ".archives").exists()
+
+
+def test_workspace_pruning(tmp_path: Path) -> None:
+    workspaces = SessionWorkspaces(tmp_path, max_count=2, max_age=3600)
+    for session_id in ("s1", "s2", "s3"):
+        workspaces.acquire(session_id)
+    workspaces.release("s1")
+    workspaces.release("s2")
+    # Active sessions are never pruned, ended ones are kept up to max_count.
+    assert workspaces.path("s1").exists() and workspaces.path("s2").exists()
+
+    old_time = time.time() - 7200
+    os.utime(workspaces.path("s1"), (old_time, old_time))
+    assert workspaces.prune() == 1
+    assert not workspaces.path("s1").exists()
+    assert workspaces.path("s3").exists()
+
+    archives = tmp_path / ".archives"
+    archives.mkdir()
+    for name in ("a1", "a2"):
+        (archives / f"{name}.tar.gz").write_bytes(b"")
+    workspaces.release("s3")
+    assert len(list((tmp_path / "sessions").iterdir())) + len(list(archives.iterdir())) == 2
+
+
+def test_find_session(tmp_path: Path) -> None:
+    workspaces = SessionWorkspaces(tmp_path)
+    assert workspaces.find_session("sessions/s1/model.py") == "s1"
+    assert workspaces.find_session("./sessions/s1") == "s1"
+    assert workspaces.find_session(str(tmp_path / "sessions" / "s2" / "a.txt")) == "s2"
+    assert workspaces.find_session("attachments/1/file.xlsx") is None
+    assert workspaces.find_session("sessions") is None
+
+
+def test_find_session_container_roots(tmp_path: Path) -> None:
+    workspaces = SessionWorkspaces(tmp_path, container_roots=["/workdir"])
+    assert workspaces.find_session("/workdir/sessions/s1/model.py") == "s1"
+    assert workspaces.find_session(str(tmp_path / "sessions" / "s2")) == "s2"
+    assert workspaces.find_session("/other/sessions/s3/a.txt") is None
+
+
+async def test_workspace_quota_middleware(tmp_path: Path) -> None:
+    workspaces = SessionWorkspaces(tmp_path, quota_bytes=10)
+    path = workspaces.acquire("s1")
+    mcp: FastMCP[None] = FastMCP(name="test")
+
+    @mcp.tool(name="text_editor")
+    def text_editor(command: str, path: str, file_text: str = "") -> str:
+        if command == "write":
+            (tmp_path / path).write_text(file_text)
+        return "ok"
+
+    @mcp.tool(name="bash")
+    def bash(command: str, cwd: str = "") -> str:
+        return "done"
+
+    mcp.add_middleware(SessionWorkspaceMiddleware(workspaces, tool_names=("text_editor", "bash")))
+    async with Client(mcp) as client:
+        arguments = {"command": "write", "path": "sessions/s1/a.txt", "file_text": "0" * 20}
+        result = await client.call_tool("text_editor", arguments)
+        assert "quota" in result.content[0].text
+        with pytest.raises(ToolError):
+            await client.call_tool("text_editor", {**arguments, "path": "sessions/s1/b.txt"})
+        result = await client.call_tool("bash", {"command": "rm a.txt", "cwd": "sessions/s1"})
+        assert result.content[0].text.startswith("done") and "quota" in result.content[0].text
+        result = await client.call_tool("text_editor", {"command": "view", "path": "other.txt"})
+        assert result.content[0].text == "ok"
+    assert not (path / "b.txt").exists()